@@ -0,0 +1,204 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import fragments
+from .cache import catalog_response
+from .facets import get_facets
+from .filters import IngredientFilter
+from .multiget import get_by_ids, get_ids
+from .sparse import get_shape
+from .serializers import IngredientSerializer, TagSerializer
+from .views import (
+    IngredientViewSet,
+    RecipesViewSet,
+    TagViewSet,
+    get_shopping_list
+)
+from foodgram.db import run
+from foodgram.routers import use_replica
+from recipes.models import Ingredient, Tag
+from recipes.units import humanize
+
+sync_recipe_list = RecipesViewSet.as_view({'get': 'list', 'post': 'create'})
+sync_recipe_detail = RecipesViewSet.as_view({
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy'
+})
+sync_ingredient_list = IngredientViewSet.as_view({'get': 'list'})
+sync_tag_list = TagViewSet.as_view({'get': 'list'})
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        safe=False,
+        encoder=JSONEncoder,
+        json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def finalize(view, response):
+    """Ответ после действия, как в конце APIView.dispatch."""
+    response = view.finalize_response(view.request, response)
+    if isinstance(response, Response):
+        response.render()
+    return response
+
+
+def call(view, func, *args):
+    """Результат func(*args) и None или None и ответ DRF на исключение
+    (404, 400, 429...) - те же, что у синхронного ViewSet."""
+    try:
+        return func(*args), None
+    except Exception as exc:
+        return None, finalize(view, view.handle_exception(exc))
+
+
+def init_view(request, action, **kwargs):
+    """ViewSet рецептов для действия: аутентификация, права, троттлинг и
+    пагинация - как в синхронном пути. Возвращает (view, None) или
+    (None, ответ с ошибкой)."""
+    view = RecipesViewSet(
+        action_map={'get': action},
+        **getattr(getattr(RecipesViewSet, action), 'kwargs', {})
+    )
+    view.args = ()
+    view.kwargs = kwargs
+    view.request = view.initialize_request(request, **kwargs)
+    view.headers = view.default_response_headers
+    view.format_kwarg = None
+    _, response = call(view, view.initial, view.request)
+    return (None, response) if response is not None else (view, None)
+
+
+async def start(request, action, **kwargs):
+    """init_view; решение ReplicaReadsMixin о чтении с реплик
+    переносится в контекст запроса, чтобы его видели следующие вызовы
+    run."""
+    view, response = await run(init_view)(request, action, **kwargs)
+    if view is not None:
+        use_replica.set(view.replica_reads)
+    return view, response
+
+
+def get_list_params(request):
+    return get_facets(request), get_shape(request), get_ids(request)
+
+
+async def recipe_list(request):
+    """Асинхронный список рецептов: рецепты страницы и фасеты
+    собираются параллельно."""
+    if request.method != 'GET':
+        return await sync_to_async(sync_recipe_list)(request)
+    view, response = await start(request, 'list')
+    if response is not None:
+        return response
+    params, response = call(view, get_list_params, view.request)
+    if response is not None:
+        return response
+    facets, shape, ids = params
+    if ids is not None:
+        data, response = await run(call)(
+            view, get_by_ids, ids, shape, view.request
+        )
+        return response or await run(finalize)(view, Response(data))
+    ids, response = await run(call)(view, view.get_page_ids)
+    if response is not None:
+        return response
+    results, facet_counts = await asyncio.gather(
+        run(view.build_page)(ids, shape),
+        run(view.count_facets)(facets) if facets else asyncio.sleep(0)
+    )
+    response = view.get_paginated_response(results)
+    if facets:
+        response.data['facets'] = facet_counts
+    return await run(finalize)(view, response)
+
+
+def get_recipe(request, pk):
+    results = fragments.get_recipes([pk], request)
+    if not results:
+        raise Http404
+    return results[0]
+
+
+async def recipe_detail(request, pk):
+    """Асинхронное получение рецепта из кэша общей части рецептов."""
+    if request.method != 'GET' or request.GET.get('servings'):
+        return await sync_to_async(sync_recipe_detail)(request, pk=pk)
+    view, response = await start(request, 'retrieve', pk=pk)
+    if response is not None:
+        return response
+    data, response = await run(call)(view, get_recipe, view.request, pk)
+    return response or await run(finalize)(view, Response(data))
+
+
+def list_ingredients(request):
+    filterset = IngredientFilter(
+        request.GET, queryset=Ingredient.objects.all(), request=request
+    )
+    queryset = filterset.qs
+    search = request.GET.get('search')
+    if search:
+        queryset = queryset.filter(name__istartswith=search)
+    return IngredientSerializer(queryset, many=True).data
+
+
+async def ingredient_list(request):
+    """Асинхронный список ингредиентов."""
+    if request.method != 'GET':
+        return await sync_to_async(sync_ingredient_list)(request)
+    if not request.GET:
+        return await run(catalog_response)(
+            request,
+            'ingredients',
+            lambda: IngredientSerializer(
+                Ingredient.objects.all(), many=True
+            ).data
+        )
+    return json_response(await run(list_ingredients)(request))
+
+
+async def tag_list(request):
+    """Асинхронный список тегов."""
+    if request.method != 'GET':
+        return await sync_to_async(sync_tag_list)(request)
+    return await run(catalog_response)(
+        request,
+        'tags',
+        lambda: TagSerializer(Tag.objects.all(), many=True).data
+    )
+
+
+async def download_shopping_cart(request):
+    """Асинхронная выгрузка списка покупок потоком строк."""
+    view, response = await start(request, 'download_shopping_cart')
+    if response is not None:
+        return response
+    ingredients, response = await run(call)(
+        view, get_shopping_list, view.request.user
+    )
+    return response or await run(finalize)(view, StreamingHttpResponse(
+        (
+            f'{index} - {name}  {humanize(amount, unit)}\n'
+            for index, (name, amount, unit) in enumerate(ingredients, 1)
+        ),
+        content_type='text/plain'
+    ))
+
+
+for view in (
+    recipe_list,
+    recipe_detail,
+    ingredient_list,
+    tag_list,
+    download_shopping_cart,
+):
+    view.csrf_exempt = True
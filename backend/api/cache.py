@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .renderers import dumps
+from foodgram.compression import choose_encoding, compress, get_encodings
+from recipes import catalog
+
+
+def get_catalog_bodies(name, build):
+    """JSON справочника и его сжатые варианты из кэша.
+    build вызывается только при промахе."""
+    key = f'catalog:{name}:{catalog.get_version()}'
+    bodies = cache.get(key)
+    if bodies is None:
+        body = dumps(build())
+        bodies = {'identity': body}
+        if len(body) >= settings.COMPRESSION_MIN_SIZE:
+            for encoding in get_encodings():
+                bodies[encoding] = compress(body, encoding, best=True)
+        cache.set(key, bodies, settings.CATALOG_CACHE_SECONDS)
+    return bodies
+
+
+def catalog_response(request, name, build):
+    """Ответ с заранее сжатым телом справочника."""
+    bodies = get_catalog_bodies(name, build)
+    encoding = choose_encoding(
+        request, [encoding for encoding in bodies if encoding != 'identity']
+    )
+    response = HttpResponse(
+        bodies[encoding or 'identity'], content_type='application/json'
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
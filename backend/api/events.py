@@ -0,0 +1,327 @@
+"""Поток событий /api/events/ (Server-Sent Events).
+
+Клиент получает события:
+
+* recipes - новые рецепты авторов, на которых он подписан;
+* favorites - число добавлений в избранное рецептов из параметра
+  ?recipes=1,2,3 (не больше EVENTS_MAX_RECIPES).
+
+Токен передаётся заголовком Authorization или параметром ?token=
+(EventSource в браузере не умеет задавать заголовки); без токена
+доступны только favorites.
+
+Сообщения из foodgram/pubsub.py копятся и раз в EVENTS_FLUSH_INTERVAL
+секунд рассылаются одним кадром на соединение: всплеск добавлений в
+избранное даёт одно обновление с последним значением, а числа для всех
+изменившихся рецептов считаются одним запросом на процесс. Без событий
+раз в EVENTS_HEARTBEAT_SECONDS отправляется комментарий, чтобы прокси
+не закрывали соединение.
+
+Поток обслуживается из foodgram/asgi.py в обход обработчика Django:
+в Django 3.2 он читает потоковый ответ синхронно и занимал бы цикл
+событий. Простаивающее соединение - одна ожидающая корутина, поэтому
+процесс держит тысячи соединений (см. manage.py loadtest_events).
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.db.models import Count
+from rest_framework.authtoken.models import Token
+
+from foodgram import pubsub
+from foodgram.db import run
+from recipes.models import Favorite
+from users.models import Subscription
+
+logger = logging.getLogger(__name__)
+
+RECIPE = 'recipe'
+FAVORITES = 'favorites'
+SUBSCRIPTION = 'subscription'
+
+PING = b': ping\n\n'
+
+
+def get_user(key):
+    token = Token.objects.select_related('user').filter(key=key).first()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def get_followed(user_id):
+    return set(Subscription.objects.filter(
+        user_id=user_id
+    ).values_list('author_id', flat=True))
+
+
+def get_favorite_counts(recipe_ids):
+    counts = dict.fromkeys(recipe_ids, 0)
+    counts.update(Favorite.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by().values('recipe_id').annotate(
+        count=Count('pk')
+    ).values_list('recipe_id', 'count'))
+    return counts
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def add(index, keys, connection):
+    for key in keys:
+        index[key].add(connection)
+
+
+def remove(index, keys, connection):
+    for key in keys:
+        connections = index.get(key)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del index[key]
+
+
+class Connection:
+    """Открытый поток и накопленные для него события."""
+
+    def __init__(self, user_id, authors, recipe_ids):
+        self.user_id = user_id
+        self.authors = authors
+        self.recipe_ids = recipe_ids
+        self.recipes = []
+        self.favorites = {}
+        self.closed = False
+        self.ready = asyncio.Event()
+
+    def take_frame(self):
+        frame = ''
+        if self.recipes:
+            frame += format_event('recipes', self.recipes)
+        if self.favorites:
+            frame += format_event('favorites', self.favorites)
+        self.recipes = []
+        self.favorites = {}
+        self.ready.clear()
+        return frame.encode()
+
+
+class Hub:
+    """Соединения процесса и рассылка им накопленных сообщений."""
+
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, loop):
+        self.loop = loop
+        self.flusher = None
+        self.connections = set()
+        self.by_user = defaultdict(set)
+        self.by_author = defaultdict(set)
+        self.by_recipe = defaultdict(set)
+        self.recipes = []
+        self.favorites = set()
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is loop:
+            return
+        self.reset(loop)
+        pubsub.get_backend().listen(loop, self.receive)
+        self.flusher = loop.create_task(self.flush_forever())
+
+    def connect(self, connection):
+        self.start()
+        self.connections.add(connection)
+        if connection.user_id is not None:
+            self.by_user[connection.user_id].add(connection)
+        add(self.by_author, connection.authors, connection)
+        add(self.by_recipe, connection.recipe_ids, connection)
+
+    def disconnect(self, connection):
+        self.connections.discard(connection)
+        remove(self.by_user, [connection.user_id], connection)
+        remove(self.by_author, connection.authors, connection)
+        remove(self.by_recipe, connection.recipe_ids, connection)
+
+    def receive(self, message):
+        kind = message['type']
+        if kind == RECIPE and message['author'] in self.by_author:
+            self.recipes.append(message)
+        elif kind == FAVORITES and message['recipe'] in self.by_recipe:
+            self.favorites.add(message['recipe'])
+        elif kind == SUBSCRIPTION:
+            author = message['author']
+            for connection in list(self.by_user.get(message['user'], ())):
+                if message['deleted']:
+                    connection.authors.discard(author)
+                    remove(self.by_author, [author], connection)
+                else:
+                    connection.authors.add(author)
+                    add(self.by_author, [author], connection)
+
+    async def flush(self):
+        recipes, self.recipes = self.recipes, []
+        favorites, self.favorites = self.favorites, set()
+        counts = await run(get_favorite_counts)(favorites) if favorites else {}
+        touched = set()
+        for recipe in recipes:
+            for connection in self.by_author.get(recipe['author'], ()):
+                connection.recipes.append({
+                    'id': recipe['id'],
+                    'name': recipe['name'],
+                    'author': recipe['author'],
+                })
+                # Медленному клиенту достаются только последние рецепты.
+                del connection.recipes[:-settings.EVENTS_MAX_RECIPES]
+                touched.add(connection)
+        for recipe_id, count in counts.items():
+            for connection in self.by_recipe.get(recipe_id, ()):
+                connection.favorites[recipe_id] = count
+                touched.add(connection)
+        for connection in touched:
+            connection.ready.set()
+
+    async def flush_forever(self):
+        while True:
+            await asyncio.sleep(settings.EVENTS_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception('Cannot flush events')
+
+
+hub = Hub()
+
+
+def get_token_key(headers, query):
+    auth = headers.get(b'authorization', b'').split()
+    if len(auth) == 2 and auth[0].lower() == b'token':
+        return auth[1].decode(errors='ignore')
+    return query.get('token', [None])[0]
+
+
+def get_recipe_ids(query):
+    value = query.get('recipes', [''])[0]
+    ids = {int(pk) for pk in value.split(',') if pk.strip()}
+    if len(ids) > settings.EVENTS_MAX_RECIPES:
+        raise ValueError
+    return ids
+
+
+async def send_json(send, status, data, headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), *headers],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': json.dumps(data, ensure_ascii=False).encode(),
+    })
+
+
+async def wait_disconnect(receive, connection):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+    connection.closed = True
+    connection.ready.set()
+
+
+async def stream_events(scope, receive, send):
+    headers = dict(scope['headers'])
+    query = parse_qs(scope['query_string'].decode(errors='ignore'))
+    user_id = None
+    key = get_token_key(headers, query)
+    if key:
+        user = await run(get_user)(key)
+        if user is None:
+            return await send_json(send, 401, {
+                'detail': 'Недопустимый токен.'
+            })
+        user_id = user.pk
+    try:
+        recipe_ids = get_recipe_ids(query)
+    except ValueError:
+        return await send_json(send, 400, {'recipes': (
+            'Ожидается не больше '
+            f'{settings.EVENTS_MAX_RECIPES} id рецептов через запятую.'
+        )})
+    if len(hub.connections) >= settings.EVENTS_MAX_CONNECTIONS:
+        return await send_json(
+            send,
+            503,
+            {'detail': 'Слишком много подключений.'},
+            [(b'retry-after', b'%d' % settings.EVENTS_HEARTBEAT_SECONDS)]
+        )
+    authors = await run(get_followed)(user_id) if user_id else set()
+    connection = Connection(user_id, authors, recipe_ids)
+    hub.connect(connection)
+    watcher = asyncio.ensure_future(wait_disconnect(receive, connection))
+    try:
+        # Начальные значения - после подключения, чтобы не потерять
+        # изменения между запросом и подпиской.
+        counts = (
+            await run(get_favorite_counts)(recipe_ids) if recipe_ids else {}
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # Иначе nginx буферизует поток.
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        body = f'retry: {settings.EVENTS_RETRY_MILLISECONDS}\n\n'
+        if counts:
+            body += format_event('favorites', counts)
+        await send({
+            'type': 'http.response.body',
+            'body': body.encode(),
+            'more_body': True,
+        })
+        while True:
+            try:
+                await asyncio.wait_for(
+                    connection.ready.wait(),
+                    settings.EVENTS_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                body = PING
+            else:
+                if connection.closed:
+                    break
+                body = connection.take_frame()
+            await send({
+                'type': 'http.response.body',
+                'body': body,
+                'more_body': True,
+            })
+    finally:
+        hub.disconnect(connection)
+        watcher.cancel()
+
+
+def route(application):
+    """ASGI-приложение: поток событий по EVENTS_PATH, остальное -
+    application."""
+    async def router(scope, receive, send):
+        if (scope['type'] == 'http'
+                and scope['path'] == settings.EVENTS_PATH):
+            if scope['method'] != 'GET':
+                return await send_json(
+                    send,
+                    405,
+                    {'detail': f'Метод "{scope["method"]}" не разрешен.'},
+                    [(b'allow', b'GET')]
+                )
+            return await stream_events(scope, receive, send)
+        return await application(scope, receive, send)
+    return router
@@ -0,0 +1,78 @@
+"""Счётчики фасетов для списка рецептов.
+
+?facets=tags,cooking_time добавляет к ответу число рецептов текущей
+выборки (с теми же фильтрами) по каждому тегу и по интервалам времени
+приготовления из RECIPE_COOKING_TIME_FACETS. Все счётчики считаются
+одним запросом с условными агрегатами по выборке.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .sparse import parse_list
+from recipes import catalog
+from recipes.models import Recipe, Tag
+
+FACETS = ('tags', 'cooking_time')
+
+
+def get_facets(request):
+    """Запрошенные фасеты или None."""
+    return parse_list(request, 'facets', FACETS)
+
+
+def get_tags():
+    """(id, slug) тегов, кэшируются до изменения справочников."""
+    return cache.get_or_set(
+        f'catalog:tag-slugs:{catalog.get_version()}',
+        lambda: list(Tag.objects.order_by('id').values_list('id', 'slug')),
+        settings.CATALOG_CACHE_SECONDS
+    )
+
+
+def get_cooking_time_buckets():
+    """Интервалы (min, max) времени приготовления, границы включаются."""
+    bounds = settings.RECIPE_COOKING_TIME_FACETS
+    lower = [None] + [bound + 1 for bound in bounds]
+    return list(zip(lower, list(bounds) + [None]))
+
+
+def count_facets(queryset, names):
+    recipes = Recipe.objects.filter(
+        pk__in=queryset.order_by().values('pk')
+    ).order_by()
+    aggregates = {}
+    tags = get_tags() if 'tags' in names else ()
+    for tag_id, _ in tags:
+        aggregates[f'tag_{tag_id}'] = Count(
+            'pk', distinct=True, filter=Q(tags=tag_id)
+        )
+    buckets = (
+        get_cooking_time_buckets() if 'cooking_time' in names else ()
+    )
+    for index, (lower, upper) in enumerate(buckets):
+        condition = Q()
+        if lower is not None:
+            condition &= Q(cooking_time__gte=lower)
+        if upper is not None:
+            condition &= Q(cooking_time__lte=upper)
+        aggregates[f'cooking_time_{index}'] = Count(
+            'pk', distinct=True, filter=condition
+        )
+    counts = recipes.aggregate(**aggregates)
+    facets = {}
+    if 'tags' in names:
+        facets['tags'] = [
+            {'slug': slug, 'count': counts[f'tag_{tag_id}']}
+            for tag_id, slug in tags
+        ]
+    if 'cooking_time' in names:
+        facets['cooking_time'] = [
+            {
+                'min': lower,
+                'max': upper,
+                'count': counts[f'cooking_time_{index}']
+            }
+            for index, (lower, upper) in enumerate(buckets)
+        ]
+    return facets
@@ -1,36 +1,68 @@
-from django_filters.filters import AllValuesMultipleFilter, NumberFilter
+from django_filters.filters import ModelMultipleChoiceFilter, NumberFilter
 from django_filters.rest_framework import FilterSet, filters
 
-from recipes.models import Ingredient, Recipe
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import search
 
 
 class IngredientFilter(FilterSet):
-    """FilterSet для выбора ингредиентов."""
-    name = filters.CharFilter(
-        field_name='name',
-        lookup_expr='istartswith'
-    )
+    """FilterSet для выбора ингредиентов: по началу названия и
+    нечётко, с опечатками и в другой форме слова."""
+    name = filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ('name',)
 
+    def filter_name(self, queryset, name, value):
+        return search(queryset, value)
+
 
 class RecipeFilter(FilterSet):
     """FilterSet для рецептов: по тегам, авторам,
     вхождению в избранное и в список покупок."""
-    tags = AllValuesMultipleFilter(field_name='tags__slug')
+    tags = ModelMultipleChoiceFilter(
+        field_name='tags__slug',
+        to_field_name='slug',
+        queryset=Tag.objects.all()
+    )
     author = NumberFilter(field_name='author__id')
+    name = filters.CharFilter(method='filter_name')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
     is_favorited = filters.BooleanFilter(
         method='filter_is_favorited'
     )
+    kcal_max = NumberFilter(field_name='kcal', lookup_expr='lte')
+    cooking_time__lte = NumberFilter(
+        field_name='cooking_time', lookup_expr='lte'
+    )
+    cooking_time__gte = NumberFilter(
+        field_name='cooking_time', lookup_expr='gte'
+    )
+    ordering = filters.ChoiceFilter(
+        choices=(('popular', 'Популярные'), ('trending', 'В тренде')),
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_in_shopping_cart', 'is_favorited')
+        fields = (
+            'tags',
+            'author',
+            'name',
+            'is_in_shopping_cart',
+            'is_favorited',
+            'kcal_max',
+            'cooking_time__lte',
+            'cooking_time__gte',
+            'ordering'
+        )
+
+    def filter_name(self, queryset, name, value):
+        """Нечёткий поиск по названию, от более похожих."""
+        return search(queryset, value)
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         """Метод фильтрации по вхождению в список покупок."""
@@ -45,3 +77,8 @@ class RecipeFilter(FilterSet):
         if not user.is_authenticated or not value:
             return queryset
         return queryset.filter(favorited__user=user)
+
+    def filter_ordering(self, queryset, name, value):
+        """Сортировка по популярности за всё время или за последние дни."""
+        score = 'popularity' if value == 'popular' else 'trending'
+        return queryset.order_by(f'-{score}', '-pub_date')
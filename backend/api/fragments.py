@@ -0,0 +1,185 @@
+"""Кэш общей для всех пользователей части рецептов.
+
+Теги, автор, ингредиенты, текст и изображение одинаковы для всех, поэтому
+хранятся в кэше по рецепту, а страница собирается одним get_many.
+Поля is_favorited, is_in_shopping_cart и author.is_subscribed
+накладываются поверх из одного запроса по наборам id пользователя.
+
+Запись хранится вместе с версией рецепта (recipe-version:{id}) и
+читается тем же get_many, что и версии: запись другой версии
+пересобирается. После фиксации транзакции, изменившей рецепт, его теги
+и ингредиенты или профиль автора (сигнал recipes_changed, см.
+recipes/catalog.py), версия заменяется новой. Запись, собранная по
+данным до фиксации и сохранённая позже, хранит старую версию и не
+используется, а изменение тега или ингредиента сбрасывает только
+рецепты с ним.
+
+Новая версия видна всем процессам только в общем кэше (CACHE_BACKEND,
+см. foodgram/settings.py); с LocMemCache записи хранятся не дольше
+LOCMEM_FRAGMENT_CACHE_SECONDS.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import IntegerField, Value
+
+from .sparse import AUTHOR_FIELDS, COLUMNS, get_ingredients, get_tags
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+FIELDS = (
+    'id',
+    'tags',
+    'author',
+    'ingredients',
+    'name',
+    'image',
+    'text',
+    'is_favorited',
+    'is_in_shopping_cart',
+    'cooking_time',
+    'servings',
+    'kcal',
+    'proteins',
+    'fats',
+    'carbohydrates',
+)
+
+FAVORITED, IN_SHOPPING_CART, SUBSCRIBED = range(3)
+
+
+def get_key(recipe_id):
+    return f'recipe-fragment:{recipe_id}'
+
+
+def get_version_key(recipe_id):
+    return f'recipe-version:{recipe_id}'
+
+
+def new_versions(recipe_ids):
+    versions = {pk: uuid4().hex for pk in recipe_ids}
+    cache.set_many(
+        {get_version_key(pk): version for pk, version in versions.items()},
+        None
+    )
+    return versions
+
+
+def build_fragments(ids):
+    """Общая часть рецептов ids: изображение - путь в хранилище,
+    автор - без is_subscribed."""
+    rows = list(
+        Recipe.objects.filter(id__in=ids).values(*COLUMNS, 'author_id')
+    )
+    tags = get_tags(ids, True)
+    ingredients = get_ingredients(ids, True)
+    authors = {
+        row['id']: row
+        for row in User.objects.filter(
+            id__in={row['author_id'] for row in rows}
+        ).values(*AUTHOR_FIELDS)
+    }
+    fragments = {}
+    for row in rows:
+        row['author'] = authors[row.pop('author_id')]
+        row['tags'] = tags.get(row['id'], [])
+        row['ingredients'] = ingredients.get(row['id'], [])
+        fragments[row['id']] = row
+    return fragments
+
+
+def get_fragments(ids):
+    keys = {pk: get_key(pk) for pk in ids}
+    version_keys = {pk: get_version_key(pk) for pk in ids}
+    cached = cache.get_many([*keys.values(), *version_keys.values()])
+    versions = {
+        pk: cached[key] for pk, key in version_keys.items() if key in cached
+    }
+    # Версия создаётся до сборки записи: запись по более старым данным
+    # не получит версию, выданную после изменения.
+    missing = [pk for pk in ids if pk not in versions]
+    if missing:
+        versions.update(new_versions(missing))
+    fragments = {}
+    for pk, key in keys.items():
+        version, fragment = cached.get(key, (None, None))
+        if version == versions[pk]:
+            fragments[pk] = fragment
+    missing = [pk for pk in ids if pk not in fragments]
+    if missing:
+        built = build_fragments(missing)
+        cache.set_many(
+            {
+                keys[pk]: (versions[pk], fragment)
+                for pk, fragment in built.items()
+            },
+            settings.RECIPE_FRAGMENT_CACHE_SECONDS
+        )
+        fragments.update(built)
+    return fragments
+
+
+def get_user_flags(user, recipe_ids, author_ids):
+    """Избранное, список покупок и подписки пользователя среди
+    recipe_ids и author_ids одним запросом."""
+    flags = {FAVORITED: set(), IN_SHOPPING_CART: set(), SUBSCRIBED: set()}
+    if not user.is_authenticated:
+        return flags
+    rows = Favorite.objects.filter(
+        user=user, recipe_id__in=recipe_ids
+    ).annotate(
+        kind=Value(FAVORITED, output_field=IntegerField())
+    ).order_by().values_list('kind', 'recipe_id').union(
+        ShoppingCart.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).annotate(
+            kind=Value(IN_SHOPPING_CART, output_field=IntegerField())
+        ).order_by().values_list('kind', 'recipe_id'),
+        Subscription.objects.filter(
+            user=user, author_id__in=author_ids
+        ).annotate(
+            kind=Value(SUBSCRIBED, output_field=IntegerField())
+        ).order_by().values_list('kind', 'author_id'),
+        all=True
+    )
+    for kind, pk in rows:
+        flags[kind].add(pk)
+    return flags
+
+
+def get_recipes(ids, request):
+    """Рецепты в порядке ids в формате RecipeListSerializer."""
+    fragments = get_fragments(ids)
+    ids = [pk for pk in ids if pk in fragments]
+    flags = get_user_flags(
+        request.user,
+        ids,
+        {fragments[pk]['author']['id'] for pk in ids}
+    )
+    results = []
+    for pk in ids:
+        fragment = fragments[pk]
+        recipe = dict(
+            fragment,
+            author=dict(
+                fragment['author'],
+                is_subscribed=fragment['author']['id'] in flags[SUBSCRIBED]
+            ),
+            image=request.build_absolute_uri(
+                default_storage.url(fragment['image'])
+            ) if fragment['image'] else None,
+            is_favorited=pk in flags[FAVORITED],
+            is_in_shopping_cart=pk in flags[IN_SHOPPING_CART],
+        )
+        results.append({name: recipe[name] for name in FIELDS})
+    return results
+
+
+def invalidate(recipe_ids):
+    """Меняет версии рецептов после фиксации текущей транзакции."""
+    recipe_ids = set(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(lambda: new_versions(recipe_ids))
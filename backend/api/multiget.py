@@ -0,0 +1,51 @@
+"""Получение рецептов по списку id.
+
+?ids=3,1,2 (не больше RECIPES_MAX_IDS) отдаёт вместо страницы списка
+рецепты в порядке запроса: {"results": [...], "missing": [...]}.
+Рецепты собираются так же, как страница списка (api/fragments.py, или
+api/sparse.py при ?fields и ?expand) - пачкой запросов на весь набор,
+а не запросом на каждый рецепт. В missing - id несуществующих и
+удалённых рецептов. Фильтры, фасеты и пагинация списка не применяются.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+from .fragments import get_recipes
+from .sparse import build_recipes
+
+
+def get_ids(request):
+    """Запрошенные id без повторов или None."""
+    value = request.GET.get('ids')
+    if value is None:
+        return None
+    values = [pk.strip() for pk in value.split(',') if pk.strip()]
+    ids = list(dict.fromkeys(int(pk) for pk in values if pk.isdigit()))
+    if (not ids or len(ids) > settings.RECIPES_MAX_IDS
+            or not all(pk.isdigit() for pk in values)):
+        raise ValidationError({'ids': (
+            f'Ожидается от 1 до {settings.RECIPES_MAX_IDS} '
+            'id рецептов через запятую.'
+        )})
+    return ids
+
+
+def get_by_ids(ids, shape, request):
+    """Рецепты ids в порядке запроса и id ненайденных."""
+    if shape is None:
+        results = get_recipes(ids, request)
+    else:
+        fields, expand = shape
+        # id нужен, чтобы найти отсутствующие рецепты.
+        results = build_recipes(
+            ids, [*fields, 'id'] if 'id' not in fields else fields,
+            expand, request
+        )
+    found = {recipe['id'] for recipe in results}
+    if shape is not None and 'id' not in shape[0]:
+        for recipe in results:
+            del recipe['id']
+    return {
+        'results': results,
+        'missing': [pk for pk in ids if pk not in found],
+    }
@@ -0,0 +1,287 @@
+import base64
+import binascii
+import json
+import re
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.utils.datastructures import MultiValueDict
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import DataAndFiles, JSONParser, MultiPartParser
+
+from .renderers import FastJSONRenderer, orjson
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = b' \t\r\n'
+DATA_URI = re.compile(rb'^data:(image/(\w+));base64$')
+BASE64_ESCAPES = re.compile(rb'\\[/nr]')
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Слишком большой запрос.'
+    default_code = 'payload_too_large'
+
+
+def loads(data):
+    try:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+    except ValueError as exc:
+        raise ParseError(f'JSON parse error - {exc}')
+
+
+def check_content_length(parser_context, limit):
+    """Отклоняет запрос по Content-Length, не читая тело."""
+    request = parser_context.get('request')
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except (AttributeError, ValueError):
+        length = 0
+    if length > limit:
+        raise PayloadTooLarge()
+
+
+class ParsedData(dict):
+    """Данные запроса, к которым DRF добавляет файлы через update().
+    Обычный dict.update() взял бы из MultiValueDict списки файлов."""
+
+    def copy(self):
+        return ParsedData(self)
+
+    def update(self, other):
+        super().update((key, other[key]) for key in other)
+
+
+class StreamedImageFile(TemporaryUploadedFile):
+    """Временный файл изображения из JSON. Хранилище перемещает его
+    при сохранении, поэтому закрывается он так же, как загруженные
+    через multipart: без ошибки об уже удалённом файле."""
+
+    def __del__(self):
+        self.close()
+
+
+class BoundedReader:
+    """Поток, который прерывает чтение после limit байт
+    (для запросов без Content-Length)."""
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.limit = limit
+        self.size = 0
+
+    def read(self, size=None):
+        # LimitedStream Django не понимает size=-1.
+        if size is None or size < 0:
+            data = self.stream.read()
+        else:
+            data = self.stream.read(size)
+        self.size += len(data)
+        if self.size > self.limit:
+            raise PayloadTooLarge()
+        return data
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser, который разбирает тело запроса через orjson.
+    Тело целиком читается в память, поэтому его размер ограничен
+    MAX_JSON_BODY_SIZE."""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        limit = settings.MAX_JSON_BODY_SIZE
+        if limit is not None:
+            check_content_length(parser_context, limit)
+            stream = BoundedReader(stream, limit)
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower() not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        return loads(stream.read())
+
+
+class KeyScanner:
+    """Побайтово ищет в JSON-объекте ключ верхнего уровня со
+    строковым значением и возвращает позицию начала этого значения."""
+
+    def __init__(self, key):
+        self.key = b'"' + key.encode() + b'"'
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.matched = False
+        self.colon = False
+
+    def feed(self, buffer, start):
+        for index in range(start, len(buffer)):
+            byte = buffer[index:index + 1]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif byte == b'\\':
+                    self.escape = True
+                elif byte == b'"':
+                    self.in_string = False
+                    self.matched = self.depth == 1 and (
+                        buffer[self.string_start:index + 1] == self.key
+                    )
+                continue
+            if self.matched:
+                if byte in WHITESPACE:
+                    continue
+                if byte == b':' and not self.colon:
+                    self.colon = True
+                    continue
+                if byte == b'"' and self.colon:
+                    return index + 1
+                self.matched = self.colon = False
+            if byte == b'"':
+                self.in_string = True
+                self.string_start = index
+            elif byte in b'{[':
+                self.depth += 1
+            elif byte in b'}]':
+                self.depth -= 1
+        return None
+
+
+class Base64FileSink:
+    """Декодирует data URI base64 по частям во временный файл."""
+
+    def __init__(self, field):
+        self.field = field
+        self.header = b''
+        self.rest = b''
+        self.file = None
+        self.size = 0
+
+    def write(self, data):
+        if self.file is None:
+            self.header += data
+            if b',' not in self.header:
+                if len(self.header) > 256:
+                    raise ParseError(f'{self.field}: ожидается data URI.')
+                return
+            self.header, data = self.header.split(b',', 1)
+            match = DATA_URI.match(self.header)
+            if match is None:
+                raise ParseError(f'{self.field}: ожидается data URI.')
+            self.file = StreamedImageFile(
+                'temp.' + match[2].decode(), match[1].decode(), 0, None
+            )
+        data = self.rest + data
+        usable = len(data) - len(data) % 4
+        self.rest = data[usable:]
+        self.decode(data[:usable])
+
+    def decode(self, data):
+        try:
+            decoded = base64.b64decode(data, validate=True)
+        except binascii.Error:
+            raise ParseError(f'{self.field}: некорректный base64.')
+        self.size += len(decoded)
+        if self.size > settings.MAX_IMAGE_SIZE:
+            raise PayloadTooLarge(f'{self.field}: слишком большой файл.')
+        self.file.write(decoded)
+
+    def close(self):
+        if self.file is None:
+            raise ParseError(f'{self.field}: ожидается data URI.')
+        if self.rest:
+            self.decode(self.rest)
+        self.file.size = self.size
+        self.file.seek(0)
+        return self.file
+
+
+def stream_string(reader, data, sink):
+    """Передаёт в sink содержимое JSON-строки, начало которой уже
+    прочитано в data. Возвращает байты после закрывающей кавычки."""
+    carry = b''
+    while True:
+        if not data:
+            data = reader.read(CHUNK_SIZE)
+            if not data:
+                raise ParseError('JSON parse error - unterminated string')
+        data = carry + data
+        carry = b''
+        end = data.find(b'"')
+        chunk, data = (data, b'') if end == -1 else (data[:end], data[end:])
+        if chunk.endswith(b'\\'):
+            if end != -1:
+                raise ParseError('JSON parse error - unexpected escape')
+            chunk, carry = chunk[:-1], b'\\'
+        if b'\\' in chunk:
+            chunk = BASE64_ESCAPES.sub(
+                lambda match: b'/' if match[0] == b'\\/' else b'', chunk
+            )
+            if b'\\' in chunk:
+                raise ParseError('JSON parse error - unexpected escape')
+        sink.write(chunk)
+        if end != -1:
+            return data[1:]
+
+
+class StreamingJSONParser(FastJSONParser):
+    """Разбирает JSON, сохраняя строку-изображение из поля
+    view.streaming_file_field во временный файл по мере чтения.
+    В памяти остаётся только JSON без изображения: MAX_JSON_BODY_SIZE
+    ограничивает его, а всё тело — MAX_REQUEST_BODY_SIZE."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        field = getattr(
+            parser_context.get('view'), 'streaming_file_field', None
+        )
+        if field is None:
+            return super().parse(stream, media_type, parser_context)
+        check_content_length(parser_context, settings.MAX_REQUEST_BODY_SIZE)
+        reader = BoundedReader(stream, settings.MAX_REQUEST_BODY_SIZE)
+        scanner = KeyScanner(field)
+        head = b''
+        while True:
+            data = reader.read(CHUNK_SIZE)
+            if not data:
+                return DataAndFiles(loads(head), MultiValueDict())
+            start = len(head)
+            head += data
+            value_start = scanner.feed(head, start)
+            if value_start is not None:
+                break
+            if (settings.MAX_JSON_BODY_SIZE is not None
+                    and len(head) > settings.MAX_JSON_BODY_SIZE):
+                raise PayloadTooLarge()
+        sink = Base64FileSink(field)
+        tail = stream_string(reader, head[value_start:], sink)
+        file = sink.close()
+        data = loads(
+            head[:value_start - 1] + b'null' + tail + reader.read()
+        )
+        return DataAndFiles(
+            ParsedData(data), MultiValueDict({field: [file]})
+        )
+
+
+class MultiPartJSONParser(MultiPartParser):
+    """MultiPartParser, в котором поля из view.multipart_json_fields
+    передаются строками JSON, а файлы пишутся во временные файлы."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        check_content_length(parser_context, settings.MAX_REQUEST_BODY_SIZE)
+        result = super().parse(stream, media_type, parser_context)
+        json_fields = getattr(
+            parser_context.get('view'), 'multipart_json_fields', ()
+        )
+        data = {}
+        for key in result.data:
+            value = result.data.get(key)
+            data[key] = loads(value) if key in json_fields else value
+        for file in result.files.values():
+            if file.size > settings.MAX_IMAGE_SIZE:
+                raise PayloadTooLarge(f'{file.name}: слишком большой файл.')
+        return DataAndFiles(ParsedData(data), result.files)
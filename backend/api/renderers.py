@@ -0,0 +1,32 @@
+"""JSON через orjson, если он установлен, иначе стандартный json DRF."""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data):
+    """Компактный JSON в байтах, как у JSONRenderer."""
+    if orjson is None:
+        return JSONRenderer().render(data)
+    # Как и JSONRenderer, экранирует U+2028 и U+2029 для совместимости
+    # с JavaScript.
+    return orjson.dumps(data, default=JSONEncoder().default).replace(
+        b'\xe2\x80\xa8', b'\\u2028'
+    ).replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer, который пишет компактный JSON через orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ) is not None:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        return dumps(data)
@@ -1,6 +1,8 @@
 import base64
 import webcolors
+from django.conf import settings
 from django.core.files.base import ContentFile
+from django.db import transaction
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
@@ -9,10 +11,13 @@ from recipes.models import (
     Ingredient,
     IngredientInRecipe,
     Favorite,
+    MealPlan,
     Recipe,
     ShoppingCart,
     Tag
 )
+from recipes import duplicates, nutrition
+from recipes.tasks import recalculate_nutrition
 from users.models import User, Subscription
 
 
@@ -79,6 +84,9 @@ class CustomUserSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, obj):
+        subscribed = self.context.get('subscribed')
+        if subscribed is not None:
+            return obj.id in subscribed
         request = self.context.get('request')
         if request:
             user = request.user
@@ -108,13 +116,30 @@ class RecipeListSerializer(serializers.ModelSerializer):
     author = CustomUserSerializer(many=False)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    servings = serializers.SerializerMethodField()
 
     def get_ingredients(self, obj):
-        return IngredientInRecipeSerializer(
+        ingredients = IngredientInRecipeSerializer(
             IngredientInRecipe.objects.filter(recipe=obj).all(), many=True
         ).data
+        servings = self.context.get('servings')
+        if servings and servings != obj.servings:
+            for ingredient in ingredients:
+                amount = round(
+                    ingredient['amount'] * servings / obj.servings, 2
+                )
+                ingredient['amount'] = (
+                    int(amount) if amount.is_integer() else amount
+                )
+        return ingredients
+
+    def get_servings(self, obj):
+        return self.context.get('servings') or obj.servings
 
     def get_is_favorited(self, obj):
+        favorited = self.context.get('favorited')
+        if favorited is not None:
+            return obj.id in favorited
         request = self.context.get('request')
         if request:
             user = request.user
@@ -125,6 +150,9 @@ class RecipeListSerializer(serializers.ModelSerializer):
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        in_shopping_cart = self.context.get('in_shopping_cart')
+        if in_shopping_cart is not None:
+            return obj.id in in_shopping_cart
         request = self.context.get('request')
         if request:
             user = request.user
@@ -146,8 +174,14 @@ class RecipeListSerializer(serializers.ModelSerializer):
             'text',
             'is_favorited',
             'is_in_shopping_cart',
-            'cooking_time'
+            'cooking_time',
+            'servings',
+            'kcal',
+            'proteins',
+            'fats',
+            'carbohydrates'
         )
+        read_only_fields = nutrition.NUTRIENTS
 
 
 class IngredientSelectInRecipeSerializer(serializers.ModelSerializer):
@@ -169,6 +203,10 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
     )
     image = Base64ImageField(required=False, allow_null=True)
     author = CustomUserSerializer(many=False, required=False)
+    # Опубликовать рецепт, несмотря на найденный похожий.
+    force = serializers.BooleanField(
+        write_only=True, required=False, default=False
+    )
 
     def validate(self, data):
         name = data.get('name')
@@ -191,19 +229,34 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             )
         ingredients_data = []
         for ingredient in ingredients:
-            if ingredient in ingredients_data:
+            if ingredient['id'] in ingredients_data:
                 raise ValidationError('Нельзя выбрать одинаковые ингредиенты.')
-            ingredients_data.append(ingredient)
+            ingredients_data.append(ingredient['id'])
         if not text:
             raise ValidationError('Добавьте описание приготовления рецепта.')
         if not image:
             raise ValidationError('Добавьте изображение.')
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags_data = validated_data.pop('tags')
+        force = validated_data.pop('force', False)
         author_data = self.context.get('request').user
+        signature = duplicates.get_signature(duplicates.get_features(
+            validated_data['text'],
+            [ingredient['id'].pk for ingredient in ingredients]
+        ))
+        similar = None if force else duplicates.find_similar(signature)
+        if similar:
+            original = similar[0][0]
+            raise ValidationError(
+                'Похожий рецепт уже опубликован: '
+                f'«{original.name}» (id {original.pk}). Чтобы всё равно '
+                'опубликовать рецепт, отправьте его с "force": true.',
+                code='duplicate'
+            )
         recipe = Recipe.objects.create(author=author_data, **validated_data)
         create_ingredients = [
             IngredientInRecipe(
@@ -217,11 +270,15 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             create_ingredients
         )
         recipe.tags.set(tags_data)
+        duplicates.save_signatures({recipe.id: signature})
+        recalculate_nutrition.delay([recipe.id], key=f'nutrition:{recipe.id}')
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags_data = validated_data.pop('tags')
+        validated_data.pop('force', False)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
@@ -240,9 +297,14 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             IngredientInRecipe.objects.bulk_create(
                 create_ingredients
             )
-        return super().update(instance, validated_data)
+        # Пищевую ценность и суммы планов питания пересчитывают задачи из
+        # recipes.signals: clear() отправляет m2m_changed.
+        duplicates.update_signatures([instance.id])
+        return instance
 
     def to_representation(self, value):
+        # Пищевая ценность пересчитывается фоновой задачей.
+        value.refresh_from_db(fields=nutrition.NUTRIENTS)
         return RecipeListSerializer(value).data
 
     class Meta:
@@ -256,6 +318,8 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             'image',
             'text',
             'cooking_time',
+            'servings',
+            'force',
         )
 
 
@@ -347,8 +411,28 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
     """Serializer для рецептов в списке покупок."""
 
     def to_representation(self, value):
-        return RecipeInFavoriteSubscriptionSerializer(value.recipe).data
+        data = RecipeInFavoriteSubscriptionSerializer(value.recipe).data
+        data['multiplier'] = value.multiplier
+        return data
 
     class Meta:
         model = ShoppingCart
-        fields = ('user', 'recipe')
+        fields = ('user', 'recipe', 'multiplier')
+
+
+class MealPlanSerializer(serializers.ModelSerializer):
+    """Serializer для записей плана питания."""
+    servings = serializers.IntegerField(
+        required=False,
+        min_value=settings.MIN_VALUE,
+        max_value=settings.MAX_SERVINGS
+    )
+
+    def validate(self, data):
+        if not data.get('servings') and data.get('recipe'):
+            data['servings'] = data['recipe'].servings
+        return data
+
+    class Meta:
+        model = MealPlan
+        fields = ('id', 'date', 'meal', 'recipe', 'servings')
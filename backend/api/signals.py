@@ -0,0 +1,49 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import events, fragments, tasks
+from foodgram import pubsub
+from recipes.catalog import recipes_changed
+from recipes.models import Favorite, Ingredient, Recipe, Tag
+from users.models import Subscription
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+def publish_snapshots(sender, **kwargs):
+    tasks.publish_snapshots.delay(key='publish_snapshots')
+
+
+@receiver(recipes_changed)
+def recipes_updated(sender, recipe_ids, **kwargs):
+    fragments.invalidate(recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    if created:
+        pubsub.publish({
+            'type': events.RECIPE,
+            'id': instance.pk,
+            'name': instance.name,
+            'author': instance.author_id,
+        })
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def favorites_changed(sender, instance, **kwargs):
+    pubsub.publish({'type': events.FAVORITES, 'recipe': instance.recipe_id})
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def subscription_changed(sender, instance, **kwargs):
+    pubsub.publish({
+        'type': events.SUBSCRIPTION,
+        'user': instance.user_id,
+        'author': instance.author_id,
+        'deleted': 'created' not in kwargs,
+    })
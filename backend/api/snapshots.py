@@ -0,0 +1,137 @@
+"""Статические снимки справочников для раздачи через nginx.
+
+publish() пишет в SNAPSHOT_ROOT каталог версии с tags.json,
+ingredients.json и файлами ingredients/<префикс>.json для автодополнения,
+рядом с каждым - заранее сжатые .gz (и .br, если установлен brotli).
+Версия - хэш содержимого, поэтому файлы внутри версии не меняются
+и отдаются с immutable. Ссылка current и manifest.json переключаются
+на новую версию атомарно.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+
+from .renderers import dumps
+from .serializers import IngredientSerializer, TagSerializer
+from foodgram.compression import compress, get_encodings
+from recipes.models import Ingredient, Tag
+
+CURRENT = 'current'
+MANIFEST = 'manifest.json'
+EXTENSIONS = {'gzip': '.gz', 'br': '.br'}
+
+
+def get_prefix(name):
+    return name[:settings.SNAPSHOT_PREFIX_LENGTH].lower().replace('/', ' ')
+
+
+def build_files():
+    """Содержимое файлов снимка: путь внутри версии -> JSON."""
+    tags = TagSerializer(Tag.objects.all(), many=True).data
+    ingredients = IngredientSerializer(
+        Ingredient.objects.all(), many=True
+    ).data
+    shards = defaultdict(list)
+    for ingredient in ingredients:
+        shards[get_prefix(ingredient['name'])].append(ingredient)
+    files = {
+        'tags.json': dumps(tags),
+        'ingredients.json': dumps(ingredients),
+    }
+    for prefix, items in shards.items():
+        files[f'ingredients/{prefix}.json'] = dumps(items)
+    return files, sorted(shards)
+
+
+def get_version(files):
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        digest.update(path.encode())
+        digest.update(files[path])
+    return digest.hexdigest()[:16]
+
+
+def write_version(root, version, files):
+    """Пишет каталог версии во временный каталог и переименовывает."""
+    target = root / version
+    if target.is_dir():
+        return
+    tmp = Path(tempfile.mkdtemp(prefix='.tmp-', dir=root))
+    try:
+        (tmp / 'ingredients').mkdir()
+        for path, body in files.items():
+            (tmp / path).write_bytes(body)
+            for encoding in get_encodings():
+                (tmp / (path + EXTENSIONS[encoding])).write_bytes(
+                    compress(body, encoding, best=True)
+                )
+        tmp.chmod(0o755)
+        os.rename(tmp, target)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        # Ту же версию мог одновременно опубликовать другой процесс.
+        if not target.is_dir():
+            raise
+
+
+def replace_file(path, body):
+    fd, tmp = tempfile.mkstemp(prefix='.tmp-', dir=path.parent)
+    with os.fdopen(fd, 'wb') as file:
+        file.write(body)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def switch_current(root, version):
+    tmp = root / f'.{CURRENT}-{version}'
+    if tmp.is_symlink():
+        tmp.unlink()
+    tmp.symlink_to(version, target_is_directory=True)
+    os.replace(tmp, root / CURRENT)
+
+
+def remove_old_versions(root, version):
+    versions = sorted(
+        (
+            path for path in root.iterdir()
+            if path.is_dir() and not path.is_symlink()
+            and not path.name.startswith('.') and path.name != version
+        ),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True
+    )
+    for path in versions[settings.SNAPSHOT_KEEP_VERSIONS - 1:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def publish(root=None):
+    """Публикует снимок справочников и возвращает его версию.
+    Без SNAPSHOT_ROOT ничего не делает."""
+    root = root or settings.SNAPSHOT_ROOT
+    if not root:
+        return None
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    files, prefixes = build_files()
+    version = get_version(files)
+    write_version(root, version, files)
+    switch_current(root, version)
+    base = f'{settings.SNAPSHOT_URL}{version}/'
+    replace_file(root / MANIFEST, dumps({
+        'version': version,
+        'tags': base + 'tags.json',
+        'ingredients': base + 'ingredients.json',
+        'ingredient_prefix_length': settings.SNAPSHOT_PREFIX_LENGTH,
+        'ingredient_prefixes': {
+            prefix: f'{base}ingredients/{quote(prefix, safe="")}.json'
+            for prefix in prefixes
+        },
+    }))
+    remove_old_versions(root, version)
+    return version
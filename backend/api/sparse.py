@@ -0,0 +1,182 @@
+"""Компактное представление списка рецептов.
+
+?fields=id,name,image,cooking_time оставляет в ответе только указанные
+поля, ?expand=author,tags,ingredients разворачивает связанные объекты
+(без expand вместо них отдаются id). Ответ собирается из строк .values()
+без сериализаторов DRF, а запросы к связанным таблицам выполняются
+только для запрошенных полей.
+"""
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from rest_framework.exceptions import ValidationError
+
+from recipes.models import (
+    Favorite,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart
+)
+from users.models import Subscription, User
+
+COLUMNS = (
+    'id',
+    'name',
+    'image',
+    'text',
+    'cooking_time',
+    'servings',
+    'kcal',
+    'proteins',
+    'fats',
+    'carbohydrates',
+)
+RELATIONS = ('author', 'tags', 'ingredients')
+FLAGS = {
+    'is_favorited': Favorite,
+    'is_in_shopping_cart': ShoppingCart,
+}
+FIELDS = COLUMNS + RELATIONS + tuple(FLAGS)
+
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+
+
+def parse_list(request, param, allowed):
+    value = request.GET.get(param)
+    if value is None:
+        return None
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = sorted(set(names) - set(allowed))
+    if unknown:
+        raise ValidationError(
+            {param: f'Неизвестные поля: {", ".join(unknown)}.'}
+        )
+    return names
+
+
+def get_shape(request):
+    """Запрошенные поля и развёрнутые связи или None для полного ответа."""
+    fields = parse_list(request, 'fields', FIELDS)
+    expand = parse_list(request, 'expand', RELATIONS)
+    if fields is None and expand is None:
+        return None
+    fields = list(fields or FIELDS)
+    for name in expand or ():
+        if name not in fields:
+            fields.append(name)
+    return fields, set(expand or ())
+
+
+def get_tags(ids, expand):
+    tags = defaultdict(list)
+    # В порядке Tag.Meta.ordering, как в TagSerializer.
+    through = Recipe.tags.through.objects.filter(
+        recipe_id__in=ids
+    ).order_by('tag__name')
+    if not expand:
+        for recipe_id, tag_id in through.values_list('recipe_id', 'tag_id'):
+            tags[recipe_id].append(tag_id)
+        return tags
+    for row in through.values(
+        'recipe_id', 'tag_id', 'tag__name', 'tag__color', 'tag__slug'
+    ):
+        tags[row['recipe_id']].append({
+            'id': row['tag_id'],
+            'name': row['tag__name'],
+            'color': row['tag__color'],
+            'slug': row['tag__slug'],
+        })
+    return tags
+
+
+def get_ingredients(ids, expand):
+    ingredients = defaultdict(list)
+    queryset = IngredientInRecipe.objects.filter(recipe_id__in=ids)
+    if not expand:
+        for recipe_id, ingredient_id in queryset.values_list(
+            'recipe_id', 'ingredient_id'
+        ):
+            ingredients[recipe_id].append(ingredient_id)
+        return ingredients
+    for row in queryset.values(
+        'recipe_id',
+        'amount',
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'ingredient_id'
+    ):
+        ingredients[row['recipe_id']].append({
+            'amount': row['amount'],
+            'name': row['ingredient__name'],
+            'measurement_unit': row['ingredient__measurement_unit'],
+            'id': row['ingredient_id'],
+        })
+    return ingredients
+
+
+def get_authors(author_ids, user):
+    authors = {
+        row['id']: dict(row, is_subscribed=False)
+        for row in User.objects.filter(id__in=author_ids).values(
+            *AUTHOR_FIELDS
+        )
+    }
+    if user.is_authenticated:
+        for author_id in Subscription.objects.filter(
+            user=user, author_id__in=author_ids
+        ).values_list('author_id', flat=True):
+            authors[author_id]['is_subscribed'] = True
+    return authors
+
+
+def get_user_recipes(model, user, ids):
+    if not user.is_authenticated:
+        return set()
+    return set(model.objects.filter(
+        user=user, recipe_id__in=ids
+    ).values_list('recipe_id', flat=True))
+
+
+def build_recipes(ids, fields, expand, request):
+    """Список словарей рецептов в порядке ids."""
+    columns = [name for name in COLUMNS if name in fields]
+    if 'author' in fields:
+        columns.append('author_id')
+    rows = {
+        row['id']: row
+        for row in Recipe.objects.filter(id__in=ids).values('id', *columns)
+    }
+    rows = [rows[pk] for pk in ids if pk in rows]
+    ids = [row['id'] for row in rows]
+    user = request.user
+    related = {}
+    if 'tags' in fields:
+        related['tags'] = get_tags(ids, 'tags' in expand)
+    if 'ingredients' in fields:
+        related['ingredients'] = get_ingredients(
+            ids, 'ingredients' in expand
+        )
+    flags = {
+        name: get_user_recipes(model, user, ids)
+        for name, model in FLAGS.items() if name in fields
+    }
+    authors = None
+    if 'author' in expand:
+        authors = get_authors({row['author_id'] for row in rows}, user)
+    results = []
+    for row in rows:
+        if 'image' in row:
+            row['image'] = request.build_absolute_uri(
+                default_storage.url(row['image'])
+            ) if row['image'] else None
+        if 'author' in fields:
+            author_id = row.pop('author_id')
+            row['author'] = (
+                author_id if authors is None else authors[author_id]
+            )
+        for name, values in related.items():
+            row[name] = values.get(row['id'], [])
+        for name, recipe_ids in flags.items():
+            row[name] = row['id'] in recipe_ids
+        results.append({name: row[name] for name in fields})
+    return results
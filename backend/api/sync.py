@@ -0,0 +1,83 @@
+"""Ответ GET /api/sync/ по журналу изменений (recipes/changelog.py).
+
+Журнал сообщает только, какие объекты изменились, а их состояние
+читается на момент запроса: изменённые рецепты отдаются целиком в
+формате списка рецептов, удалённые - списком id. Для избранного,
+списка покупок и подписок отдаются добавленные и убранные id; записи
+об удалённых рецептах клиент убирает по deleted_recipes.
+"""
+from .fragments import get_recipes
+from recipes import changelog
+from recipes.models import ChangeLog, Favorite, ShoppingCart
+from users.models import Subscription
+
+
+def split(changes):
+    added = [pk for pk, deleted in changes.items() if not deleted]
+    return added, [pk for pk, deleted in changes.items() if deleted]
+
+
+def get_user_changes(changes, queryset, field):
+    added, removed = split(changes)
+    current = set(queryset.filter(
+        **{f'{field}__in': added}
+    ).values_list(field, flat=True)) if added else set()
+    return {
+        'added': sorted(current),
+        'removed': sorted(
+            set(removed) | {pk for pk in added if pk not in current}
+        ),
+    }
+
+
+def get_shopping_cart_changes(user, changes):
+    added, removed = split(changes)
+    multipliers = dict(ShoppingCart.objects.filter(
+        user=user, recipe_id__in=added, recipe__deleted__isnull=True
+    ).values_list('recipe_id', 'multiplier')) if added else {}
+    return {
+        'added': [
+            {'id': pk, 'multiplier': multipliers[pk]}
+            for pk in sorted(multipliers)
+        ],
+        'removed': sorted(
+            set(removed) | {pk for pk in added if pk not in multipliers}
+        ),
+    }
+
+
+def get_sync(request, since):
+    user = request.user
+    token, has_more, changes = changelog.get_changes(user, since)
+    changed, deleted = split(changes[ChangeLog.RECIPE])
+    recipes = get_recipes(sorted(changed), request) if changed else []
+    # Рецепт мог быть удалён после записи об изменении.
+    found = {recipe['id'] for recipe in recipes}
+    deleted = sorted(set(deleted) | {pk for pk in changed if pk not in found})
+    data = {
+        'next': str(token),
+        'has_more': has_more,
+        'recipes': recipes,
+        'deleted_recipes': deleted,
+    }
+    if user.is_authenticated:
+        data.update(
+            favorites=get_user_changes(
+                changes[ChangeLog.FAVORITE],
+                Favorite.objects.filter(
+                    user=user, recipe__deleted__isnull=True
+                ),
+                'recipe_id'
+            ),
+            shopping_cart=get_shopping_cart_changes(
+                user, changes[ChangeLog.SHOPPING_CART]
+            ),
+            subscriptions=get_user_changes(
+                changes[ChangeLog.SUBSCRIPTION],
+                Subscription.objects.filter(
+                    user=user, author__deleted__isnull=True
+                ),
+                'author_id'
+            ),
+        )
+    return data
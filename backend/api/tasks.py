@@ -0,0 +1,7 @@
+from . import snapshots
+from tasks.registry import task
+
+
+@task()
+def publish_snapshots():
+    snapshots.publish()
@@ -0,0 +1,83 @@
+from unittest import mock
+
+from rest_framework.authtoken.models import Token
+
+from django.test import (
+    AsyncClient,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings
+)
+
+from foodgram.db import run
+from recipes.models import Favorite
+from recipes.tests.factories import create_recipe, create_user
+
+
+class RunTest(SimpleTestCase):
+
+    async def test_closes_old_connections(self):
+        with mock.patch('foodgram.db.close_old_connections') as close:
+            self.assertEqual(await run(lambda value: value + 1)(1), 2)
+        self.assertEqual(close.call_count, 2)
+
+
+@override_settings(ROOT_URLCONF='foodgram.urls_asgi')
+class AsyncViewsTest(TransactionTestCase):
+    """Запросы из пула потоков идут в других соединениях, поэтому
+    данные должны быть зафиксированы. AsyncClient Django 3.2 не передаёт
+    data в строку запроса, она указывается в пути, а заголовки
+    передаются без префикса HTTP_."""
+
+    def setUp(self):
+        self.recipe = create_recipe()
+        self.client = AsyncClient()
+
+    async def test_recipe_list(self):
+        response = await self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(
+            [recipe['id'] for recipe in data['results']], [self.recipe.pk]
+        )
+
+    async def test_not_found_is_json(self):
+        for path in (
+            f'/api/recipes/{self.recipe.pk + 1}/',
+            '/api/recipes/?page=x',
+            '/api/recipes/?page=2',
+        ):
+            with self.subTest(path=path):
+                response = await self.client.get(path)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
+
+    async def test_authentication(self):
+        user = await run(create_user)()
+        token = await run(Token.objects.create)(user=user)
+        await run(Favorite.objects.create)(user=user, recipe=self.recipe)
+        response = await self.client.get(
+            f'/api/recipes/{self.recipe.pk}/',
+            authorization=f'Token {token.key}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_favorited'])
+        response = await self.client.get(
+            '/api/recipes/', authorization='Token wrong'
+        )
+        self.assertEqual(response.status_code, 401)
+        response = await self.client.get(
+            '/api/recipes/download_shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_invalid_params(self):
+        for path in (
+            '/api/recipes/?ids=x',
+            '/api/recipes/?cooking_time__lte=x',
+        ):
+            with self.subTest(path=path):
+                response = await self.client.get(path)
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,48 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from api import fragments
+from recipes.models import Recipe
+from recipes.tests.factories import create_recipe, create_tag
+
+
+class FragmentsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.tag = create_tag(name='Завтрак')
+        self.recipe = create_recipe(tags=[self.tag])
+        self.other = create_recipe()
+
+    def get_name(self, recipe):
+        return fragments.get_fragments([recipe.pk])[recipe.pk]['name']
+
+    def test_stale_fragment_is_ignored(self):
+        stale = fragments.build_fragments([self.recipe.pk])
+        fragments.get_fragments([self.recipe.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.filter(pk=self.recipe.pk).update(name='Новое')
+            fragments.invalidate([self.recipe.pk])
+        # Запись по данным до изменения сохранена после invalidate.
+        version = cache.get(fragments.get_version_key(self.recipe.pk))
+        self.assertNotEqual(
+            version, cache.get(fragments.get_key(self.recipe.pk))[0]
+        )
+        cache.set(
+            fragments.get_key(self.recipe.pk),
+            ('old', stale[self.recipe.pk])
+        )
+        self.assertEqual(self.get_name(self.recipe), 'Новое')
+
+    def test_tag_change_refreshes_its_recipes(self):
+        fragments.get_fragments([self.recipe.pk, self.other.pk])
+        other_version = cache.get(fragments.get_version_key(self.other.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = 'Ужин'
+            self.tag.save()
+        recipe = fragments.get_fragments([self.recipe.pk])[self.recipe.pk]
+        self.assertEqual(recipe['tags'][0]['name'], 'Ужин')
+        self.assertEqual(
+            cache.get(fragments.get_version_key(self.other.pk)),
+            other_version
+        )
@@ -0,0 +1,134 @@
+import base64
+import json
+import shutil
+import tempfile
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from foodgram.limits import limit_body
+from recipes.models import Recipe
+from recipes.tests.factories import create_ingredient, create_tag, create_user
+
+# Прозрачный PNG 1x1.
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk'
+    '+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeParserTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+        self.ingredient = create_ingredient()
+        self.tag = create_tag()
+
+    def post(self, image=PNG):
+        return self.client.post('/api/recipes/', json.dumps({
+            'name': 'Оладьи',
+            'text': 'Смешать и пожарить.',
+            'cooking_time': 20,
+            'tags': [self.tag.pk],
+            'ingredients': [{'id': self.ingredient.pk, 'amount': 100}],
+            'image': 'data:image/png;base64,' + base64.b64encode(
+                image
+            ).decode(),
+        }), content_type='application/json')
+
+    def test_streamed_image(self):
+        response = self.post()
+        self.assertEqual(response.status_code, 201, response.content)
+        recipe = Recipe.objects.get()
+        self.assertEqual(recipe.image.read(), PNG)
+
+    @override_settings(MAX_IMAGE_SIZE=len(PNG) - 1)
+    def test_image_too_large(self):
+        self.assertEqual(self.post().status_code, 413)
+        self.assertFalse(Recipe.objects.exists())
+
+    @override_settings(MAX_REQUEST_BODY_SIZE=100)
+    def test_body_too_large(self):
+        self.assertEqual(self.post().status_code, 413)
+
+    @override_settings(MAX_JSON_BODY_SIZE=200)
+    def test_streamed_image_ignores_json_limit(self):
+        response = self.post(PNG * 10)
+        self.assertEqual(response.status_code, 201, response.content)
+
+
+class JSONBodyLimitTest(TestCase):
+
+    def post(self, size):
+        body = json.dumps({'email': 'cook@example.com'})
+        body += ' ' * (size - len(body))
+        return APIClient().post(
+            '/api/users/', body, content_type='application/json'
+        )
+
+    @override_settings(MAX_JSON_BODY_SIZE=100)
+    def test_at_limit(self):
+        self.assertEqual(self.post(100).status_code, 400)
+
+    @override_settings(MAX_JSON_BODY_SIZE=100)
+    def test_over_limit(self):
+        self.assertEqual(self.post(101).status_code, 413)
+
+
+class ASGIBodyLimitTest(TestCase):
+
+    def run_app(self, headers, chunks):
+        received, sent = [], []
+        messages = [
+            {'type': 'http.request', 'body': chunk, 'more_body': True}
+            for chunk in chunks
+        ] + [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def application(scope, receive, send):
+            while True:
+                message = await receive()
+                received.append(message)
+                if (message['type'] == 'http.disconnect'
+                        or not message.get('more_body')):
+                    return
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        async_to_sync(limit_body(application))(
+            {'type': 'http', 'headers': headers}, receive, send
+        )
+        return received, sent
+
+    @override_settings(MAX_REQUEST_BODY_SIZE=10)
+    def test_content_length(self):
+        received, sent = self.run_app([(b'content-length', b'11')], [])
+        self.assertEqual(received, [])
+        self.assertEqual(sent[0]['status'], 413)
+
+    @override_settings(MAX_REQUEST_BODY_SIZE=10)
+    def test_streamed_chunks(self):
+        received, sent = self.run_app([], [b'x' * 6, b'x' * 6, b'x'])
+        self.assertEqual(received[-1], {'type': 'http.disconnect'})
+        self.assertEqual(len(received), 2)
+        self.assertEqual(sent[0]['status'], 413)
+
+    @override_settings(MAX_REQUEST_BODY_SIZE=10)
+    def test_small_body(self):
+        received, sent = self.run_app([(b'content-length', b'10')], [b'x'])
+        self.assertEqual(sent, [])
+        self.assertEqual(len(received), 2)
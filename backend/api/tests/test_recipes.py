@@ -0,0 +1,49 @@
+import base64
+import json
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .test_parsers import PNG
+from recipes.models import Recipe
+from recipes.tests.factories import create_ingredient, create_tag, create_user
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DuplicateRecipeTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+        self.ingredient = create_ingredient()
+        self.tag = create_tag()
+
+    def post(self, name, **extra):
+        return self.client.post('/api/recipes/', json.dumps({
+            'name': name,
+            'text': 'Смешать муку с молоком и пожарить тонкие блины.',
+            'cooking_time': 20,
+            'tags': [self.tag.pk],
+            'ingredients': [{'id': self.ingredient.pk, 'amount': 100}],
+            'image': 'data:image/png;base64,' + base64.b64encode(
+                PNG
+            ).decode(),
+            **extra,
+        }), content_type='application/json')
+
+    def test_renamed_repost_needs_force(self):
+        self.assertEqual(self.post('Блины').status_code, 201)
+        response = self.post('Блинчики')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('force', str(response.data))
+        self.assertEqual(self.post('Блинчики', force=True).status_code, 201)
+        self.assertEqual(Recipe.objects.count(), 2)
@@ -0,0 +1,89 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import (
+    AsyncClient,
+    TestCase,
+    TransactionTestCase,
+    override_settings
+)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram.db import run
+from recipes.tests.factories import create_recipe, create_user
+
+
+@mock.patch('foodgram.routers.get_replicas', lambda: ['default'])
+class ReplicaRoutingTest(TestCase):
+    """Реплика выбирается через random.choice только для действий из
+    replica_actions."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.recipe = create_recipe()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def reads_replica(self, url, client=None):
+        with mock.patch(
+            'foodgram.routers.random.choice', side_effect=lambda seq: seq[0]
+        ) as choice:
+            response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200)
+        return choice.called
+
+    def test_opted_in_actions(self):
+        self.assertTrue(self.reads_replica('/api/recipes/'))
+        self.assertTrue(
+            self.reads_replica(f'/api/recipes/{self.recipe.pk}/')
+        )
+        self.assertTrue(self.reads_replica('/api/users/'))
+
+    def test_other_actions_read_primary(self):
+        self.assertFalse(self.reads_replica('/api/users/me/'))
+        self.assertFalse(self.reads_replica('/api/users/subscriptions/'))
+
+    def test_pin_after_write(self):
+        response = self.client.post(
+            f'/api/recipes/{self.recipe.pk}/favorite/'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(self.reads_replica('/api/recipes/'))
+        other = APIClient()
+        other.force_authenticate(create_user())
+        self.assertTrue(self.reads_replica('/api/recipes/', other))
+
+
+@mock.patch('foodgram.routers.get_replicas', lambda: ['default'])
+@override_settings(ROOT_URLCONF='foodgram.urls_asgi')
+class AsyncReplicaRoutingTest(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.recipe = create_recipe()
+        self.client = AsyncClient()
+
+    async def reads_replica(self, url):
+        with mock.patch(
+            'foodgram.routers.random.choice', side_effect=lambda seq: seq[0]
+        ) as choice:
+            response = await self.client.get(
+                url, authorization=f'Token {self.token.key}'
+            )
+        self.assertEqual(response.status_code, 200)
+        return choice.called
+
+    async def test_async_views(self):
+        self.assertTrue(await self.reads_replica('/api/recipes/'))
+        self.assertTrue(
+            await self.reads_replica(f'/api/recipes/{self.recipe.pk}/')
+        )
+        self.assertFalse(
+            await self.reads_replica('/api/recipes/download_shopping_cart/')
+        )
+        await run(cache.set)(f'db-pin:user:{self.user.pk}', True)
+        self.assertFalse(await self.reads_replica('/api/recipes/'))
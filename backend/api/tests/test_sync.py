@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import ChangeLog, ChangeLogHorizon, Favorite
+from recipes.tests.factories import create_recipe, create_user
+
+
+class SyncTest(TestCase):
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def settle(self):
+        ChangeLog.objects.update(
+            created=timezone.now() - timedelta(minutes=1)
+        )
+
+    def sync(self, since=None):
+        query = '' if since is None else f'?since={since}'
+        response = self.client.get(f'/api/sync/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_token_skips_unsettled_changes(self):
+        token = self.sync()['next']
+        recipe = create_recipe()
+        data = self.sync(token)
+        self.assertEqual(
+            [item['id'] for item in data['recipes']], [recipe.pk]
+        )
+        # Строка моложе SYNC_SETTLE_SECONDS: токен не продвигается.
+        self.assertEqual(data['next'], token)
+        self.settle()
+        token = self.sync(token)['next']
+        self.assertEqual(self.sync()['next'], token)
+        self.assertEqual(self.sync(token)['recipes'], [])
+
+    def test_user_changes(self):
+        recipe = create_recipe()
+        self.settle()
+        token = self.sync()['next']
+        Favorite.objects.create(user=self.user, recipe=recipe)
+        data = self.sync(token)
+        self.assertEqual(
+            data['favorites'], {'added': [recipe.pk], 'removed': []}
+        )
+        other = APIClient()
+        other.force_authenticate(create_user())
+        self.assertEqual(
+            other.get(f'/api/sync/?since={token}').json()['favorites'],
+            {'added': [], 'removed': []}
+        )
+
+    def test_invalid_and_expired_tokens(self):
+        self.assertEqual(
+            self.client.get('/api/sync/?since=abc').status_code, 400
+        )
+        ChangeLogHorizon.objects.create(pk=1, seq=10)
+        self.assertEqual(
+            self.client.get('/api/sync/?since=9').status_code, 410
+        )
+        self.assertEqual(self.sync()['next'], '10')
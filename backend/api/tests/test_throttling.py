@@ -0,0 +1,60 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase
+
+from api.throttling import TokenBucketThrottle
+
+
+class Throttle(TokenBucketThrottle):
+    now = 1000.0
+
+    def timer(self):
+        return self.now
+
+    def get_rate(self, scope):
+        return '3/m'
+
+
+class TokenBucketThrottleTest(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/')
+        self.request.user = AnonymousUser()
+
+    def consume(self, now):
+        throttle = Throttle()
+        throttle.now = now
+        return throttle.consume(self.request, 'test'), throttle.wait()
+
+    def test_capacity_and_refill(self):
+        for _ in range(3):
+            self.assertEqual(self.consume(1000), (True, None))
+        allowed, wait = self.consume(1000)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 20)
+        # Отказы не отодвигают пополнение.
+        self.assertFalse(self.consume(1010)[0])
+        self.assertTrue(self.consume(1020)[0])
+        self.assertFalse(self.consume(1020)[0])
+
+    def test_full_after_idle(self):
+        for _ in range(3):
+            self.consume(1000)
+        self.assertFalse(self.consume(1000)[0])
+        # Ключ истекает, когда корзина наполнилась; время кэша не
+        # подменяется, поэтому истечение - через clear.
+        cache.clear()
+        for _ in range(3):
+            self.assertTrue(self.consume(2000)[0])
+        self.assertFalse(self.consume(2000)[0])
+
+    def test_stale_key(self):
+        for _ in range(3):
+            self.consume(1000)
+        # Ключ ещё в кэше, но корзина давно полная.
+        for _ in range(3):
+            self.assertTrue(self.consume(5000)[0])
+        allowed, wait = self.consume(5000)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 20)
@@ -0,0 +1,207 @@
+"""Ограничение частоты и параллельности дорогих запросов.
+
+Области (scope) назначаются действиям ViewSet через throttle_scopes.
+Частоты задаются в REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']: ключ scope -
+на пользователя (анонимы - по IP), scope_ip - на IP. Лимиты одновременно
+выполняющихся запросов - в REST_FRAMEWORK['CONCURRENCY_LIMITS'].
+Состояние хранится в кэше REST_FRAMEWORK['THROTTLE_CACHE'], в
+продакшене это должен быть общий для всех воркеров кэш.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def get_cache():
+    return caches[settings.REST_FRAMEWORK.get('THROTTLE_CACHE', 'default')]
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 10 / 60): ёмкость и пополнение в секунду."""
+    if rate is None:
+        return None
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / DURATIONS[period[0]]
+
+
+def get_timeout(milliseconds):
+    """Время жизни ключа корзины: пока она не наполнится, с запасом."""
+    return math.ceil(milliseconds / 1000) + 1
+
+
+def get_scope(view):
+    return getattr(view, 'throttle_scopes', {}).get(
+        getattr(view, 'action', None)
+    )
+
+
+class ServiceOverloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервис перегружен, повторите запрос позже.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Корзина токенов: ёмкость N запросов, пополнение N за период.
+
+    Корзина хранится в кэше одним числом (GCRA): моментом в мс, когда
+    она снова будет полной. Запрос сдвигает его атомарным incr на
+    интервал пополнения одного токена, отказ возвращает сдвиг decr,
+    поэтому параллельные запросы не перезаписывают друг друга. Ключ
+    живёт, пока корзина не наполнится, после этого add начинает её
+    заново; если ключ пережил этот момент, значение сбрасывается
+    к текущему времени."""
+    cache = None
+    timer = time.time
+    rate_suffix = ''
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def get_rate(self, scope):
+        return settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {}).get(
+            scope + self.rate_suffix
+        )
+
+    def allow_request(self, request, view):
+        return self.consume(request, get_scope(view))
+
+    def consume(self, request, scope):
+        """Забирает токен из корзины scope, False - если корзина пуста."""
+        rate = parse_rate(self.get_rate(scope)) if scope else None
+        if rate is None:
+            return True
+        capacity, refill = rate
+        cache = self.cache or get_cache()
+        key = 'throttle:{}{}:{}'.format(
+            scope, self.rate_suffix, self.get_ident_key(request)
+        )
+        now = int(self.timer() * 1000)
+        interval = math.ceil(1000 / refill)
+        if cache.add(key, now + interval, get_timeout(interval)):
+            return True
+        try:
+            full_at = cache.incr(key, interval)
+        except ValueError:
+            # Ключ истёк между add и incr.
+            cache.add(key, now + interval, get_timeout(interval))
+            return True
+        if full_at - interval < now:
+            # Корзина наполнилась раньше, чем истёк ключ: отсчёт
+            # начинается с текущего момента, а не со старого значения.
+            full_at = now + interval
+            cache.set(key, full_at, get_timeout(interval))
+            return True
+        if full_at - now > capacity * interval:
+            cache.decr(key, interval)
+            self.wait_seconds = (full_at - now - capacity * interval) / 1000
+            return False
+        cache.touch(key, get_timeout(full_at - now))
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Лимит на пользователя (для анонимов - на IP)."""
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Лимит на IP независимо от пользователя."""
+    rate_suffix = '_ip'
+
+    def get_ident_key(self, request):
+        return f'ip:{self.get_ident(request)}'
+
+
+class ConcurrencyLimit:
+    """Счётчики выполняющихся запросов: всего по scope и на
+    пользователя. При превышении - 503 или 429 с Retry-After."""
+
+    def __init__(self, scope, request):
+        self.scope = scope
+        self.request = request
+        self.acquired = []
+
+    def get_limits(self):
+        return settings.REST_FRAMEWORK.get('CONCURRENCY_LIMITS', {}).get(
+            self.scope, {}
+        )
+
+    def acquire(self):
+        limits = self.get_limits()
+        user = self.request.user
+        keys = [('total', f'inflight:{self.scope}', ServiceOverloaded)]
+        if user and user.is_authenticated:
+            keys.append(
+                ('user', f'inflight:{self.scope}:{user.pk}', Throttled)
+            )
+        cache = get_cache()
+        timeout = settings.REST_FRAMEWORK.get('CONCURRENCY_TIMEOUT', 60)
+        wait = settings.REST_FRAMEWORK.get('CONCURRENCY_RETRY_AFTER', 1)
+        for name, key, exception in keys:
+            limit = limits.get(name)
+            if limit is None:
+                continue
+            cache.add(key, 0, timeout)
+            self.acquired.append(key)
+            try:
+                count = cache.incr(key)
+            except ValueError:
+                count = 1
+                cache.set(key, count, timeout)
+            if count > limit:
+                self.release()
+                raise exception(wait=wait)
+
+    def release(self):
+        cache = get_cache()
+        while self.acquired:
+            try:
+                cache.decr(self.acquired.pop())
+            except ValueError:
+                # Счётчик истёк по CONCURRENCY_TIMEOUT.
+                pass
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+class ConcurrencyLimitMixin:
+    """Ограничивает число одновременных запросов к действиям ViewSet
+    из throttle_scopes."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        scope = get_scope(self)
+        if scope:
+            self.concurrency_limit = ConcurrencyLimit(scope, request)
+            self.concurrency_limit.acquire()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        limit = getattr(self, 'concurrency_limit', None)
+        if limit is not None:
+            limit.release()
+        return super().finalize_response(request, response, *args, **kwargs)
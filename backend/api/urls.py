@@ -2,10 +2,14 @@ from django.conf.urls import url
 from django.urls import include
 from rest_framework import routers
 
+from tasks.views import TaskMetricsView
+
 from .views import (
     CustomUserViewSet,
     IngredientViewSet,
+    MealPlanViewSet,
     RecipesViewSet,
+    SyncView,
     TagViewSet
 )
 
@@ -17,10 +21,13 @@ router_v1 = routers.DefaultRouter()
 
 router_v1.register(r'users', CustomUserViewSet, basename='users')
 router_v1.register(r'ingredients', IngredientViewSet)
+router_v1.register(r'meal_plan', MealPlanViewSet, basename='meal_plan')
 router_v1.register(r'recipes', RecipesViewSet, basename='recipes')
 router_v1.register(r'tags', TagViewSet)
 
 urlpatterns = [
     url(r'^auth/', include('djoser.urls.authtoken')),
+    url(r'^sync/$', SyncView.as_view(), name='sync'),
+    url(r'^tasks/metrics/$', TaskMetricsView.as_view(), name='task_metrics'),
     url(r'', include(router_v1.urls)),
 ]
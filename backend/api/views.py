@@ -1,19 +1,32 @@
-from django.db.models import Sum
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
 from django.http import HttpResponse
+from djoser.utils import logout_user
 from djoser.views import UserViewSet
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
 from rest_framework import filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.parsers import FormParser
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from .cache import catalog_response
+from .facets import count_facets, get_facets
+from .fragments import get_recipes
 from .filters import RecipeFilter, IngredientFilter
+from .multiget import get_by_ids, get_ids
+from .parsers import MultiPartJSONParser, StreamingJSONParser
 from .serializers import (
     IngredientSerializer,
     FavoriteSerializer,
+    MealPlanSerializer,
     RecipeListSerializer,
     TagSerializer,
     RecipeCreateUpdateSerializer,
@@ -22,20 +35,54 @@ from .serializers import (
     SubscriptionGetSerializer
 )
 from .permissions import IsAuthorOrReadOnly
+from .sparse import build_recipes, get_shape
+from .sync import get_sync
+from .throttling import ConcurrencyLimitMixin
+from foodgram.routers import ReplicaReadsMixin
 from recipes.models import (
     Ingredient,
     IngredientInRecipe,
     Favorite,
+    MealPlanIngredient,
     Recipe,
     Tag,
     ShoppingCart
 )
+from recipes import changelog, planner, purge
+from recipes.units import (
+    aggregate_in_base_units,
+    format_amount,
+    humanize,
+    merge_units
+)
 from users.models import Subscription, User
 
 
-class CustomUserViewSet(UserViewSet):
+def get_shopping_list(user):
+    """Сводный список покупок пользователя в удобных единицах."""
+    return merge_units(aggregate_in_base_units(
+        IngredientInRecipe.objects.filter(
+            recipe__list_of_shopping__user=user,
+            recipe__deleted__isnull=True
+        ),
+        amount=F('amount') * F('recipe__list_of_shopping__multiplier')
+    ).iterator())
+
+
+class CustomUserViewSet(ReplicaReadsMixin, ConcurrencyLimitMixin,
+                        UserViewSet):
     """ViewSet для работы с пользователями."""
     permission_classes = (AllowAny,)
+    replica_actions = ('list',)
+    throttle_scopes = {'subscriptions': 'subscriptions'}
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted__isnull=True)
+
+    def perform_destroy(self, instance):
+        if instance == self.request.user:
+            logout_user(self.request)
+        purge.delete_user(instance)
 
     @action(
         methods=['get', ],
@@ -52,9 +99,10 @@ class CustomUserViewSet(UserViewSet):
         detail=True,
         permission_classes=(IsAuthenticated,),
     )
+    @transaction.atomic
     def subscribe(self, request, id):
         user = self.request.user
-        author = get_object_or_404(User, id=id)
+        author = get_object_or_404(User, id=id, deleted__isnull=True)
         serializer = SubscriptionGetSerializer(
             data={
                 'author': author.id,
@@ -85,7 +133,9 @@ class CustomUserViewSet(UserViewSet):
         pagination_class=LimitOffsetPagination,
     )
     def subscriptions(self, request):
-        authors = User.objects.filter(following__user=request.user)
+        authors = User.objects.filter(
+            following__user=request.user, deleted__isnull=True
+        )
         authors_paginate = self.paginate_queryset(authors)
         serializer = SubscriptionSerializer(
             authors_paginate,
@@ -95,8 +145,9 @@ class CustomUserViewSet(UserViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(ReplicaReadsMixin, ReadOnlyModelViewSet):
     """ViewSet для ингредиентов только для GET-запросов."""
+    replica_actions = ('list', 'retrieve')
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
     pagination_class = None
@@ -104,17 +155,45 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     filterset_class = (IngredientFilter)
     search_fields = ('^name', '=name')
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params or request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        return catalog_response(
+            request,
+            'ingredients',
+            lambda: self.get_serializer(self.get_queryset(), many=True).data
+        )
+
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(ReplicaReadsMixin, ReadOnlyModelViewSet):
     """ViewSet для тегов только для GET-запросов."""
+    replica_actions = ('list', 'retrieve')
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        return catalog_response(
+            request,
+            'tags',
+            lambda: self.get_serializer(self.get_queryset(), many=True).data
+        )
+
 
-class RecipesViewSet(ModelViewSet):
+class RecipesViewSet(ReplicaReadsMixin, ConcurrencyLimitMixin,
+                     ModelViewSet):
     """ViewSet для рецептов."""
     permission_classes = (IsAuthorOrReadOnly,)
+    replica_actions = ('list', 'retrieve')
+    throttle_scopes = {
+        'create': 'recipe_create',
+        'download_shopping_cart': 'shopping_list',
+    }
+    parser_classes = (StreamingJSONParser, MultiPartJSONParser, FormParser)
+    streaming_file_field = 'image'
+    multipart_json_fields = ('ingredients', 'tags')
     filter_backends = (DjangoFilterBackend, filters.SearchFilter,)
     filterset_class = (RecipeFilter)
 
@@ -123,6 +202,18 @@ class RecipesViewSet(ModelViewSet):
             return RecipeCreateUpdateSerializer
         return RecipeListSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        servings = self.request.query_params.get('servings')
+        if self.action == 'retrieve' and servings:
+            if (not servings.isdigit()
+                    or not 1 <= int(servings) <= settings.MAX_SERVINGS):
+                raise ValidationError(
+                    {'servings': 'Некорректное количество порций.'}
+                )
+            context['servings'] = int(servings)
+        return context
+
     def get_queryset(self):
         qs = Recipe.objects.all()
         author = self.request.query_params.get('author', None)
@@ -130,11 +221,44 @@ class RecipesViewSet(ModelViewSet):
             qs = qs.filter(author=author)
         return qs
 
+    def get_page_ids(self):
+        """id рецептов текущей страницы списка."""
+        return list(self.paginate_queryset(
+            self.filter_queryset(self.get_queryset()).values_list(
+                'id', flat=True
+            )
+        ))
+
+    def build_page(self, ids, shape):
+        if shape is None:
+            return get_recipes(ids, self.request)
+        return build_recipes(ids, *shape, self.request)
+
+    def count_facets(self, facets):
+        return count_facets(self.filter_queryset(self.get_queryset()), facets)
+
+    def list(self, request, *args, **kwargs):
+        facets = get_facets(request)
+        shape = get_shape(request)
+        ids = get_ids(request)
+        if ids is not None:
+            return Response(get_by_ids(ids, shape, request))
+        response = self.get_paginated_response(
+            self.build_page(self.get_page_ids(), shape)
+        )
+        if facets:
+            response.data['facets'] = self.count_facets(facets)
+        return response
+
+    def perform_destroy(self, instance):
+        purge.delete_recipe(instance)
+
     @action(
         methods=['post', ],
         detail=True,
         permission_classes=(IsAuthenticated,),
     )
+    @transaction.atomic
     def favorite(self, request, pk):
         user = self.request.user
         if not Recipe.objects.filter(pk=pk):
@@ -171,6 +295,7 @@ class RecipesViewSet(ModelViewSet):
         detail=True,
         permission_classes=(IsAuthenticated,),
     )
+    @transaction.atomic
     def shopping_cart(self, request, pk):
         user = self.request.user
         if not Recipe.objects.filter(pk=pk):
@@ -181,7 +306,8 @@ class RecipesViewSet(ModelViewSet):
         serializer = ShoppingCartSerializer(
             data={
                 'recipe': recipe.id,
-                'user': user.id
+                'user': user.id,
+                'multiplier': request.data.get('multiplier', 1)
             },
             context={
                 'request': request
@@ -198,22 +324,27 @@ class RecipesViewSet(ModelViewSet):
         permission_classes=(IsAuthenticated,),
     )
     def download_shopping_cart(self, request):
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__list_of_shopping__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(total_amount=Sum('amount')).order_by(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        )
+        ingredients = get_shopping_list(request.user)
         text = ''
-        for index, row in enumerate(ingredients, 1):
-            text += (f'{index} - {row["ingredient__name"]}  '
-                     f'{row["total_amount"]}  '
-                     f'{row["ingredient__measurement_unit"]}\n')
+        for index, (name, amount, unit) in enumerate(ingredients, 1):
+            text += f'{index} - {name}  {humanize(amount, unit)}\n'
         return HttpResponse(text, content_type='text/plain')
 
+    @shopping_cart.mapping.patch
+    @transaction.atomic
+    def shopping_cart_update(self, request, pk):
+        cart = get_object_or_404(
+            ShoppingCart, user=self.request.user, recipe_id=pk
+        )
+        serializer = ShoppingCartSerializer(
+            cart,
+            data={'multiplier': request.data.get('multiplier')},
+            partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     @shopping_cart.mapping.delete
     def shopping_cart_delete(self, request, pk):
         user = self.request.user
@@ -223,3 +354,89 @@ class RecipesViewSet(ModelViewSet):
             recipe_obj.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_400_BAD_REQUEST)
+
+
+class MealPlanViewSet(ModelViewSet):
+    """ViewSet для плана питания пользователя."""
+    serializer_class = MealPlanSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = None
+
+    def get_date_range(self):
+        dates = []
+        for param in ('start', 'end'):
+            value = self.request.query_params.get(param)
+            date = parse_date(value) if value else None
+            if value and date is None:
+                raise ValidationError({param: 'Некорректная дата.'})
+            dates.append(date)
+        return dates
+
+    def get_queryset(self):
+        qs = self.request.user.meal_plans.select_related('recipe')
+        start, end = self.get_date_range()
+        if start:
+            qs = qs.filter(date__gte=start)
+        if end:
+            qs = qs.filter(date__lte=end)
+        return qs
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        planner.add_entry(serializer.save(user=self.request.user))
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        planner.remove_entry(serializer.instance)
+        planner.add_entry(serializer.save())
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        planner.remove_entry(instance)
+        instance.delete()
+
+    @action(
+        methods=['get', ],
+        detail=False,
+    )
+    def ingredients(self, request):
+        start, end = self.get_date_range()
+        if not start or not end:
+            raise ValidationError('Укажите даты start и end.')
+        ingredients = merge_units(aggregate_in_base_units(
+            MealPlanIngredient.objects.filter(
+                user=request.user,
+                date__range=(start, end)
+            )
+        ))
+        return Response([
+            {
+                'name': name,
+                'amount': (
+                    None if amount is None else float(format_amount(amount))
+                ),
+                'measurement_unit': unit,
+            }
+            for name, amount, unit in ingredients
+        ])
+
+
+class SyncView(APIView):
+    """Изменения рецептов, избранного, списка покупок и подписок после
+    токена since. Без since возвращает только текущий токен."""
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        if since is None:
+            return Response({
+                'next': str(changelog.get_safe_seq(changelog.get_horizon()))
+            })
+        if not since.isdigit():
+            raise ValidationError({'since': 'Некорректный токен.'})
+        if int(since) < changelog.get_horizon():
+            return Response(
+                {'detail': 'Токен устарел, загрузите данные заново.'},
+                status=status.HTTP_410_GONE
+            )
+        return Response(get_sync(request, int(since)))
@@ -0,0 +1,126 @@
+"""Конкурентная запись в БД: избранное и список покупок.
+
+Несколько потоков одновременно добавляют и удаляют рецепты в избранном
+и списке покупок. Скрипт сравнивает пропускную способность и число
+ошибок "database is locked" для SQLite с настройками по умолчанию и с
+профилем из settings.SQLITE_PRAGMAS (WAL, synchronous=NORMAL, mmap).
+С DB_ENGINE=postgresql измеряется текущий профиль PostgreSQL.
+
+    python benchmarks/db_concurrency.py --threads 8 --seconds 10
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault(
+    'SQLITE_PATH', os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+)
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import OperationalError, connection, connections  # noqa: E402
+
+from recipes.models import Favorite, Recipe, ShoppingCart  # noqa: E402
+from users.models import User  # noqa: E402
+
+
+def prepare(users, recipes):
+    call_command('migrate', verbosity=0)
+    Favorite.objects.all().delete()
+    ShoppingCart.objects.all().delete()
+    author = User.objects.get_or_create(
+        username='bench', email='bench@bench.ru'
+    )[0]
+    User.objects.bulk_create(
+        [
+            User(username=f'bench{i}', email=f'bench{i}@bench.ru')
+            for i in range(users)
+        ],
+        ignore_conflicts=True
+    )
+    Recipe.objects.bulk_create(
+        Recipe(author=author, name=f'bench {i}', text='-', cooking_time=1)
+        for i in range(recipes - Recipe.objects.count())
+    )
+    return (
+        list(User.objects.values_list('id', flat=True)),
+        list(Recipe.objects.values_list('id', flat=True)),
+    )
+
+
+def worker(user_ids, recipe_ids, deadline, stats, lock):
+    done = errors = 0
+    while time.monotonic() < deadline:
+        model = random.choice((Favorite, ShoppingCart))
+        user_id = random.choice(user_ids)
+        recipe_id = random.choice(recipe_ids)
+        try:
+            _, created = model.objects.get_or_create(
+                user_id=user_id, recipe_id=recipe_id
+            )
+            if not created:
+                model.objects.filter(
+                    user_id=user_id, recipe_id=recipe_id
+                ).delete()
+            done += 1
+        except OperationalError:
+            errors += 1
+    connections.close_all()
+    with lock:
+        stats['done'] += done
+        stats['errors'] += errors
+
+
+def run(threads, seconds, user_ids, recipe_ids):
+    stats, lock = {'done': 0, 'errors': 0}, threading.Lock()
+    deadline = time.monotonic() + seconds
+    pool = [
+        threading.Thread(
+            target=worker,
+            args=(user_ids, recipe_ids, deadline, stats, lock)
+        )
+        for _ in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--recipes', type=int, default=500)
+    options = parser.parse_args()
+    user_ids, recipe_ids = prepare(options.users, options.recipes)
+    profiles = {'tuned': dict(settings.SQLITE_PRAGMAS)}
+    if connection.vendor == 'sqlite':
+        profiles = {
+            'default': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+            **profiles,
+        }
+    for name, pragmas in profiles.items():
+        settings.SQLITE_PRAGMAS = pragmas
+        connections.close_all()
+        stats = run(options.threads, options.seconds, user_ids, recipe_ids)
+        print(f'{connection.vendor} {name:8} '
+              f'{stats["done"] / options.seconds:8.1f} writes/s, '
+              f'{stats["errors"]} lock errors')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Размер и время сериализации ответов справочника ингредиентов.
+
+Сравнивает стандартный JSONRenderer DRF с FastJSONRenderer (orjson)
+и размер тела без сжатия, с gzip и с brotli (если установлен) на данных
+из data/ingredients.json - это тело ответа /api/ingredients/.
+
+    python benchmarks/json_compression.py --repeat 50
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from api.parsers import FastJSONParser  # noqa: E402
+from api.renderers import FastJSONRenderer, orjson  # noqa: E402
+from foodgram.compression import brotli, compress  # noqa: E402
+
+
+def measure(function, repeat):
+    return min(timeit.repeat(function, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument(
+        '--data', default=str(BASE_DIR.parent / 'data' / 'ingredients.json')
+    )
+    options = parser.parse_args()
+    with open(options.data) as file:
+        data = [
+            dict(item, id=index)
+            for index, item in enumerate(json.load(file), 1)
+        ]
+    print(f'{len(data)} objects, orjson: {orjson is not None}, '
+          f'brotli: {brotli is not None}')
+    for name, renderer, json_parser in (
+        ('json', JSONRenderer(), JSONParser()),
+        ('orjson', FastJSONRenderer(), FastJSONParser()),
+    ):
+        body = renderer.render(data)
+        render_time = measure(lambda: renderer.render(data), options.repeat)
+        parse_time = measure(
+            lambda: json_parser.parse(io.BytesIO(body)), options.repeat
+        )
+        print(f'{name:8} render {render_time:7.2f} ms   '
+              f'parse {parse_time:7.2f} ms')
+    body = FastJSONRenderer().render(data)
+    print(f'{"identity":12} {len(body):8} bytes')
+    variants = [('gzip', False), ('gzip', True)]
+    if brotli:
+        variants += [('br', False), ('br', True)]
+    for encoding, best in variants:
+        compressed = compress(body, encoding, best=best)
+        compress_time = measure(
+            lambda: compress(body, encoding, best=best), options.repeat
+        )
+        label = f'{encoding}{" best" if best else ""}'
+        print(f'{label:12} {len(compressed):8} bytes   '
+              f'{compress_time:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
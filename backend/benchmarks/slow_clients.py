@@ -0,0 +1,108 @@
+"""Нагрузочный тест «медленными клиентами».
+
+Открывает много одновременных соединений, каждое из которых читает
+ответ маленькими порциями с паузами, и параллельно измеряет задержку
+обычных (быстрых) запросов. Под синхронным WSGI-воркером медленные
+клиенты занимают воркеры целиком, под ASGI - нет.
+
+Пример сравнения (сервер запускается отдельно):
+
+    gunicorn -w 2 foodgram.wsgi
+    python benchmarks/slow_clients.py --url http://127.0.0.1:8000/api/tags/
+
+    gunicorn -w 2 -k uvicorn.workers.UvicornWorker foodgram.asgi:application
+    python benchmarks/slow_clients.py --url http://127.0.0.1:8000/api/tags/
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def fetch(url, token=None, chunk_size=None, delay=0.0):
+    """Выполняет GET-запрос и возвращает (время, число байт)."""
+    parts = urlsplit(url)
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(
+        parts.hostname, parts.port or 80
+    )
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    headers = [
+        f'GET {path} HTTP/1.1',
+        f'Host: {parts.netloc}',
+        'Connection: close',
+    ]
+    if token:
+        headers.append(f'Authorization: Token {token}')
+    writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode())
+    await writer.drain()
+    received = 0
+    while True:
+        data = await reader.read(chunk_size or 65536)
+        if not data:
+            break
+        received += len(data)
+        if delay:
+            await asyncio.sleep(delay)
+    writer.close()
+    return time.perf_counter() - started, received
+
+
+async def probe(url, token, count, interval):
+    """Задержки быстрых запросов на фоне медленных клиентов."""
+    timings = []
+    for _ in range(count):
+        elapsed, _ = await fetch(url, token)
+        timings.append(elapsed)
+        await asyncio.sleep(interval)
+    return timings
+
+
+async def run(options):
+    started = time.perf_counter()
+    slow = [
+        fetch(options.url, options.token, options.chunk_size, options.delay)
+        for _ in range(options.clients)
+    ]
+    results = await asyncio.gather(
+        asyncio.gather(*slow, return_exceptions=True),
+        probe(
+            options.probe_url or options.url,
+            options.token,
+            options.probes,
+            options.probe_interval
+        ),
+    )
+    slow_results, probe_timings = results
+    total = time.perf_counter() - started
+    failed = [r for r in slow_results if isinstance(r, Exception)]
+    done = [r for r in slow_results if not isinstance(r, Exception)]
+    print(f'URL:                {options.url}')
+    print(f'slow clients:       {options.clients} '
+          f'({len(failed)} failed)')
+    if done:
+        print(f'slow client time:   '
+              f'{statistics.median(t for t, _ in done):.2f} s median, '
+              f'{sum(b for _, b in done) / len(done):.0f} bytes each')
+    print(f'probe latency:      '
+          f'{statistics.median(probe_timings) * 1000:.1f} ms median, '
+          f'{max(probe_timings) * 1000:.1f} ms max')
+    print(f'wall time:          {total:.2f} s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', required=True)
+    parser.add_argument('--probe-url')
+    parser.add_argument('--token')
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--chunk-size', type=int, default=1024)
+    parser.add_argument('--delay', type=float, default=0.05)
+    parser.add_argument('--probes', type=int, default=20)
+    parser.add_argument('--probe-interval', type=float, default=0.1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
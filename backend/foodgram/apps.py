@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class FoodgramConfig(AppConfig):
+    name = 'foodgram'
+    verbose_name = 'Foodgram'
+
+    def ready(self):
+        from .db import configure_sqlite
+
+        connection_created.connect(configure_sqlite)
@@ -12,5 +12,13 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault('ROOT_URLCONF', 'foodgram.urls_asgi')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Импорт после настройки Django. Поток событий обслуживается в обход
+# обработчика Django, см. api/events.py.
+from api.events import route  # noqa: E402
+from foodgram.limits import limit_body  # noqa: E402
+
+application = route(limit_body(django_application))
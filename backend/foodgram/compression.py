@@ -0,0 +1,101 @@
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def get_encodings():
+    """Поддерживаемые кодировки в порядке предпочтения."""
+    return ('br', 'gzip') if brotli else ('gzip',)
+
+
+def choose_encoding(request, encodings=None):
+    """Лучшая из encodings кодировка, которую принимает клиент."""
+    accepted = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[name.strip().lower()] = quality
+    if encodings is None:
+        encodings = get_encodings()
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, best=False):
+    """Сжатие тела ответа. best - максимальная степень для тел,
+    которые сжимаются один раз и затем берутся из кэша."""
+    if encoding == 'br':
+        return brotli.compress(
+            data, quality=11 if best else settings.COMPRESSION_BROTLI_QUALITY
+        )
+    return gzip.compress(
+        data,
+        compresslevel=9 if best else settings.COMPRESSION_GZIP_LEVEL,
+        mtime=0
+    )
+
+
+def compress_brotli_sequence(sequence):
+    compressor = brotli.Compressor(
+        quality=settings.COMPRESSION_BROTLI_QUALITY
+    )
+    for item in sequence:
+        data = compressor.process(item) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+    return content_type.startswith('text/') or (
+        content_type in settings.COMPRESSION_CONTENT_TYPES
+    )
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжимает ответы brotli или gzip, если клиент это поддерживает.
+    Ответы короче COMPRESSION_MIN_SIZE байт отдаются как есть."""
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not is_compressible(
+            response
+        ):
+            return response
+        if (not response.streaming
+                and len(response.content) < settings.COMPRESSION_MIN_SIZE):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request)
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = (
+                compress_brotli_sequence(response.streaming_content)
+                if encoding == 'br' else
+                compress_sequence(response.streaming_content)
+            )
+            del response['Content-Length']
+        else:
+            response.content = compress(response.content, encoding)
+            response['Content-Length'] = str(len(response.content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,33 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Настраивает новое соединение SQLite: WAL, synchronous, mmap."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+def run(func):
+    """Выполняет func в пуле потоков, чтобы независимые запросы к БД из
+    асинхронного кода шли параллельно.
+
+    Django закрывает устаревшие соединения только в потоке запроса
+    (request_started и request_finished), поэтому потоки пула делают
+    это сами до и после вызова: соединение старше CONN_MAX_AGE или
+    оборванное перезапуском БД не используется повторно."""
+    @functools.wraps(func)
+    def inner(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(inner, thread_sensitive=False)
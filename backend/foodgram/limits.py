@@ -0,0 +1,65 @@
+"""Предел размера тела запроса для ASGI.
+
+ASGIHandler Django 3.2 читает всё тело во временный файл ещё до
+разбора запроса, поэтому проверки парсеров из api/parsers.py под ASGI
+срабатывают только после приёма тела целиком. limit_body отклоняет
+запрос с ответом 413 раньше: по заголовку Content-Length, а без него -
+как только принятые части тела превысят MAX_REQUEST_BODY_SIZE.
+"""
+import json
+
+from django.conf import settings
+
+DETAIL = 'Слишком большой запрос.'
+
+
+async def send_too_large(send):
+    await send({
+        'type': 'http.response.start',
+        'status': 413,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'connection', b'close'),
+        ],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': json.dumps({'detail': DETAIL}, ensure_ascii=False).encode(),
+    })
+
+
+def get_content_length(scope):
+    for name, value in scope['headers']:
+        if name == b'content-length':
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+def limit_body(application):
+    """ASGI-приложение, которое не пропускает в application тела
+    больше MAX_REQUEST_BODY_SIZE байт."""
+    async def limited(scope, receive, send):
+        if scope['type'] != 'http':
+            return await application(scope, receive, send)
+        limit = settings.MAX_REQUEST_BODY_SIZE
+        length = get_content_length(scope)
+        if length is not None and length > limit:
+            return await send_too_large(send)
+        size = 0
+
+        async def receive_limited():
+            nonlocal size
+            message = await receive()
+            if message['type'] == 'http.request':
+                size += len(message.get('body', b''))
+                if size > limit:
+                    await send_too_large(send)
+                    # Обработчик Django прекращает запрос без ответа.
+                    return {'type': 'http.disconnect'}
+            return message
+
+        return await application(scope, receive_limited, send)
+    return limited
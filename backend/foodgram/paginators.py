@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """Приблизительное число строк таблицы без полного COUNT(*):
+    статистика планировщика в PostgreSQL, максимальный id в SQLite."""
+    model = queryset.model
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else 0
+    return model._default_manager.using(
+        queryset.db
+    ).aggregate(count=Max('pk'))['count'] or 0
+
+
+def is_unfiltered(queryset):
+    """Нет условий, кроме условий менеджера модели (например, скрытия
+    удалённых рецептов)."""
+    return queryset.query.where == (
+        queryset.model._default_manager.all().query.where
+    )
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для админки: для таблиц больше
+    ADMIN_ESTIMATED_COUNT_THRESHOLD строк без фильтров число
+    строк берётся из оценки."""
+
+    @cached_property
+    def count(self):
+        if is_unfiltered(self.object_list):
+            estimate = estimate_count(self.object_list)
+            if estimate > settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
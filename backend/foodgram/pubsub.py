@@ -0,0 +1,98 @@
+"""Публикация событий для потока /api/events/ (api/events.py).
+
+Сообщения - словари, сериализуемые в JSON. Бэкенд задаётся настройкой
+EVENTS_BACKEND:
+
+* LocalBackend доставляет сообщения в пределах процесса - достаточно,
+  когда события публикуют запросы того же процесса ASGI;
+* PostgresBackend передаёт их через LISTEN/NOTIFY, поэтому события из
+  других процессов (несколько воркеров, manage.py run_tasks) доходят до
+  всех процессов с открытыми потоками.
+"""
+import json
+import logging
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class LocalBackend:
+    """Доставка в пределах процесса."""
+
+    def __init__(self):
+        self.receivers = []
+
+    def publish(self, message):
+        for receiver in list(self.receivers):
+            loop, deliver = receiver
+            try:
+                loop.call_soon_threadsafe(deliver, message)
+            except RuntimeError:
+                # Цикл событий уже закрыт.
+                self.receivers.remove(receiver)
+
+    def listen(self, loop, deliver):
+        """Вызывает deliver(message) в цикле loop для каждого
+        сообщения."""
+        self.receivers.append((loop, deliver))
+
+
+class PostgresBackend(LocalBackend):
+    """Доставка между процессами через LISTEN/NOTIFY PostgreSQL."""
+    reconnect_delay = 5
+
+    def publish(self, message):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_notify(%s, %s)',
+                [settings.EVENTS_CHANNEL, json.dumps(message)]
+            )
+
+    def listen(self, loop, deliver):
+        super().listen(loop, deliver)
+        self.connect(loop)
+
+    def connect(self, loop):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        try:
+            listener = psycopg2.connect(
+                **connection.get_connection_params()
+            )
+            listener.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with listener.cursor() as cursor:
+                cursor.execute(f'LISTEN "{settings.EVENTS_CHANNEL}"')
+        except psycopg2.Error:
+            logger.exception('Cannot listen for events')
+            loop.call_later(self.reconnect_delay, self.connect, loop)
+            return
+        fd = listener.fileno()
+
+        def read():
+            try:
+                listener.poll()
+            except psycopg2.Error:
+                logger.exception('Event listener connection lost')
+                loop.remove_reader(fd)
+                loop.call_later(self.reconnect_delay, self.connect, loop)
+                return
+            while listener.notifies:
+                message = json.loads(listener.notifies.pop(0).payload)
+                super(PostgresBackend, self).publish(message)
+
+        loop.add_reader(fd, read)
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.EVENTS_BACKEND)()
+
+
+def publish(message):
+    """Отправляет сообщение после фиксации текущей транзакции."""
+    transaction.on_commit(lambda: get_backend().publish(message))
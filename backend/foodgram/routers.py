@@ -0,0 +1,84 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.deprecation import MiddlewareMixin
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Приложения, чьи модели читают действия из replica_actions.
+REPLICA_APP_LABELS = {'recipes', 'users'}
+
+use_replica = ContextVar('use_replica', default=False)
+
+
+def get_replicas():
+    return [alias for alias in settings.DATABASES if alias != 'default']
+
+
+def get_pin_key(request):
+    """Ключ привязки к основной БД по id пользователя или, для анонима,
+    по ключу сессии."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'db-pin:user:{user.pk}'
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        return f'db-pin:session:{session.session_key}'
+    return None
+
+
+class ReplicaRouter:
+    """Роутер: действия, разрешившие чтение с реплик, читают с реплик,
+    остальное - из default."""
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if (replicas and use_replica.get()
+                and model._meta.app_label in REPLICA_APP_LABELS):
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
+
+
+class ReplicaReadsMixin:
+    """ViewSet, безопасные запросы к действиям из replica_actions
+    которого читают с реплик. Пользователь, недавно что-то изменивший,
+    читает с основной БД."""
+    replica_actions = ()
+    replica_reads = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Пользователь известен только после аутентификации DRF.
+        if (request.method in SAFE_METHODS
+                and getattr(self, 'action', None) in self.replica_actions
+                and get_replicas()):
+            pin_key = get_pin_key(request)
+            self.replica_reads = not (pin_key and cache.get(pin_key))
+            use_replica.set(self.replica_reads)
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """Сбрасывает разрешение читать с реплик. После записи пользователь
+    на REPLICA_PIN_SECONDS читает с основной БД."""
+
+    def process_request(self, request):
+        use_replica.set(False)
+
+    def process_response(self, request, response):
+        use_replica.set(False)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_key = get_pin_key(request)
+            if pin_key:
+                cache.set(pin_key, True, settings.REPLICA_PIN_SECONDS)
+        return response
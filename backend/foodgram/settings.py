@@ -1,4 +1,5 @@
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -24,22 +25,26 @@ INSTALLED_APPS = [
     'django_filters',
     'rest_framework.authtoken',
     'djoser',
+    'foodgram.apps.FoodgramConfig',
     'api.apps.ApiConfig',
     'users.apps.UsersConfig',
     'recipes.apps.RecipesConfig',
+    'tasks.apps.TasksConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'foodgram.routers.ReplicaRoutingMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram.urls'
+ROOT_URLCONF = os.getenv('ROOT_URLCONF', 'foodgram.urls')
 
 TEMPLATES = [
     {
@@ -59,23 +64,84 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
-DATABASES = {
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'postgres'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', ''),
+            'PORT': os.getenv('DB_PORT', 5432),
+            # Постоянные соединения вместо нового на каждый запрос.
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            # За PgBouncer в режиме transaction серверные курсоры
+            # для выгрузок нужно отключить.
+            'DISABLE_SERVER_SIDE_CURSORS': (
+                os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', '').lower()
+                == 'true'
+            ),
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'OPTIONS': {
+                # busy timeout в секундах вместо мгновенного
+                # "database is locked".
+                'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 20)),
+            },
+        }
+    }
+
+# Реплики только для чтения: хосты PostgreSQL или пути к файлам SQLite
+# через запятую. Маршрутизация - в foodgram/routers.py.
+DB_REPLICAS = [
+    replica.strip()
+    for replica in os.getenv('DB_REPLICAS', '').split(',')
+    if replica.strip()
+]
+
+for index, replica in enumerate(DB_REPLICAS, 1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        ('HOST' if DB_ENGINE == 'postgresql' else 'NAME'): replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodgram.routers.ReplicaRouter']
+
+# Сколько секунд после записи читать с основной БД (read-your-writes).
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+
+# Версии справочников, фрагменты рецептов и счётчики ограничений хранятся
+# в кэше, поэтому при нескольких процессах (воркер задач, несколько
+# воркеров gunicorn) нужен общий кэш, например
+# django.core.cache.backends.memcached.PyMemcacheCache. LocMemCache
+# подходит только для одного процесса.
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.getenv('CACHE_BACKEND', LOCMEM_CACHE),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': os.getenv('POSTGRES_DB', 'postgres'),
-#         'USER': os.getenv('POSTGRES_USER', 'postgres'),
-#         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
-#         'HOST': os.getenv('DB_HOST', ''),
-#         'PORT': os.getenv('DB_PORT', 5432)
-#     }
-# }
+# Применяются к каждому новому соединению SQLite (см. foodgram/db.py).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'temp_store': 'MEMORY',
+}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -128,8 +194,164 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKEND': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    # orjson используется, если установлен.
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Лимиты действуют для действий из throttle_scopes ViewSet'ов,
+    # см. api/throttling.py.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.UserTokenBucketThrottle',
+        'api.throttling.IPTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'shopping_list': '10/min',
+        'shopping_list_ip': '30/min',
+        'recipe_create': '20/hour',
+        'recipe_create_ip': '60/hour',
+        'subscriptions': '60/min',
+        'subscriptions_ip': '120/min',
+    },
+    'CONCURRENCY_LIMITS': {
+        'shopping_list': {'total': 8, 'user': 1},
+        'recipe_create': {'total': 8, 'user': 1},
+        'subscriptions': {'total': 16, 'user': 2},
+    },
+    'CONCURRENCY_TIMEOUT': 60,
+    'CONCURRENCY_RETRY_AFTER': 1,
+    'THROTTLE_CACHE': 'default',
+}
+
+# Создание рецепта: предел тела запроса (JSON с base64 или multipart)
+# и размера изображения после декодирования.
+MAX_REQUEST_BODY_SIZE = int(
+    os.getenv('MAX_REQUEST_BODY_SIZE', 16 * 1024 * 1024)
+)
+MAX_IMAGE_SIZE = int(os.getenv('MAX_IMAGE_SIZE', 10 * 1024 * 1024))
+# JSON, который читается в память целиком (без потокового изображения).
+MAX_JSON_BODY_SIZE = int(
+    os.getenv('MAX_JSON_BODY_SIZE', 16 * 1024 * 1024)
+)
+
+# Сжатие ответов: brotli, если установлен, иначе gzip.
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_CONTENT_TYPES = ('application/json',)
+
+# Сколько хранить в кэше готовые ответы /api/tags/ и /api/ingredients/.
+CATALOG_CACHE_SECONDS = int(os.getenv('CATALOG_CACHE_SECONDS', 3600))
+# Общая для всех пользователей часть рецептов в списках (api/fragments.py).
+# Записи удаляются при изменении рецепта только в общем кэше: в
+# LocMemCache другие процессы не узнают об изменении, поэтому срок
+# хранения ограничен LOCMEM_FRAGMENT_CACHE_SECONDS.
+RECIPE_FRAGMENT_CACHE_SECONDS = int(
+    os.getenv('RECIPE_FRAGMENT_CACHE_SECONDS', 24 * 60 * 60)
+)
+LOCMEM_FRAGMENT_CACHE_SECONDS = 60
+if CACHES['default']['BACKEND'] == LOCMEM_CACHE:
+    RECIPE_FRAGMENT_CACHE_SECONDS = min(
+        RECIPE_FRAGMENT_CACHE_SECONDS, LOCMEM_FRAGMENT_CACHE_SECONDS
+    )
+# Сколько рецептов можно запросить по списку id (api/multiget.py).
+RECIPES_MAX_IDS = 100
+
+# Статические снимки тегов и ингредиентов, которые раздаёт nginx
+# (см. infra/nginx.conf). Пустой SNAPSHOT_ROOT отключает публикацию.
+SNAPSHOT_ROOT = os.getenv('SNAPSHOT_ROOT', '')
+SNAPSHOT_URL = '/snapshots/'
+SNAPSHOT_PREFIX_LENGTH = 1
+SNAPSHOT_KEEP_VERSIONS = 3
+
+# Фоновые задачи (приложение tasks). С TASKS_EAGER=True задачи выполняются
+# в процессе запроса после фиксации транзакции, иначе - воркером
+# manage.py run_tasks. Интервалы - в секундах.
+TASKS_EAGER = os.getenv('TASKS_EAGER', 'True').lower() == 'true'
+TASKS_WORKERS = int(os.getenv('TASKS_WORKERS', 4))
+TASKS_POLL_INTERVAL = 1
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_BACKOFF = 2
+TASKS_RETRY_BACKOFF_MAX = 600
+TASKS_TIMEOUT = 300
+TASKS_KEEP_DONE = 24 * 60 * 60
+TASKS_METRICS_WINDOW = 60 * 60
+# Периодические задачи (имя -> интервал) ставит в очередь воркер
+# run_tasks. С TASKS_EAGER=True воркера нет: оценки рецептов нормализует
+# cron командой manage.py recompute_rankings --normalize.
+RANKING_NORMALIZE_INTERVAL = 24 * 60 * 60
+TASKS_PERIODIC = {
+    'recipes.tasks.normalize_rankings': RANKING_NORMALIZE_INTERVAL,
 }
 
+if not TASKS_EAGER and CACHES['default']['BACKEND'] == LOCMEM_CACHE:
+    # Изменения из воркера (пищевая ценность, версии справочников)
+    # не дошли бы до процессов, обслуживающих запросы.
+    raise ImproperlyConfigured(
+        'TASKS_EAGER=False requires a shared CACHE_BACKEND, not LocMemCache'
+    )
+if not TASKS_EAGER and DB_ENGINE != 'postgresql':
+    # Очередь хранится в БД: у воркера в другом контейнере был бы свой
+    # файл SQLite, и задачи из запросов не выполнялись бы.
+    raise ImproperlyConfigured(
+        'TASKS_EAGER=False requires DB_ENGINE=postgresql'
+    )
+
+# Фоновое удаление пользователей и рецептов: строк в пачке и секунд
+# работы одной задачи, после которых она ставит продолжение в очередь.
+PURGE_BATCH_SIZE = 1000
+PURGE_TIME_LIMIT = 30
+
+# Журнал изменений для GET /api/sync/ (recipes/changelog.py): изменений
+# в ответе, секунды до фиксации, после которых строка считается видимой,
+# срок хранения строк и строк в пачке при сжатии (manage.py
+# compact_changelog).
+SYNC_PAGE_SIZE = 500
+SYNC_SETTLE_SECONDS = 10
+SYNC_RETENTION_SECONDS = int(
+    os.getenv('SYNC_RETENTION_SECONDS', 30 * 24 * 60 * 60)
+)
+SYNC_COMPACT_BATCH_SIZE = 1000
+
+# Нечёткий поиск по названиям (recipes/search.py): минимальная доля
+# триграмм запроса в названии и предел числа кандидатов.
+SEARCH_SIMILARITY_THRESHOLD = 0.5
+SEARCH_MAX_CANDIDATES = 100
+
+# Поиск дублей ингредиентов (manage.py merge_ingredients): минимальный
+# коэффициент Жаккара триграмм названий.
+INGREDIENT_MERGE_THRESHOLD = 0.75
+
+# Поиск повторно опубликованных рецептов (recipes/duplicates.py): полосы
+# сигнатуры MinHash и значений в полосе (при 16 x 4 кандидатами
+# становятся рецепты со сходством примерно от 0.5), сравниваемых
+# кандидатов, порог сходства дублей и рецептов в пачке при пересчёте
+# (manage.py find_duplicate_recipes).
+MINHASH_BANDS = 16
+MINHASH_ROWS = 4
+DUPLICATE_MAX_CANDIDATES = 10
+DUPLICATE_THRESHOLD = 0.8
+DUPLICATE_BATCH_SIZE = 500
+
+# Поток событий (api/events.py), работает только под ASGI. EVENTS_BACKEND
+# доставляет события между процессами (см. foodgram/pubsub.py).
+EVENTS_BACKEND = os.getenv('EVENTS_BACKEND', 'foodgram.pubsub.LocalBackend')
+EVENTS_CHANNEL = 'foodgram_events'
+EVENTS_PATH = '/api/events/'
+EVENTS_FLUSH_INTERVAL = 1
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_RETRY_MILLISECONDS = 5000
+EVENTS_MAX_CONNECTIONS = int(os.getenv('EVENTS_MAX_CONNECTIONS', 10000))
+EVENTS_MAX_RECIPES = 100
+
+# Начиная с этого числа строк админка показывает оценку вместо COUNT(*).
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
 
 DJOSER = {
     'LOGIN_FIELD': 'email',
@@ -149,3 +371,19 @@ MAX_LENGTH_NAME = 200
 MAX_LENGTH_USERNAME = 150
 MIN_VALUE = 1
 MAX_VALUE = 20000
+DEFAULT_SERVINGS = 1
+MAX_SERVINGS = 100
+
+# Верхние границы интервалов времени приготовления (в минутах)
+# для ?facets=cooking_time.
+RECIPE_COOKING_TIME_FACETS = (15, 30, 60, 120)
+
+# Период полураспада оценок рецептов (в секундах) и веса событий.
+RANKING_HALF_LIFE = {
+    'popularity': 30 * 24 * 60 * 60,
+    'trending': 2 * 24 * 60 * 60,
+}
+RANKING_WEIGHTS = {
+    'favorite': 1.0,
+    'shopping_cart': 0.5,
+}
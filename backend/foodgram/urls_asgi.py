@@ -0,0 +1,10 @@
+from django.urls import include, path
+
+from .urls import urlpatterns as sync_urlpatterns
+
+# Под ASGI горячие GET-эндпоинты обслуживаются асинхронными
+# представлениями, остальные маршруты общие с WSGI.
+urlpatterns = [
+    path('api/', include('api.async_urls')),
+    *sync_urlpatterns,
+]
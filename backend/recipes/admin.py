@@ -1,10 +1,17 @@
 from django.contrib import admin
-from django.db.models import Count
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 
+from foodgram.paginators import EstimatedCountPaginator
+
+from . import purge
 from .models import (
     Ingredient,
     IngredientInRecipe,
+    PurgeJob,
     Recipe,
     Tag,
     Favorite,
@@ -16,9 +23,32 @@ admin.site.site_header = 'Администрирование проекта "Ф
 admin.site.empty_value_display = 'Не задано'
 
 
+class SoftDeleteAdminMixin:
+    """Удаление из админки через фоновую задачу: объект помечается
+    удалённым сразу, зависимые строки удаляются пачками."""
+    soft_delete = None
+
+    def get_deleted_objects(self, objs, request):
+        # Без обхода всех каскадных связей, как при обычном удалении.
+        objs = list(objs)
+        return (
+            [str(obj) for obj in objs],
+            {self.model._meta.verbose_name_plural: len(objs)},
+            set(),
+            []
+        )
+
+    def delete_model(self, request, obj):
+        self.soft_delete(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.soft_delete(obj)
+
+
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    pass
+    search_fields = ('^name', '^slug')
 
 
 @admin.register(Ingredient)
@@ -33,34 +63,26 @@ class IngredientAdmin(admin.ModelAdmin):
         'measurement_unit',
     )
     list_display_links = ('id',)
-    search_fields = ('name__startwith',)
+    search_fields = ('^name',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class IngredientInRecipeInline(admin.TabularInline):
     model = IngredientInRecipe
     extra = 1
+    autocomplete_fields = ('ingredient',)
 
-
-class FavoriteInline(admin.TabularInline):
-    model = Favorite
-    list_display = (
-        'user',
-    )
-    extra = 0
-
-
-class ShoppingCartInline(admin.TabularInline):
-    model = ShoppingCart
-    extra = 0
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
+    soft_delete = staticmethod(purge.delete_recipe)
     save_on_top = True
     inlines = (
         IngredientInRecipeInline,
-        FavoriteInline,
-        ShoppingCartInline,
     )
     list_display = (
         'id',
@@ -78,11 +100,14 @@ class RecipeAdmin(admin.ModelAdmin):
         'cooking_time',
     )
     list_filter = (
-        'author',
-        'name',
         'tags',
     )
     list_display_links = ('id',)
+    list_select_related = ('author',)
+    search_fields = ('^name',)
+    autocomplete_fields = ('author',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     fields = [('name', 'author', 'image',),
               ('text', 'cooking_time',), ]
 
@@ -94,13 +119,29 @@ class RecipeAdmin(admin.ModelAdmin):
             )
 
     def get_queryset(self, request):
+        # Подзапрос считается только для строк текущей страницы,
+        # в отличие от GROUP BY по всей таблице.
+        favorites = Favorite.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            count=Count('pk')
+        ).values('count')
         queryset = super().get_queryset(request)
-        queryset = queryset.annotate(favorites_count=Count('favorited'),)
+        queryset = queryset.annotate(favorites_count=Coalesce(
+            Subquery(favorites, output_field=IntegerField()), 0
+        ))
         return queryset
 
     @admin.display(description='Количество добавлений в избранное')
     def favorites_count(self, obj):
-        return obj.favorites_count
+        # Избранное рецепта открывается отдельным списком: встроенная
+        # форма выводила бы все добавления на одной странице.
+        return format_html(
+            '<a href="{}?recipe__id__exact={}">{}</a>',
+            reverse('admin:recipes_favorite_changelist'),
+            obj.pk,
+            obj.favorites_count
+        )
 
 
 @admin.register(Favorite)
@@ -112,13 +153,20 @@ class FavoriteAdmin(admin.ModelAdmin):
     list_display_links = (
         'user',
     )
-    list_filter = (
+    list_select_related = (
         'user',
+        'recipe',
     )
-    search_fields = (
+    autocomplete_fields = (
         'user',
         'recipe',
     )
+    search_fields = (
+        '^user__username',
+        '^recipe__name',
+    )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(ShoppingCart)
@@ -130,10 +178,40 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_display_links = (
         'user',
     )
-    list_filter = (
+    list_select_related = (
         'user',
+        'recipe',
     )
-    search_fields = (
+    autocomplete_fields = (
         'user',
         'recipe',
     )
+    search_fields = (
+        '^user__username',
+        '^recipe__name',
+    )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(PurgeJob)
+class PurgeJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'target',
+        'object_id',
+        'stage',
+        'cursor',
+        'deleted',
+        'updated',
+        'finished',
+    )
+    list_filter = ('target',)
+    readonly_fields = (
+        'target',
+        'object_id',
+        'stage',
+        'cursor',
+        'deleted',
+        'finished',
+    )
@@ -0,0 +1,26 @@
+"""Версия справочников (теги и ингредиенты).
+
+Версия меняется при любом изменении справочников и входит в ключи
+кэша готовых ответов, поэтому устаревшие ответы не нужно удалять.
+Любые изменения рецептов (поля, теги, ингредиенты, профиль автора, в
+том числе bulk_update и мягкое удаление в обход сигналов моделей)
+сообщаются сигналом recipes_changed, см. recipes/signals.py.
+"""
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.dispatch import Signal
+
+VERSION_KEY = 'catalog-version'
+
+# Аргументы: recipe_ids - id изменённых рецептов, deleted - рецепты
+# удалены.
+recipes_changed = Signal()
+
+
+def get_version():
+    return cache.get_or_set(VERSION_KEY, lambda: uuid4().hex, None)
+
+
+def bump_version():
+    cache.set(VERSION_KEY, uuid4().hex, None)
@@ -0,0 +1,157 @@
+"""Журнал изменений для синхронизации клиентов (GET /api/sync/).
+
+Изменения рецептов, избранного, списка покупок и подписок добавляют
+строки в ChangeLog в той же транзакции, что и само изменение (см.
+recipes/signals.py). Номер строки служит токеном: клиент запрашивает
+строки после полученного номера, поэтому стоимость синхронизации
+зависит от числа изменений, а не от размера каталога.
+
+Номера выдаются при вставке, а видны после фиксации, поэтому более
+ранний номер может появиться позже. Токен не продвигается за строки
+моложе SYNC_SETTLE_SECONDS: такие строки отдаются повторно при
+следующей синхронизации, но не теряются.
+
+compact() удаляет строки старше SYNC_RETENTION_SECONDS (токены до них
+становятся недействительными) и строки, перекрытые более новой строкой
+того же объекта.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef, Q
+from django.utils import timezone
+
+from .models import ChangeLog, ChangeLogHorizon, Favorite, ShoppingCart
+from users.models import Subscription
+
+# Модель связи пользователя -> (тип записи, поле object_id).
+USER_KINDS = {
+    Favorite: (ChangeLog.FAVORITE, 'recipe_id'),
+    ShoppingCart: (ChangeLog.SHOPPING_CART, 'recipe_id'),
+    Subscription: (ChangeLog.SUBSCRIPTION, 'author_id'),
+}
+
+
+def record(kind, object_ids, user_id=None, deleted=False):
+    ChangeLog.objects.bulk_create([
+        ChangeLog(
+            kind=kind,
+            object_id=object_id,
+            user_id=user_id,
+            deleted=deleted
+        )
+        for object_id in set(object_ids)
+    ])
+
+
+def record_recipes(recipe_ids, deleted=False):
+    record(ChangeLog.RECIPE, recipe_ids, deleted=deleted)
+
+
+def record_user_change(instance, deleted=False):
+    """Запись об изменении избранного, списка покупок или подписки."""
+    kind, field = USER_KINDS[type(instance)]
+    record(kind, [getattr(instance, field)], instance.user_id, deleted)
+
+
+def get_horizon():
+    return ChangeLogHorizon.objects.filter(pk=1).values_list(
+        'seq', flat=True
+    ).first() or 0
+
+
+def get_safe_seq(since, upper=None):
+    """Наибольший номер после since (не больше upper), до которого все
+    строки уже зафиксированы."""
+    cutoff = timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    entries = ChangeLog.objects.filter(seq__gt=since, created__lt=cutoff)
+    if upper is not None:
+        entries = entries.filter(seq__lte=upper)
+    return entries.order_by('-seq').values_list(
+        'seq', flat=True
+    ).first() or since
+
+
+def get_changes(user, since, limit=None):
+    """Изменения, видимые пользователю, после номера since.
+
+    Возвращает (токен, есть ли ещё изменения, {тип: {object_id:
+    удалён ли}}) - по каждому объекту только последняя запись."""
+    limit = limit or settings.SYNC_PAGE_SIZE
+    visible = Q(user__isnull=True)
+    if user.is_authenticated:
+        visible |= Q(user=user)
+    entries = list(
+        ChangeLog.objects.filter(visible, seq__gt=since).order_by(
+            'seq'
+        ).values_list('seq', 'kind', 'object_id', 'deleted')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    token = get_safe_seq(since, entries[-1][0] if has_more else None)
+    changes = {kind: {} for kind, _ in ChangeLog.KINDS}
+    for _, kind, object_id, deleted in entries:
+        changes[kind][object_id] = deleted
+    # Если токен отстал из-за незафиксированных строк, повторный запрос
+    # сразу вернул бы то же самое.
+    return token, has_more and token == entries[-1][0], changes
+
+
+def expire(batch_size):
+    cutoff = timezone.now() - timedelta(
+        seconds=settings.SYNC_RETENTION_SECONDS
+    )
+    horizon = ChangeLog.objects.filter(created__lt=cutoff).aggregate(
+        seq=Max('seq')
+    )['seq']
+    if horizon is None:
+        return 0
+    # Граница сдвигается до удаления: клиент со старым токеном получит
+    # 410, а не неполный список изменений.
+    with transaction.atomic():
+        state = ChangeLogHorizon.objects.select_for_update().get_or_create(
+            pk=1
+        )[0]
+        if horizon > state.seq:
+            state.seq = horizon
+            state.save(update_fields=('seq',))
+    expired = 0
+    while True:
+        pks = list(ChangeLog.objects.filter(seq__lte=horizon).order_by(
+            'seq'
+        ).values_list('seq', flat=True)[:batch_size])
+        if not pks:
+            return expired
+        expired += ChangeLog.objects.filter(seq__in=pks).delete()[0]
+
+
+def remove_superseded(batch_size):
+    newer = ChangeLog.objects.filter(
+        kind=OuterRef('kind'),
+        object_id=OuterRef('object_id'),
+        seq__gt=OuterRef('seq')
+    )
+    superseded = Q(
+        kind=ChangeLog.RECIPE, newer=True
+    ) | (~Q(kind=ChangeLog.RECIPE) & Q(newer_for_user=True))
+    removed = 0
+    cursor = 0
+    while True:
+        pks = list(ChangeLog.objects.filter(seq__gt=cursor).order_by(
+            'seq'
+        ).values_list('seq', flat=True)[:batch_size])
+        if not pks:
+            return removed
+        removed += ChangeLog.objects.filter(seq__in=pks).annotate(
+            newer=Exists(newer),
+            newer_for_user=Exists(newer.filter(user=OuterRef('user')))
+        ).filter(superseded).delete()[0]
+        cursor = pks[-1]
+
+
+def compact(batch_size=None):
+    """Сжимает журнал. Возвращает (удалено устаревших, удалено
+    перекрытых)."""
+    batch_size = batch_size or settings.SYNC_COMPACT_BATCH_SIZE
+    return expire(batch_size), remove_superseded(batch_size)
@@ -0,0 +1,220 @@
+"""Поиск почти одинаковых рецептов по сигнатурам MinHash.
+
+Рецепт описывается множеством признаков: id ингредиентов и шинглы -
+тройки подряд идущих слов описания в поисковой форме
+(search.normalize). Название в признаки не входит: у короткого
+названия мало шинглов, и переименованная копия ("Блины" ->
+"Блинчики") теряла бы заметную долю совпадений.
+
+Сигнатура - минимумы MINHASH_BANDS * MINHASH_ROWS хеш-функций по
+признакам; доля совпавших позиций двух сигнатур оценивает коэффициент
+Жаккара их множеств.
+
+Сигнатура хранится в Recipe.minhash, а её полосы по MINHASH_ROWS
+значений - хешами в RecipeBand. Рецепты с хотя бы одной общей полосой -
+кандидаты: для проверки нового рецепта сравниваются не больше
+DUPLICATE_MAX_CANDIDATES рецептов с наибольшим числом общих полос, а
+не весь каталог. Рецепты со сходством не ниже DUPLICATE_THRESHOLD
+считаются дублями.
+
+После изменения признаков, MINHASH_BANDS или MINHASH_ROWS сигнатуры
+нужно пересчитать: manage.py find_duplicate_recipes --rebuild.
+"""
+import random
+import struct
+import zlib
+from collections import defaultdict
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import IngredientInRecipe, Recipe, RecipeBand
+from .search import normalize
+
+SHINGLE_SIZE = 3
+# Простое число Мерсенна 2**61 - 1: хеш-функции (a * x + b) mod PRIME.
+PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+SEED = 1
+
+
+def get_permutations():
+    size = settings.MINHASH_BANDS * settings.MINHASH_ROWS
+    generator = random.Random(SEED)
+    return [
+        (generator.randrange(1, PRIME), generator.randrange(PRIME))
+        for _ in range(size)
+    ]
+
+
+def get_features(text, ingredient_ids):
+    """Хеши признаков рецепта."""
+    words = normalize(text).split()
+    features = {f'i{pk}' for pk in ingredient_ids}
+    features.update(
+        ' '.join(words[i:i + SHINGLE_SIZE])
+        for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))
+    )
+    return [zlib.crc32(feature.encode()) for feature in features]
+
+
+def get_signature(features, permutations=None):
+    """Сигнатура MinHash: минимум каждой хеш-функции по признакам."""
+    permutations = permutations or get_permutations()
+    return [
+        min((a * x + b) % PRIME for x in features) & MAX_HASH
+        for a, b in permutations
+    ]
+
+
+def pack(signature):
+    return struct.pack(f'<{len(signature)}I', *signature)
+
+
+def unpack(value):
+    value = bytes(value)
+    return struct.unpack(f'<{len(value) // 4}I', value)
+
+
+def get_band_keys(signature):
+    """Хеши полос сигнатуры; номер полосы входит в хеш."""
+    rows = settings.MINHASH_ROWS
+    keys = []
+    for band in range(settings.MINHASH_BANDS):
+        digest = blake2b(
+            struct.pack(
+                f'<H{rows}I', band, *signature[band * rows:(band + 1) * rows]
+            ),
+            digest_size=8
+        ).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
+
+
+def similarity(signature, other):
+    """Оценка коэффициента Жаккара по двум сигнатурам."""
+    if len(signature) != len(other):
+        return 0.0
+    return sum(a == b for a, b in zip(signature, other)) / len(signature)
+
+
+def find_similar(signature, exclude=None):
+    """Опубликованные рецепты, похожие на сигнатуру: список (рецепт,
+    сходство) от более похожих."""
+    candidates = RecipeBand.objects.filter(
+        key__in=get_band_keys(signature), recipe__deleted__isnull=True
+    )
+    if exclude is not None:
+        candidates = candidates.exclude(recipe_id=exclude)
+    ids = candidates.values('recipe_id').annotate(
+        bands=Count('pk')
+    ).order_by('-bands', 'recipe_id').values_list(
+        'recipe_id', flat=True
+    )[:settings.DUPLICATE_MAX_CANDIDATES]
+    found = []
+    for recipe in Recipe.objects.filter(pk__in=list(ids)).only(
+        'id', 'name', 'minhash'
+    ):
+        score = similarity(signature, unpack(recipe.minhash))
+        if score >= settings.DUPLICATE_THRESHOLD:
+            found.append((recipe, score))
+    return sorted(found, key=lambda item: (-item[1], item[0].pk))
+
+
+def save_signatures(signatures):
+    """Сохраняет сигнатуры {id рецепта: сигнатура} и их полосы."""
+    with transaction.atomic():
+        Recipe.all_objects.bulk_update(
+            [
+                Recipe(pk=pk, minhash=pack(signature))
+                for pk, signature in signatures.items()
+            ],
+            ('minhash',)
+        )
+        RecipeBand.objects.filter(recipe_id__in=signatures).delete()
+        RecipeBand.objects.bulk_create([
+            RecipeBand(recipe_id=pk, key=key)
+            for pk, signature in signatures.items()
+            for key in set(get_band_keys(signature))
+        ])
+
+
+def update_signatures(recipe_ids):
+    """Пересчитывает сигнатуры рецептов одним проходом по их
+    ингредиентам."""
+    ingredients = defaultdict(list)
+    for recipe_id, ingredient_id in IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id'):
+        ingredients[recipe_id].append(ingredient_id)
+    permutations = get_permutations()
+    save_signatures({
+        pk: get_signature(
+            get_features(text, ingredients[pk]), permutations
+        )
+        for pk, text in Recipe.all_objects.filter(
+            pk__in=recipe_ids
+        ).values_list('id', 'text')
+    })
+
+
+def update_all(batch_size, rebuild=False):
+    """Считает сигнатуры рецептов без сигнатуры (или всех при rebuild)
+    пачками по batch_size. Возвращает число обработанных рецептов."""
+    recipes = Recipe.all_objects.all()
+    if not rebuild:
+        recipes = recipes.filter(minhash__isnull=True)
+    last_id, processed = 0, 0
+    while True:
+        ids = list(recipes.filter(pk__gt=last_id).order_by(
+            'pk'
+        ).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return processed
+        update_signatures(ids)
+        processed += len(ids)
+        last_id = ids[-1]
+
+
+def find_clusters():
+    """Группы похожих опубликованных рецептов: списки id от старых к
+    новым."""
+    buckets = RecipeBand.objects.filter(
+        recipe__deleted__isnull=True
+    ).values('key').annotate(count=Count('pk')).filter(count__gt=1)
+    pairs = set()
+    key, members = None, []
+    for bucket, recipe_id in RecipeBand.objects.filter(
+        key__in=buckets.values('key'), recipe__deleted__isnull=True
+    ).order_by('key', 'recipe_id').values_list('key', 'recipe_id').iterator():
+        if bucket != key:
+            key, members = bucket, []
+        pairs.update((other, recipe_id) for other in members)
+        members.append(recipe_id)
+    signatures = {}
+    ids = {pk for pair in pairs for pk in pair}
+    for pk, minhash in Recipe.objects.filter(pk__in=ids).values_list(
+        'id', 'minhash'
+    ).iterator():
+        signatures[pk] = unpack(minhash)
+
+    parents = {}
+
+    def find(pk):
+        parents.setdefault(pk, pk)
+        while parents[pk] != pk:
+            parents[pk] = parents[parents[pk]]
+            pk = parents[pk]
+        return pk
+
+    for first, second in pairs:
+        if similarity(
+            signatures[first], signatures[second]
+        ) >= settings.DUPLICATE_THRESHOLD:
+            parents[find(first)] = find(second)
+    clusters = defaultdict(list)
+    for pk in sorted(parents):
+        clusters[find(pk)].append(pk)
+    return sorted(clusters.values())
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...changelog import compact
+
+
+class Command(BaseCommand):
+    help = 'Remove expired and superseded change log entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.SYNC_COMPACT_BATCH_SIZE,
+            help='Number of entries checked per query'
+        )
+
+    def handle(self, *args, **options):
+        expired, superseded = compact(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {expired} expired and {superseded} superseded entries'
+        ))
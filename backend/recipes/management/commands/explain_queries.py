@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ... import search
+from ...models import (
+    ChangeLog,
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart
+)
+from ...units import aggregate_in_base_units
+from users.models import Subscription, User
+
+
+def hot_queries(user_id, author_id, recipe_id, tags, prefix, name,
+                cooking_time, since, using):
+    """Горячие запросы из api/views.py, api/filters.py, api/facets.py
+    и api/sync.py."""
+    query = search.normalize(name)
+    queries = {
+        'recipe list page': Recipe.objects.all()[:6],
+        'recipe list by tags': Recipe.objects.filter(
+            tags__slug__in=tags
+        ).distinct()[:6],
+        'author page': Recipe.objects.filter(author_id=author_id)[:6],
+        'is_favorited filter': Recipe.objects.filter(
+            favorited__user_id=user_id
+        )[:6],
+        'is_in_shopping_cart filter': Recipe.objects.filter(
+            list_of_shopping__user_id=user_id
+        )[:6],
+        'kcal_max filter': Recipe.objects.filter(kcal__lte=500)[:6],
+        'ordering=popular': Recipe.objects.order_by(
+            '-popularity', '-pub_date'
+        )[:6],
+        'ordering=trending': Recipe.objects.order_by(
+            '-trending', '-pub_date'
+        )[:6],
+        'cooking_time__lte filter': Recipe.objects.filter(
+            cooking_time__lte=cooking_time
+        )[:6],
+        'cooking_time__gte filter': Recipe.objects.filter(
+            cooking_time__gte=cooking_time
+        )[:6],
+        'cooking_time facet bucket': Recipe.objects.filter(
+            cooking_time__gte=cooking_time,
+            cooking_time__lte=cooking_time * 2
+        ).order_by().values('pk'),
+        'recipe name prefix search': Recipe.objects.filter(
+            name__istartswith=name
+        ).values('id')[:settings.SEARCH_MAX_CANDIDATES],
+        'ingredient prefix search': Ingredient.objects.filter(
+            name__istartswith=prefix
+        ),
+        'recipe ingredients': IngredientInRecipe.objects.filter(
+            recipe_id=recipe_id
+        ).select_related('ingredient'),
+        'is_favorited flag': Favorite.objects.filter(
+            user_id=user_id, recipe_id=recipe_id
+        ).order_by()[:1],
+        'is_in_shopping_cart flag': ShoppingCart.objects.filter(
+            user_id=user_id, recipe_id=recipe_id
+        ).order_by()[:1],
+        'who favorited recipe': Favorite.objects.filter(
+            recipe_id=recipe_id
+        ).order_by().values('user_id'),
+        'followers of author': Subscription.objects.filter(
+            author_id=author_id
+        ).values('user_id'),
+        'subscriptions': User.objects.filter(
+            following__user_id=user_id
+        )[:10],
+        'download_shopping_cart': aggregate_in_base_units(
+            IngredientInRecipe.objects.filter(
+                recipe__list_of_shopping__user_id=user_id
+            ),
+            amount=F('amount') * F('recipe__list_of_shopping__multiplier')
+        ),
+        'sync changes': ChangeLog.objects.filter(
+            Q(user__isnull=True) | Q(user_id=user_id), seq__gt=since
+        ).order_by('seq').values_list(
+            'seq', 'kind', 'object_id', 'deleted'
+        )[:settings.SYNC_PAGE_SIZE + 1],
+        'sync safe token': ChangeLog.objects.filter(
+            seq__gt=since,
+            created__lt=timezone.now() - timedelta(
+                seconds=settings.SYNC_SETTLE_SECONDS
+            )
+        ).order_by('-seq').values_list('seq', flat=True)[:1],
+    }
+    if connections[using].vendor == 'postgresql':
+        queries['recipe fuzzy name search'] = search.similar(
+            Recipe, query, using
+        ).values_list('id', 'search_name', 'score')[
+            :settings.SEARCH_MAX_CANDIDATES
+        ]
+    else:
+        queries['recipe search index refresh'] = ChangeLog.objects.filter(
+            kind=ChangeLog.RECIPE, seq__gt=since
+        ).order_by().values_list('object_id', flat=True)
+    return queries
+
+
+class Command(BaseCommand):
+    help = 'Print EXPLAIN plans for the hot API queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, default=1)
+        parser.add_argument('--author', type=int, default=1)
+        parser.add_argument('--recipe', type=int, default=1)
+        parser.add_argument('--tags', nargs='+', default=['breakfast'])
+        parser.add_argument('--prefix', default='аб')
+        parser.add_argument('--name', default='блины')
+        parser.add_argument('--cooking-time', type=int, default=30)
+        parser.add_argument('--since', type=int, default=0)
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run EXPLAIN ANALYZE (PostgreSQL only)'
+        )
+
+    def handle(self, *args, **options):
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        using = router.db_for_read(Recipe)
+        queries = hot_queries(
+            options['user'],
+            options['author'],
+            options['recipe'],
+            options['tags'],
+            options['prefix'],
+            options['name'],
+            options['cooking_time'],
+            options['since'],
+            using,
+        )
+        # Порог нечёткого поиска действует до конца транзакции.
+        with transaction.atomic(using=using):
+            if connections[using].vendor == 'postgresql':
+                search.set_threshold(using)
+            for title, queryset in queries.items():
+                self.stdout.write(self.style.MIGRATE_HEADING(title))
+                self.stdout.write(queryset.explain(**explain_options))
+                self.stdout.write('')
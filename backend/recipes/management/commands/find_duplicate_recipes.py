@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...duplicates import find_clusters, update_all
+from ...models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Compute missing MinHash signatures of recipes and report '
+        'clusters of near-duplicate recipes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.DUPLICATE_BATCH_SIZE,
+            help='Number of recipes hashed per batch'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute signatures of all recipes'
+        )
+
+    def handle(self, *args, **options):
+        processed = update_all(options['batch_size'], options['rebuild'])
+        self.stdout.write(f'Computed {processed} signatures')
+        clusters = find_clusters()
+        recipes = Recipe.objects.select_related('author').in_bulk(
+            [pk for cluster in clusters for pk in cluster]
+        )
+        for cluster in clusters:
+            self.stdout.write(', '.join(
+                f'{pk}: {recipes[pk].name} ({recipes[pk].author.username})'
+                for pk in cluster
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Found {len(clusters)} clusters of near-duplicate recipes'
+        ))
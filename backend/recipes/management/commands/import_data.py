@@ -1,8 +1,20 @@
 import csv
 
+from django.conf import settings
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
+from ... import catalog
 from ...models import Ingredient, Tag
+from ...nutrition import BATCH_SIZE, NUTRIENTS, recalculate_all
+from ...search import normalize
+
+
+def parse_nutrients(row):
+    return {
+        nutrient: float(row[nutrient]) if row.get(nutrient) else None
+        for nutrient in NUTRIENTS
+    }
 
 
 def import_data():
@@ -11,7 +23,9 @@ def import_data():
         create_ingredients = [
             Ingredient(
                 name=row['name'],
+                search_name=normalize(row['name']),
                 measurement_unit=row['measurement_unit'],
+                **parse_nutrients(row)
             )
             for row in reader
         ]
@@ -29,9 +43,49 @@ def import_data():
             )
 
 
+def import_nutrition(path):
+    with open(path) as csvfile:
+        nutrients = {
+            (row['name'], row['measurement_unit']): parse_nutrients(row)
+            for row in csv.DictReader(csvfile)
+        }
+    update_ingredients = []
+    for ingredient in Ingredient.objects.only(
+        'id', 'name', 'measurement_unit'
+    ).iterator():
+        values = nutrients.get((ingredient.name, ingredient.measurement_unit))
+        if values:
+            for nutrient, value in values.items():
+                setattr(ingredient, nutrient, value)
+            update_ingredients.append(ingredient)
+    Ingredient.objects.bulk_update(
+        update_ingredients, NUTRIENTS, batch_size=BATCH_SIZE
+    )
+    return len(update_ingredients)
+
+
 class Command(BaseCommand):
     help = 'Import CSV data into db'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--nutrition',
+            metavar='CSV',
+            help='Only load per-100g nutrition facts for existing '
+                 'ingredients from CSV with columns name, measurement_unit, '
+                 + ', '.join(NUTRIENTS)
+        )
+
     def handle(self, *args, **options):
+        if options['nutrition']:
+            updated = import_nutrition(options['nutrition'])
+            recalculate_all()
+            self.stdout.write(self.style.SUCCESS(
+                f'Nutrition facts updated for {updated} ingredients'
+            ))
+            return
         import_data()
+        catalog.bump_version()
+        if settings.SNAPSHOT_ROOT:
+            call_command('publish_snapshots')
         self.stdout.write(self.style.SUCCESS('Data imported successfully'))
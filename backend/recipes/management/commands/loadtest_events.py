@@ -0,0 +1,143 @@
+import asyncio
+import resource
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram import pubsub
+
+
+def get_rss():
+    """Резидентная память процесса в байтах."""
+    with open('/proc/self/statm') as statm:
+        pages = int(statm.read().split()[1])
+    return pages * resource.getpagesize()
+
+
+class Client:
+    def __init__(self):
+        self.frames = 0
+        self.received = asyncio.Event()
+
+    async def connect(self, port, path):
+        self.reader, self.writer = await asyncio.open_connection(
+            '127.0.0.1', port
+        )
+        self.writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'
+            'Accept: text/event-stream\r\n\r\n'.encode()
+        )
+        headers = await self.reader.readuntil(b'\r\n\r\n')
+        if not headers.startswith(b'HTTP/1.1 200'):
+            raise CommandError(headers.decode(errors='replace'))
+        await self.reader.readuntil(b'retry: ')
+
+    async def read(self):
+        while True:
+            chunk = await self.reader.read(65536)
+            if not chunk:
+                return
+            frames = chunk.count(b'event: favorites')
+            if frames:
+                self.frames += frames
+                self.received.set()
+
+    def close(self):
+        self.writer.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Open many idle /api/events/ streams against an in-process '
+        'uvicorn server and measure memory and delivery latency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=5000)
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=5,
+            help='Number of favorite bursts delivered to every stream'
+        )
+        parser.add_argument(
+            '--burst',
+            type=int,
+            default=100,
+            help='Messages per burst, coalesced into one frame per stream'
+        )
+        parser.add_argument('--recipe', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn
+        except ImportError:
+            raise CommandError('uvicorn is required for the load test')
+        # Обе стороны соединений открыты в одном процессе.
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        needed = options['connections'] * 2 + 100
+        if soft < needed:
+            resource.setrlimit(
+                resource.RLIMIT_NOFILE, (min(needed, hard), hard)
+            )
+        asyncio.run(self.run(uvicorn, **options))
+
+    async def run(self, uvicorn, connections, rounds, burst, recipe,
+                  **options):
+        from foodgram.asgi import application
+
+        server = uvicorn.Server(uvicorn.Config(
+            application,
+            host='127.0.0.1',
+            port=0,
+            lifespan='off',
+            log_level='warning',
+            backlog=connections,
+        ))
+        serving = asyncio.ensure_future(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        path = f'/api/events/?recipes={recipe}'
+
+        rss = get_rss()
+        started = time.monotonic()
+        clients = [Client() for _ in range(connections)]
+        for index in range(0, connections, 500):
+            await asyncio.gather(*(
+                client.connect(port, path)
+                for client in clients[index:index + 500]
+            ))
+        self.stdout.write(
+            f'{connections} streams open in '
+            f'{time.monotonic() - started:.1f}s, '
+            f'{(get_rss() - rss) / connections / 1024:.1f} KiB per stream '
+            '(server and client side)'
+        )
+        readers = [asyncio.ensure_future(client.read()) for client in clients]
+
+        backend = pubsub.get_backend()
+        latencies = []
+        for _ in range(rounds):
+            for client in clients:
+                client.received.clear()
+            started = time.monotonic()
+            for _ in range(burst):
+                backend.publish({'type': 'favorites', 'recipe': recipe})
+            await asyncio.gather(*(
+                client.received.wait() for client in clients
+            ))
+            latencies.append(time.monotonic() - started)
+        frames = sum(client.frames for client in clients)
+        self.stdout.write(
+            f'{rounds} bursts of {burst} messages: '
+            f'{frames / connections:.1f} frames per stream, delivery '
+            f'avg {sum(latencies) / rounds:.2f}s, max {max(latencies):.2f}s'
+        )
+
+        for client in clients:
+            client.close()
+        await asyncio.gather(*readers)
+        server.should_exit = True
+        await serving
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,87 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...merge import apply_plan, find_duplicates
+
+
+def describe(ingredient):
+    return {
+        'id': ingredient.pk,
+        'name': ingredient.name,
+        'measurement_unit': ingredient.measurement_unit,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Find likely duplicate ingredients and propose merges, or apply '
+        'a reviewed merge plan'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            help='Minimal trigram similarity of names'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the proposed merges to a JSON plan file'
+        )
+        parser.add_argument(
+            '--apply',
+            metavar='PLAN',
+            help='Merge ingredients listed in a reviewed JSON plan file'
+        )
+
+    def handle(self, *args, **options):
+        if options['apply']:
+            return self.apply(options['apply'])
+        groups = find_duplicates(options['threshold'])
+        for target, merged in groups:
+            self.stdout.write(
+                f'{target.pk}: {target.name} ({target.measurement_unit})'
+            )
+            for ingredient, similarity in merged:
+                self.stdout.write(
+                    f'    <- {ingredient.pk}: {ingredient.name} '
+                    f'({ingredient.measurement_unit}), {similarity:.2f}'
+                )
+        if options['output']:
+            with open(options['output'], 'w') as plan:
+                json.dump([
+                    {
+                        'target': describe(target),
+                        'merge': [
+                            dict(
+                                describe(ingredient),
+                                similarity=round(similarity, 2)
+                            )
+                            for ingredient, similarity in merged
+                        ],
+                    }
+                    for target, merged in groups
+                ], plan, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Proposed {len(groups)} merges of '
+            f'{sum(len(merged) for _, merged in groups)} ingredients'
+        ))
+
+    def apply(self, path):
+        try:
+            with open(path) as plan:
+                plan = [
+                    (group['target']['id'],
+                     [ingredient['id'] for ingredient in group['merge']])
+                    for group in json.load(plan)
+                ]
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            raise CommandError(f'Cannot read merge plan: {error}')
+        try:
+            merged = apply_plan(plan)
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(
+            self.style.SUCCESS(f'Merged {merged} ingredients')
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.snapshots import publish
+
+
+class Command(BaseCommand):
+    help = 'Publish static JSON snapshots of tags and ingredients for nginx'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--root',
+            help='Snapshot directory (defaults to SNAPSHOT_ROOT)'
+        )
+
+    def handle(self, *args, **options):
+        version = publish(options['root'])
+        if version is None:
+            raise CommandError('Set SNAPSHOT_ROOT or pass --root')
+        self.stdout.write(self.style.SUCCESS(f'Snapshot {version} published'))
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...models import PurgeJob
+from ...purge import run
+
+
+class Command(BaseCommand):
+    help = 'Finish unfinished user and recipe deletions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.PURGE_BATCH_SIZE,
+            help='Number of rows deleted per transaction'
+        )
+
+    def handle(self, *args, **options):
+        jobs = PurgeJob.objects.filter(finished__isnull=True).order_by('pk')
+        for job in jobs:
+            self.stdout.write(
+                f'{job}: resuming at {job.stage or "start"}'
+            )
+            run(job, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{job}: {job.deleted}'))
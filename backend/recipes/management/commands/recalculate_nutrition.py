@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from ...nutrition import BATCH_SIZE, recalculate_all
+
+
+class Command(BaseCommand):
+    help = 'Recalculate stored nutrition totals for all recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of recipes processed per batch'
+        )
+
+    def handle(self, *args, **options):
+        processed = recalculate_all(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Recalculated {processed} recipes')
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from ...ranking import BATCH_SIZE, normalize, recompute
+
+
+class Command(BaseCommand):
+    help = 'Recompute or normalize popular/trending recipe scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--normalize',
+            action='store_true',
+            help='Only rebase the decay epoch (run periodically, e.g. daily)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Rows per batch when recomputing from history'
+        )
+
+    def handle(self, *args, **options):
+        if options['normalize']:
+            normalize()
+            self.stdout.write(self.style.SUCCESS('Scores normalized'))
+            return
+        recipes = recompute(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Scores recomputed for {recipes} recipes')
+        )
@@ -0,0 +1,249 @@
+"""Поиск и объединение дублей в справочнике ингредиентов.
+
+Дубли - ингредиенты с одинаковой поисковой формой названия
+(search.normalize) или похожие по триграммам: коэффициент Жаккара
+множеств триграмм не ниже INGREDIENT_MERGE_THRESHOLD. Похожесть
+считается сразу для всего справочника по обратному индексу триграмм
+(search.TrigramIndex): для каждого названия суммируются наборы id по
+его триграммам, поэтому сравниваются только названия с общими
+триграммами, а не все пары. Объединяются только ингредиенты с
+одинаковыми или переводимыми друг в друга единицами (units.to_base).
+
+Группа объединяется в самый используемый ингредиент (предпочтительно
+в базовых единицах) в одной транзакции: строки IngredientInRecipe и
+MealPlanIngredient перевешиваются массовыми UPDATE с пересчётом
+количества в единицы ингредиента-цели, а если рецепт (или день плана)
+ссылается на несколько ингредиентов группы, количества складываются в
+одну строку.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest, Least, Round
+
+from .models import Ingredient, IngredientInRecipe, MealPlanIngredient
+from .nutrition import recalculate
+from .search import TrigramIndex, get_trigrams
+from .units import conversion_table, to_base
+
+
+def get_factor(unit, target_unit, name):
+    """Множитель перевода количества из unit в target_unit или None,
+    если единицы не переводятся друг в друга."""
+    amount, base = to_base(1, unit, name)
+    target_amount, target_base = to_base(1, target_unit, name)
+    if base != target_base:
+        return None
+    return amount / target_amount
+
+
+def similarity(trigrams, other):
+    """Коэффициент Жаккара множеств триграмм."""
+    union = len(trigrams | other)
+    return len(trigrams & other) / union if union else 1.0
+
+
+def find_pairs(ingredients, threshold):
+    """Пары id ингредиентов с похожими названиями."""
+    index = TrigramIndex(
+        (ingredient.pk, ingredient.search_name) for ingredient in ingredients
+    )
+    sizes = {
+        pk: len(get_trigrams(search_name))
+        for pk, search_name in index.names.items()
+    }
+    for pk, search_name in index.names.items():
+        common = Counter()
+        for trigram in get_trigrams(search_name):
+            common.update(index.postings[trigram])
+        for other, count in common.items():
+            if other <= pk:
+                continue
+            if count / (sizes[pk] + sizes[other] - count) >= threshold:
+                yield pk, other
+
+
+def find_duplicates(threshold=None):
+    """Предлагаемые объединения: список групп (цель, [(ингредиент,
+    похожесть на цель), ...]), от больших групп к меньшим."""
+    if threshold is None:
+        threshold = settings.INGREDIENT_MERGE_THRESHOLD
+    ingredients = {
+        ingredient.pk: ingredient
+        for ingredient in Ingredient.objects.annotate(
+            usage=Count('ingredientinrecipe')
+        )
+    }
+    parents = {}
+
+    def find(pk):
+        parents.setdefault(pk, pk)
+        while parents[pk] != pk:
+            parents[pk] = parents[parents[pk]]
+            pk = parents[pk]
+        return pk
+
+    for pk, other in find_pairs(ingredients.values(), threshold):
+        first, second = ingredients[pk], ingredients[other]
+        if get_factor(
+            first.measurement_unit, second.measurement_unit, first.name
+        ) is not None:
+            parents[find(pk)] = find(other)
+
+    clusters = defaultdict(list)
+    for pk in parents:
+        clusters[find(pk)].append(ingredients[pk])
+    groups = []
+    for members in clusters.values():
+        # Количество в рецептах целое: перевод в базовую единицу (г, мл)
+        # не теряет точности, поэтому она важнее частоты использования.
+        target = min(members, key=lambda ingredient: (
+            conversion_table().get(
+                ingredient.measurement_unit, (None, 1)
+            )[1] != 1,
+            -ingredient.usage,
+            len(ingredient.name),
+            ingredient.pk
+        ))
+        # Цепочки похожих названий расходятся ("колбаса вареная" -
+        # "колбаса варено-копченая" - "колбаса копченая"), поэтому в
+        # группе остаются только похожие на цель.
+        trigrams = get_trigrams(target.search_name)
+        merged = [
+            (ingredient, score)
+            for ingredient, score in (
+                (ingredient, similarity(
+                    get_trigrams(ingredient.search_name), trigrams
+                ))
+                for ingredient in members if ingredient is not target
+            )
+            if score >= threshold and get_factor(
+                ingredient.measurement_unit,
+                target.measurement_unit,
+                target.name
+            ) is not None
+        ]
+        if merged:
+            groups.append((target, sorted(
+                merged, key=lambda item: (-item[1], item[0].name)
+            )))
+    return sorted(groups, key=lambda group: (-len(group[1]), group[0].name))
+
+
+def to_amount(amount, integer):
+    """Количество для поля amount: целые строки IngredientInRecipe
+    округляются и ограничиваются MIN_VALUE..MAX_VALUE."""
+    if not integer:
+        return amount
+    if hasattr(amount, 'resolve_expression'):
+        return Least(
+            Greatest(Round(amount), Value(settings.MIN_VALUE)),
+            Value(settings.MAX_VALUE)
+        )
+    return min(max(round(amount), settings.MIN_VALUE), settings.MAX_VALUE)
+
+
+def repoint(queryset, keys, target, factors, integer=False):
+    """Перевешивает строки queryset с ингредиентов factors (id ->
+    множитель) на target. Строки с одинаковыми keys (рецепт или
+    пользователь и день) складываются в одну."""
+    factors = {target.pk: 1, **factors}
+    rows = queryset.filter(ingredient_id__in=factors)
+    duplicated = set(rows.values(*keys).annotate(
+        count=Count('pk')
+    ).filter(count__gt=1).values_list(*keys))
+    groups = defaultdict(list)
+    if duplicated:
+        for row in rows.filter(**{
+            f'{key}__in': {values[position] for values in duplicated}
+            for position, key in enumerate(keys)
+        }).select_for_update().order_by('pk'):
+            key = tuple(getattr(row, name) for name in keys)
+            if key in duplicated:
+                groups[key].append(row)
+    merged, removed = [], []
+    for group in groups.values():
+        # Оставляем строку цели, если она есть.
+        kept = next(
+            (row for row in group if row.ingredient_id == target.pk),
+            group[0]
+        )
+        kept.amount = to_amount(sum(
+            row.amount * factors[row.ingredient_id] for row in group
+        ), integer)
+        kept.ingredient_id = target.pk
+        merged.append(kept)
+        removed += [row.pk for row in group if row is not kept]
+    queryset.filter(pk__in=removed).delete()
+    queryset.model.objects.bulk_update(merged, ('ingredient', 'amount'))
+    for source, factor in factors.items():
+        if source == target.pk:
+            continue
+        changes = {'ingredient_id': target.pk}
+        if factor != 1:
+            changes['amount'] = to_amount(
+                F('amount') * Value(factor), integer
+            )
+        queryset.filter(ingredient_id=source).update(**changes)
+
+
+def merge(target, sources):
+    """Объединяет ингредиенты sources в target. Возвращает id рецептов,
+    в которых поменялись ингредиенты."""
+    factors = {}
+    for source in sources:
+        factor = get_factor(
+            source.measurement_unit, target.measurement_unit, target.name
+        )
+        if factor is None:
+            raise ValueError(
+                f'{source} нельзя перевести в единицы {target}'
+            )
+        factors[source.pk] = factor
+    recipe_ids = set(IngredientInRecipe.objects.filter(
+        ingredient_id__in=factors
+    ).values_list('recipe_id', flat=True))
+    repoint(
+        IngredientInRecipe.objects.all(),
+        ('recipe_id',),
+        target,
+        factors,
+        integer=True
+    )
+    repoint(
+        MealPlanIngredient.objects.all(), ('user_id', 'date'), target, factors
+    )
+    Ingredient.objects.filter(pk__in=factors).delete()
+    return recipe_ids
+
+
+def apply_plan(plan):
+    """Применяет план объединения [(id цели, [id, ...]), ...] в одной
+    транзакции. Возвращает число удалённых ингредиентов."""
+    seen = set()
+    for target, sources in plan:
+        ids = [target, *sources]
+        if seen.intersection(ids) or len(set(ids)) != len(ids):
+            raise ValueError(
+                f'Ингредиент {target} встречается в плане дважды'
+            )
+        seen.update(ids)
+    ingredients = Ingredient.objects.in_bulk(seen)
+    missing = seen - set(ingredients)
+    if missing:
+        raise ValueError(
+            'Нет ингредиентов с id ' + ', '.join(map(str, sorted(missing)))
+        )
+    recipe_ids, merged = set(), 0
+    with transaction.atomic():
+        for target, sources in plan:
+            sources = [ingredients[pk] for pk in sources]
+            recipe_ids |= merge(ingredients[target], sources)
+            merged += len(sources)
+        if recipe_ids:
+            # Пищевая ценность зависит от ингредиентов; recalculate
+            # сообщает об изменении рецептов сигналом recipes_changed.
+            recalculate(recipe_ids)
+    return merged
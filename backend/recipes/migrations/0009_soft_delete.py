@@ -0,0 +1,40 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_rankings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurgeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(choices=[('user', 'Пользователь'), ('recipe', 'Рецепт')], max_length=10, verbose_name='Объект')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID объекта')),
+                ('stage', models.CharField(blank=True, max_length=32, verbose_name='Этап')),
+                ('cursor', models.PositiveBigIntegerField(default=0, verbose_name='Последний удалённый id')),
+                ('deleted', models.JSONField(blank=True, default=dict, verbose_name='Удалено строк')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+            ],
+            options={
+                'verbose_name': 'Удаление',
+                'verbose_name_plural': 'Удаления',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='deleted',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Удалён'),
+        ),
+        migrations.AddConstraint(
+            model_name='purgejob',
+            constraint=models.UniqueConstraint(fields=('target', 'object_id'), name='unique_purge_job_target'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 3.2.3 on 2026-10-19 10:05
+
+import re
+
+from django.db import migrations, models
+
+TABLES = ('recipes_ingredient', 'recipes_recipe')
+
+# Копия recipes.search.normalize на момент миграции: миграция не должна
+# меняться вместе с кодом приложения.
+WORD = re.compile(r'[^\W_]+')
+ENDINGS = sorted({
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое',
+    'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую',
+    'юю', 'ая', 'яя', 'ою', 'ею',
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ье',
+    'еи', 'ии', 'ям', 'ам', 'ах', 'ях', 'ию', 'ью', 'ия', 'ья',
+    'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю', 'я',
+}, key=len, reverse=True)
+MIN_STEM = 3
+
+
+def stem(word):
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def normalize(text):
+    return ' '.join(
+        stem(word) for word in WORD.findall(text.lower().replace('ё', 'е'))
+    )
+
+
+def fill_search_name(apps, schema_editor):
+    for model_name in ('Ingredient', 'Recipe'):
+        model = apps.get_model('recipes', model_name)
+        batch = []
+        for obj in model.objects.only('id', 'name').iterator():
+            obj.search_name = normalize(obj.name)
+            batch.append(obj)
+            if len(batch) == 1000:
+                model.objects.bulk_update(batch, ('search_name',))
+                batch = []
+        model.objects.bulk_update(batch, ('search_name',))
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # GIN-индекс триграмм для нечёткого поиска (recipes/search.py).
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table in TABLES:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {table}_search_name_trgm '
+                f'ON {table} USING gin (search_name gin_trgm_ops)'
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for table in TABLES:
+            schema_editor.execute(
+                f'DROP INDEX IF EXISTS {table}_search_name_trgm'
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_changelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='search_name',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='Название для поиска'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_name',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='Название для поиска'),
+        ),
+        migrations.RunPython(fill_search_name, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.3 on 2026-10-19 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_search_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='minhash',
+            field=models.BinaryField(null=True, verbose_name='Сигнатура MinHash'),
+        ),
+        migrations.CreateModel(
+            name='RecipeBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True, verbose_name='Хеш полосы')),
+                ('recipe', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Полоса сигнатуры',
+                'verbose_name_plural': 'Полосы сигнатур',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recipeband',
+            constraint=models.UniqueConstraint(fields=('recipe', 'key'), name='unique_recipe_band'),
+        ),
+    ]
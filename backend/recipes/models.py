@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from users.models import User
 
@@ -10,10 +11,40 @@ class Ingredient(models.Model):
     name = models.CharField(
         max_length=settings.MAX_LENGTH_NAME,
         verbose_name='Название')
+    search_name = models.CharField(
+        max_length=settings.MAX_LENGTH_NAME,
+        blank=True,
+        editable=False,
+        verbose_name='Название для поиска'
+    )
     measurement_unit = models.CharField(
         max_length=settings.MAX_LENGTH_NAME,
         verbose_name='Единицы измерения'
     )
+    kcal = models.FloatField(
+        null=True,
+        blank=True,
+        help_text='На 100 г продукта',
+        verbose_name='Калорийность, ккал'
+    )
+    proteins = models.FloatField(
+        null=True,
+        blank=True,
+        help_text='На 100 г продукта',
+        verbose_name='Белки, г'
+    )
+    fats = models.FloatField(
+        null=True,
+        blank=True,
+        help_text='На 100 г продукта',
+        verbose_name='Жиры, г'
+    )
+    carbohydrates = models.FloatField(
+        null=True,
+        blank=True,
+        help_text='На 100 г продукта',
+        verbose_name='Углеводы, г'
+    )
 
     class Meta:
         ordering = ('name',)
@@ -56,11 +87,19 @@ class Tag(models.Model):
         return f'Тег {self.name}'
 
 
+class RecipeManager(models.Manager):
+    """Рецепты без помеченных на удаление."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted__isnull=True)
+
+
 class Recipe(models.Model):
     """Model рецептов."""
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='recipes',
         verbose_name='Автор'
     )
@@ -68,6 +107,12 @@ class Recipe(models.Model):
         max_length=settings.MAX_LENGTH_NAME,
         verbose_name='Название рецепта'
     )
+    search_name = models.CharField(
+        max_length=settings.MAX_LENGTH_NAME,
+        blank=True,
+        editable=False,
+        verbose_name='Название для поиска'
+    )
     text = models.TextField(
         help_text='Опишите создание рецепта',
         verbose_name='Описание'
@@ -99,8 +144,73 @@ class Recipe(models.Model):
             MaxValueValidator(settings.MAX_VALUE)
         ]
     )
+    servings = models.PositiveSmallIntegerField(
+        verbose_name='Количество порций',
+        default=settings.DEFAULT_SERVINGS,
+        validators=[
+            MinValueValidator(settings.MIN_VALUE),
+            MaxValueValidator(settings.MAX_SERVINGS)
+        ]
+    )
+    kcal = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='Калорийность, ккал'
+    )
+    proteins = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='Белки, г'
+    )
+    fats = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='Жиры, г'
+    )
+    carbohydrates = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='Углеводы, г'
+    )
+    popularity = models.FloatField(
+        default=0,
+        db_index=True,
+        verbose_name='Популярность'
+    )
+    trending = models.FloatField(
+        default=0,
+        db_index=True,
+        verbose_name='Тренд'
+    )
+    deleted = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Удалён'
+    )
+    minhash = models.BinaryField(
+        null=True,
+        verbose_name='Сигнатура MinHash'
+    )
+
+    objects = RecipeManager()
+    all_objects = models.Manager()
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date'
+            ),
+            models.Index(
+                fields=('kcal',),
+                condition=models.Q(kcal__isnull=False),
+                name='recipe_kcal_not_null'
+            ),
+            models.Index(
+                fields=('cooking_time',),
+                name='recipe_cooking_time'
+            ),
+        ]
         ordering = ('-pub_date', )
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
@@ -121,15 +231,29 @@ class IngredientInRecipe(models.Model):
     ingredient = models.ForeignKey(
         Ingredient,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='Ингредиент'
     )
     recipe = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='Рецепт'
     )
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'ingredient'),
+                name='unique_ingredient_in_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('ingredient', 'recipe'),
+                name='ingredient_in_recipe_reverse'
+            )
+        ]
         ordering = ('ingredient',)
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецептах'
@@ -138,20 +262,55 @@ class IngredientInRecipe(models.Model):
         return f'{self.ingredient} в {self.recipe}'
 
 
+class RecipeBand(models.Model):
+    """Полоса сигнатуры MinHash рецепта для поиска похожих рецептов
+    (recipes/duplicates.py)."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='bands',
+        verbose_name='Рецепт'
+    )
+    key = models.BigIntegerField(
+        db_index=True,
+        verbose_name='Хеш полосы'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'key'),
+                name='unique_recipe_band'
+            )
+        ]
+        verbose_name = 'Полоса сигнатуры'
+        verbose_name_plural = 'Полосы сигнатур'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.key}'
+
+
 class Favorite(models.Model):
     """Промежуточная Model для избранного в рецептах."""
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='favorited_by',
         verbose_name='Пользователь'
     )
     recipe = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='favorited',
         verbose_name='Рецепт'
     )
+    created = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата добавления'
+    )
 
     def __str__(self):
         return f'Избранный рецепт {self.recipe} у {self.user}'
@@ -163,6 +322,12 @@ class Favorite(models.Model):
                 name='unique_favorite_user_recipe'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('recipe', 'user'),
+                name='favorite_recipe_user'
+            )
+        ]
         ordering = ('user',)
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
@@ -173,15 +338,29 @@ class ShoppingCart(models.Model):
     recipe = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='list_of_shopping',
         verbose_name='Рецепт в списке покупок'
     )
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='shopper',
         verbose_name='Пользователь'
     )
+    multiplier = models.PositiveSmallIntegerField(
+        verbose_name='Множитель',
+        default=1,
+        validators=[
+            MinValueValidator(settings.MIN_VALUE),
+            MaxValueValidator(settings.MAX_SERVINGS)
+        ]
+    )
+    created = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата добавления'
+    )
 
     class Meta:
         constraints = [
@@ -190,9 +369,236 @@ class ShoppingCart(models.Model):
                 name='unique_shopping_user_recipe'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('recipe', 'user'),
+                name='shopping_recipe_user'
+            )
+        ]
         ordering = ('user',)
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Список покупок'
 
     def __str__(self):
         return f'Список покупок из {self.recipe} у {self.user}'
+
+
+class MealPlan(models.Model):
+    """Model записи в плане питания."""
+    BREAKFAST = 'breakfast'
+    LUNCH = 'lunch'
+    DINNER = 'dinner'
+    SNACK = 'snack'
+    MEALS = (
+        (BREAKFAST, 'Завтрак'),
+        (LUNCH, 'Обед'),
+        (DINNER, 'Ужин'),
+        (SNACK, 'Перекус'),
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='meal_plans',
+        verbose_name='Пользователь'
+    )
+    date = models.DateField(verbose_name='Дата')
+    meal = models.CharField(
+        max_length=16,
+        choices=MEALS,
+        verbose_name='Приём пищи'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='meal_plans',
+        verbose_name='Рецепт'
+    )
+    servings = models.PositiveSmallIntegerField(
+        verbose_name='Количество порций',
+        validators=[
+            MinValueValidator(settings.MIN_VALUE),
+            MaxValueValidator(settings.MAX_SERVINGS)
+        ]
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('user', 'date'), name='mealplan_user_date')
+        ]
+        ordering = ('date', 'meal')
+        verbose_name = 'План питания'
+        verbose_name_plural = 'Планы питания'
+
+    def __str__(self):
+        return f'{self.recipe} на {self.date} у {self.user}'
+
+
+class MealPlanIngredient(models.Model):
+    """Материализованные суммы ингредиентов плана питания за день."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='meal_plan_ingredients',
+        verbose_name='Пользователь'
+    )
+    date = models.DateField(verbose_name='Дата')
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    amount = models.FloatField(verbose_name='Количество')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'date', 'ingredient'),
+                name='unique_mealplan_user_date_ingredient'
+            )
+        ]
+        verbose_name = 'Ингредиент плана питания'
+        verbose_name_plural = 'Ингредиенты планов питания'
+
+    def __str__(self):
+        return f'{self.ingredient} на {self.date} у {self.user}'
+
+
+class RankingEpoch(models.Model):
+    """Точка отсчёта для затухающих оценок популярности рецептов."""
+    epoch = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Точка отсчёта'
+    )
+
+    class Meta:
+        verbose_name = 'Точка отсчёта рейтингов'
+        verbose_name_plural = 'Точка отсчёта рейтингов'
+
+    def __str__(self):
+        return f'Рейтинги от {self.epoch}'
+
+
+class PurgeJob(models.Model):
+    """Фоновое удаление пользователя или рецепта с зависимыми данными."""
+    USER = 'user'
+    RECIPE = 'recipe'
+    TARGETS = (
+        (USER, 'Пользователь'),
+        (RECIPE, 'Рецепт'),
+    )
+    target = models.CharField(
+        max_length=10,
+        choices=TARGETS,
+        verbose_name='Объект'
+    )
+    object_id = models.PositiveBigIntegerField(verbose_name='ID объекта')
+    stage = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name='Этап'
+    )
+    cursor = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Последний удалённый id'
+    )
+    deleted = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Удалено строк'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создано'
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Обновлено'
+    )
+    finished = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершено'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('target', 'object_id'),
+                name='unique_purge_job_target'
+            )
+        ]
+        verbose_name = 'Удаление'
+        verbose_name_plural = 'Удаления'
+
+    def __str__(self):
+        return f'Удаление {self.target} #{self.object_id}'
+
+
+class ChangeLog(models.Model):
+    """Журнал изменений для синхронизации клиентов (recipes/changelog.py).
+
+    Номер записи растёт монотонно и служит токеном синхронизации.
+    Для рецептов user не задан, для избранного, списка покупок и
+    подписок object_id - id рецепта или автора."""
+    RECIPE = 'recipe'
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shopping_cart'
+    SUBSCRIPTION = 'subscription'
+    KINDS = (
+        (RECIPE, 'Рецепт'),
+        (FAVORITE, 'Избранное'),
+        (SHOPPING_CART, 'Список покупок'),
+        (SUBSCRIPTION, 'Подписка'),
+    )
+    seq = models.BigAutoField(primary_key=True, verbose_name='Номер')
+    kind = models.CharField(
+        max_length=16,
+        choices=KINDS,
+        verbose_name='Тип'
+    )
+    object_id = models.PositiveBigIntegerField(verbose_name='ID объекта')
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name='+',
+        verbose_name='Пользователь'
+    )
+    deleted = models.BooleanField(default=False, verbose_name='Удаление')
+    created = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='Время'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('kind', 'object_id', 'user', 'seq'),
+                name='changelog_object'
+            )
+        ]
+        ordering = ('seq',)
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+
+    def __str__(self):
+        return f'#{self.seq} {self.kind} {self.object_id}'
+
+
+class ChangeLogHorizon(models.Model):
+    """Номер, до которого включительно журнал изменений сжат: токены
+    синхронизации меньше него недействительны."""
+    seq = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Номер'
+    )
+
+    class Meta:
+        verbose_name = 'Граница журнала изменений'
+        verbose_name_plural = 'Граница журнала изменений'
+
+    def __str__(self):
+        return f'Журнал изменений с #{self.seq}'
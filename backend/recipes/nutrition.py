@@ -0,0 +1,76 @@
+from collections import defaultdict
+
+from .catalog import recipes_changed
+from .models import IngredientInRecipe, Recipe
+from .units import MASS_UNIT, to_base
+
+NUTRIENTS = ('kcal', 'proteins', 'fats', 'carbohydrates')
+
+BATCH_SIZE = 500
+
+
+def recalculate(recipe_ids):
+    """Пересчитывает пищевую ценность рецептов и сохраняет изменившуюся."""
+    recipe_ids = list(recipe_ids)
+    totals = defaultdict(lambda: dict.fromkeys(NUTRIENTS))
+    for row in IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list(
+        'recipe_id',
+        'amount',
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        *(f'ingredient__{nutrient}' for nutrient in NUTRIENTS)
+    ).iterator():
+        recipe_id, amount, name, unit, *values = row
+        grams, base = to_base(amount, unit, name)
+        if base != MASS_UNIT:
+            continue
+        recipe_totals = totals[recipe_id]
+        for nutrient, value in zip(NUTRIENTS, values):
+            if value is not None:
+                recipe_totals[nutrient] = (
+                    (recipe_totals[nutrient] or 0) + value * grams / 100
+                )
+    current = {
+        recipe_id: dict(zip(NUTRIENTS, values))
+        for recipe_id, *values in Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).values_list('pk', *NUTRIENTS).iterator()
+    }
+    changed = {}
+    for recipe_id, values in current.items():
+        new_values = {
+            nutrient: value if value is None else round(value, 1)
+            for nutrient, value in totals[recipe_id].items()
+        }
+        if new_values != values:
+            changed[recipe_id] = new_values
+    if not changed:
+        return
+    Recipe.objects.bulk_update(
+        [
+            Recipe(pk=recipe_id, **values)
+            for recipe_id, values in changed.items()
+        ],
+        NUTRIENTS,
+        batch_size=BATCH_SIZE
+    )
+    # Неизменившиеся рецепты не попадают в журнал изменений и кэш.
+    recipes_changed.send(sender=Recipe, recipe_ids=list(changed))
+
+
+def recalculate_all(batch_size=BATCH_SIZE):
+    """Пересчитывает весь каталог пачками по batch_size рецептов."""
+    last_id, processed = 0, 0
+    while True:
+        ids = list(
+            Recipe.objects.filter(pk__gt=last_id).order_by(
+                'pk'
+            ).values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return processed
+        recalculate(ids)
+        processed += len(ids)
+        last_id = ids[-1]
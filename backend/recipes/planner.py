@@ -0,0 +1,128 @@
+"""Материализованные суммы ингредиентов плана питания по дням.
+
+Записи плана учитываются приращениями (add_entry, remove_entry).
+После изменения ингредиентов или порций рецепта дни с этим рецептом
+пересчитываются заново (rebuild_recipes) фоновой задачей из
+recipes.signals, поэтому правки из админки и API учитываются одинаково.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import IngredientInRecipe, MealPlan, MealPlanIngredient
+
+# Остатки после вычитания дробных количеств.
+EPSILON = 1e-6
+
+
+def get_deltas(entries, sign=1):
+    """Вклад записей плана в суммы {(пользователь, день, ингредиент):
+    количество}."""
+    entries = list(entries)
+    deltas = defaultdict(float)
+    if not entries:
+        return deltas
+    recipe_ids = {entry.recipe_id for entry in entries}
+    amounts = defaultdict(list)
+    for recipe_id, ingredient_id, amount, servings in (
+        IngredientInRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list(
+            'recipe_id', 'ingredient_id', 'amount', 'recipe__servings'
+        )
+    ):
+        amounts[recipe_id].append((ingredient_id, amount / servings))
+    for entry in entries:
+        for ingredient_id, per_serving in amounts[entry.recipe_id]:
+            key = (entry.user_id, entry.date, ingredient_id)
+            deltas[key] += sign * per_serving * entry.servings
+    return deltas
+
+
+def apply_entries(entries, sign=1):
+    """Добавляет (sign=1) или вычитает (sign=-1) вклад записей плана
+    в материализованные суммы ингредиентов по дням."""
+    deltas = get_deltas(entries, sign)
+    if not deltas:
+        return
+    with transaction.atomic():
+        _apply_deltas(deltas)
+
+
+def _apply_deltas(deltas):
+    users = {user_id for user_id, _, _ in deltas}
+    dates = {date for _, date, _ in deltas}
+    ingredients = {ingredient_id for _, _, ingredient_id in deltas}
+    existing = {
+        (row.user_id, row.date, row.ingredient_id): row
+        for row in MealPlanIngredient.objects.select_for_update().filter(
+            user_id__in=users,
+            date__in=dates,
+            ingredient_id__in=ingredients
+        )
+    }
+    to_update, to_create, to_delete = [], [], []
+    for key, delta in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            if delta > EPSILON:
+                user_id, date, ingredient_id = key
+                to_create.append(MealPlanIngredient(
+                    user_id=user_id,
+                    date=date,
+                    ingredient_id=ingredient_id,
+                    amount=delta
+                ))
+            continue
+        row.amount += delta
+        if row.amount > EPSILON:
+            to_update.append(row)
+        else:
+            to_delete.append(row.pk)
+    MealPlanIngredient.objects.bulk_update(to_update, ('amount',))
+    MealPlanIngredient.objects.bulk_create(to_create)
+    MealPlanIngredient.objects.filter(pk__in=to_delete).delete()
+
+
+def add_entry(entry):
+    """Учитывает новую запись плана."""
+    apply_entries([entry])
+
+
+def remove_entry(entry):
+    """Убирает вклад удаляемой записи плана."""
+    apply_entries([entry], sign=-1)
+
+
+def rebuild_days(days):
+    """Пересчитывает заново суммы дней {(пользователь, день)} по их
+    записям плана."""
+    days = set(days)
+    if not days:
+        return
+    users = {user_id for user_id, _ in days}
+    dates = {date for _, date in days}
+    with transaction.atomic():
+        # Блокировка строк сумм упорядочивает пересчёт с add_entry и
+        # remove_entry тех же дней.
+        existing = [
+            row for row in MealPlanIngredient.objects.select_for_update(
+            ).filter(user_id__in=users, date__in=dates)
+            if (row.user_id, row.date) in days
+        ]
+        deltas = get_deltas(
+            entry for entry in MealPlan.objects.filter(
+                user_id__in=users, date__in=dates
+            )
+            if (entry.user_id, entry.date) in days
+        )
+        for row in existing:
+            deltas[(row.user_id, row.date, row.ingredient_id)] -= row.amount
+        _apply_deltas(deltas)
+
+
+def rebuild_recipes(recipe_ids):
+    """Пересчитывает дни планов, в которых есть рецепты recipe_ids."""
+    rebuild_days(MealPlan.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('user_id', 'date').distinct())
@@ -0,0 +1,227 @@
+"""Удаление пользователей и рецептов в два шага.
+
+Сначала объект помечается удалённым (рецепты пропадают из выдачи,
+пользователь не может войти), затем фоновая задача удаляет зависимые
+строки пачками по PURGE_BATCH_SIZE, каждая пачка - в своей короткой
+транзакции. Этап и последний удалённый id сохраняются в PurgeJob
+вместе с пачкой, поэтому прерванное удаление продолжается с того же
+места (manage.py purge_deleted или повтор задачи).
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from . import planner, ranking
+from .catalog import recipes_changed
+from .models import (
+    ChangeLog,
+    Favorite,
+    IngredientInRecipe,
+    MealPlan,
+    MealPlanIngredient,
+    PurgeJob,
+    Recipe,
+    RecipeBand,
+    ShoppingCart
+)
+from users.models import Subscription, User
+
+
+def remove_favorites(pks):
+    ranking.remove_events('favorite', Favorite.objects.filter(
+        pk__in=pks
+    ).values_list('recipe_id', 'created'))
+
+
+def remove_shopping_cart(pks):
+    ranking.remove_events('shopping_cart', ShoppingCart.objects.filter(
+        pk__in=pks
+    ).values_list('recipe_id', 'created'))
+
+
+def remove_meal_plans(pks):
+    planner.apply_entries(MealPlan.objects.filter(pk__in=pks), sign=-1)
+
+
+def record_removed(kind, model, field, pks):
+    """Записи журнала об удалении строк pks у их пользователей: клиенты
+    других пользователей узнают об этом при синхронизации."""
+    ChangeLog.objects.bulk_create([
+        ChangeLog(
+            kind=kind,
+            object_id=object_id,
+            user_id=user_id,
+            deleted=True
+        )
+        for user_id, object_id in model.objects.filter(
+            pk__in=pks
+        ).values_list('user_id', field)
+    ])
+
+
+def remove_subscribers(pks):
+    record_removed(ChangeLog.SUBSCRIPTION, Subscription, 'author_id', pks)
+
+
+def remove_recipe_favorites(pks):
+    record_removed(ChangeLog.FAVORITE, Favorite, 'recipe_id', pks)
+
+
+def remove_recipe_shopping_cart(pks):
+    record_removed(ChangeLog.SHOPPING_CART, ShoppingCart, 'recipe_id', pks)
+
+
+def remove_images(pks):
+    storage = Recipe._meta.get_field('image').storage
+    names = [
+        name for name in Recipe.all_objects.filter(
+            pk__in=pks
+        ).values_list('image', flat=True)
+        if name
+    ]
+    transaction.on_commit(lambda: [storage.delete(name) for name in names])
+
+
+def get_stages(job):
+    """Этапы удаления: (название, модель, фильтр, обработчик пачки).
+    Обработчик вызывается до удаления пачки и обновляет зависящие от
+    неё счётчики."""
+    stages = []
+    if job.target == PurgeJob.USER:
+        user_id = job.object_id
+        own = {'author_id': user_id}
+        related = {'recipe__author_id': user_id}
+        stages += [
+            ('favorites', Favorite, {'user_id': user_id}, remove_favorites),
+            (
+                'shopping_cart',
+                ShoppingCart,
+                {'user_id': user_id},
+                remove_shopping_cart
+            ),
+            ('subscriptions', Subscription, {'user_id': user_id}, None),
+            (
+                'subscribers',
+                Subscription,
+                {'author_id': user_id},
+                remove_subscribers
+            ),
+            ('meal_plans', MealPlan, {'user_id': user_id}, None),
+            (
+                'meal_plan_ingredients',
+                MealPlanIngredient,
+                {'user_id': user_id},
+                None
+            ),
+        ]
+    else:
+        own = {'pk': job.object_id}
+        related = {'recipe_id': job.object_id}
+    # Планы питания - до ингредиентов: их вклад считается по ним.
+    stages += [
+        ('recipe_meal_plans', MealPlan, related, remove_meal_plans),
+        ('recipe_ingredients', IngredientInRecipe, related, None),
+        ('recipe_tags', Recipe.tags.through, related, None),
+        ('recipe_bands', RecipeBand, related, None),
+        ('recipe_favorites', Favorite, related, remove_recipe_favorites),
+        (
+            'recipe_shopping_cart',
+            ShoppingCart,
+            related,
+            remove_recipe_shopping_cart
+        ),
+        ('recipes', Recipe, own, remove_images),
+    ]
+    if job.target == PurgeJob.USER:
+        # Журнал пользователя может быть большим; записи об удалении его
+        # рецептов (без user) остаются для других клиентов.
+        stages.append(('changelog', ChangeLog, {'user_id': user_id}, None))
+    return stages
+
+
+def raw_delete(model, pks):
+    """DELETE без загрузки объектов, каскадов и сигналов."""
+    queryset = model._base_manager.filter(pk__in=pks)
+    return queryset._raw_delete(queryset.db)
+
+
+def finish(job):
+    if job.target == PurgeJob.USER:
+        # Оставшиеся связи (токен, журнал админки) невелики.
+        User.objects.filter(pk=job.object_id).delete()
+    job.stage = ''
+    job.cursor = 0
+    job.finished = timezone.now()
+    job.save(update_fields=('stage', 'cursor', 'finished', 'updated'))
+
+
+def run(job, batch_size=None, time_limit=None):
+    """Продолжает удаление. Возвращает False, если остановилось по
+    time_limit (в секундах) и его нужно продолжить."""
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    started = time.monotonic()
+    stages = get_stages(job)
+    names = [name for name, _, _, _ in stages]
+    start = names.index(job.stage) if job.stage in names else 0
+    for name, model, filters, handler in stages[start:]:
+        if job.stage != name:
+            job.stage = name
+            job.cursor = 0
+        while True:
+            pks = list(model._base_manager.filter(
+                pk__gt=job.cursor, **filters
+            ).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            with transaction.atomic():
+                if handler is not None:
+                    handler(pks)
+                raw_delete(model, pks)
+                job.cursor = pks[-1]
+                job.deleted[name] = job.deleted.get(name, 0) + len(pks)
+                job.save(update_fields=(
+                    'stage', 'cursor', 'deleted', 'updated'
+                ))
+            if len(pks) < batch_size:
+                break
+            if (time_limit is not None
+                    and time.monotonic() - started > time_limit):
+                return False
+    finish(job)
+    return True
+
+
+def start(target, object_id):
+    from .tasks import purge_deleted
+
+    job = PurgeJob.objects.get_or_create(
+        target=target, object_id=object_id
+    )[0]
+    purge_deleted.delay(job.pk, key=f'purge:{job.pk}')
+    return job
+
+
+@transaction.atomic
+def delete_recipe(recipe):
+    """Помечает рецепт удалённым и ставит его удаление в очередь."""
+    Recipe.all_objects.filter(pk=recipe.pk).update(deleted=timezone.now())
+    recipes_changed.send(sender=Recipe, recipe_ids=[recipe.pk], deleted=True)
+    return start(PurgeJob.RECIPE, recipe.pk)
+
+
+@transaction.atomic
+def delete_user(user):
+    """Отключает пользователя, скрывает его рецепты и ставит удаление
+    в очередь."""
+    now = timezone.now()
+    User.objects.filter(pk=user.pk).update(is_active=False, deleted=now)
+    recipe_ids = list(Recipe.objects.filter(author=user).values_list(
+        'id', flat=True
+    ))
+    Recipe.all_objects.filter(author=user).update(deleted=now)
+    recipes_changed.send(sender=Recipe, recipe_ids=recipe_ids, deleted=True)
+    Token.objects.filter(user=user).delete()
+    return start(PurgeJob.USER, user.pk)
@@ -0,0 +1,143 @@
+"""Затухающие оценки популярности рецептов.
+
+Используется «прямое» затухание: событие в момент t добавляет к оценке
+weight * 2 ** ((t - epoch) / half_life). Затухшая на текущий момент
+оценка отличается от хранимой общим для всех рецептов множителем,
+поэтому сортировка по колонке совпадает с сортировкой по затухшей
+оценке, а старые значения не нужно пересчитывать при каждом событии.
+normalize() переносит точку отсчёта, чтобы числа не росли
+неограниченно: раз в RANKING_NORMALIZE_INTERVAL её ставит в очередь
+воркер задач (TASKS_PERIODIC), а если событие пришло так поздно, что его
+вклад близок к пределу float, - record_event и remove_events.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F, Value
+from django.utils import timezone
+
+from .models import Favorite, RankingEpoch, Recipe, ShoppingCart
+
+SCORES = ('popularity', 'trending')
+
+EVENTS = {
+    Favorite: 'favorite',
+    ShoppingCart: 'shopping_cart',
+}
+
+BATCH_SIZE = 1000
+
+# 2 ** MAX_EXPONENT далеко от предела float (2 ** 1024), даже если
+# сложить вклады многих событий.
+MAX_EXPONENT = 512
+
+
+def lock_epoch():
+    """Точка отсчёта под блокировкой до конца транзакции: normalize
+    (SELECT ... FOR UPDATE) не перенесёт её, пока вклад события,
+    посчитанный от неё, не записан. На PostgreSQL блокировка
+    разделяемая, чтобы события не ждали друг друга."""
+    using = router.db_for_write(RankingEpoch)
+    if connections[using].vendor == 'postgresql':
+        state = list(RankingEpoch.objects.db_manager(using).raw(
+            f'SELECT id, epoch FROM {RankingEpoch._meta.db_table} '
+            'WHERE id = 1 FOR SHARE'
+        ))
+        if state:
+            return state[0].epoch
+    return RankingEpoch.objects.using(using).select_for_update(
+    ).get_or_create(pk=1)[0].epoch
+
+
+def get_epoch(when=None):
+    """Точка отсчёта оценок (вызывается в транзакции). Если вклад
+    события в момент when близок к переполнению, точка отсчёта сначала
+    переносится."""
+    epoch = lock_epoch()
+    if when is not None and (when - epoch).total_seconds() > (
+        MAX_EXPONENT * min(settings.RANKING_HALF_LIFE.values())
+    ):
+        normalize()
+        epoch = RankingEpoch.objects.get(pk=1).epoch
+    return epoch
+
+
+def contributions(weight, when, epoch):
+    """Вклад события в каждую из оценок."""
+    elapsed = (when - epoch).total_seconds()
+    return {
+        score: weight * 2 ** (elapsed / settings.RANKING_HALF_LIFE[score])
+        for score in SCORES
+    }
+
+
+@transaction.atomic
+def record_event(event, recipe_id, when, sign=1):
+    """Учитывает добавление (sign=1) или удаление (sign=-1)
+    рецепта в избранное или список покупок."""
+    weight = settings.RANKING_WEIGHTS[event]
+    values = contributions(sign * weight, when, get_epoch(when))
+    Recipe.objects.filter(pk=recipe_id).update(**{
+        score: F(score) + Value(value) for score, value in values.items()
+    })
+
+
+@transaction.atomic
+def remove_events(event, rows):
+    """Вычитает вклад строк (recipe_id, created), удаляемых без
+    сигналов, одним UPDATE на рецепт."""
+    weight = settings.RANKING_WEIGHTS[event]
+    epoch = get_epoch(timezone.now())
+    totals = defaultdict(lambda: dict.fromkeys(SCORES, 0.0))
+    for recipe_id, created in rows:
+        values = contributions(-weight, created, epoch)
+        for score, value in values.items():
+            totals[recipe_id][score] += value
+    for recipe_id, values in totals.items():
+        Recipe.objects.filter(pk=recipe_id).update(**{
+            score: F(score) + Value(value)
+            for score, value in values.items()
+        })
+
+
+@transaction.atomic
+def normalize():
+    """Переносит точку отсчёта на текущий момент и масштабирует оценки."""
+    state = RankingEpoch.objects.select_for_update().get_or_create(pk=1)[0]
+    now = timezone.now()
+    factors = contributions(1, state.epoch, now)
+    Recipe.objects.update(**{
+        score: F(score) * Value(factor) for score, factor in factors.items()
+    })
+    state.epoch = now
+    state.save(update_fields=('epoch',))
+
+
+@transaction.atomic
+def recompute(batch_size=BATCH_SIZE):
+    """Пересчитывает все оценки по истории избранного и покупок."""
+    state = RankingEpoch.objects.select_for_update().get_or_create(pk=1)[0]
+    state.epoch = timezone.now()
+    state.save(update_fields=('epoch',))
+    totals = defaultdict(lambda: dict.fromkeys(SCORES, 0.0))
+    for model, event in EVENTS.items():
+        weight = settings.RANKING_WEIGHTS[event]
+        for recipe_id, created in model.objects.values_list(
+            'recipe_id', 'created'
+        ).order_by().iterator(chunk_size=batch_size):
+            recipe_totals = totals[recipe_id]
+            for score, value in contributions(
+                weight, created, state.epoch
+            ).items():
+                recipe_totals[score] += value
+    Recipe.objects.update(**dict.fromkeys(SCORES, 0))
+    Recipe.objects.bulk_update(
+        [
+            Recipe(pk=recipe_id, **values)
+            for recipe_id, values in totals.items()
+        ],
+        SCORES,
+        batch_size=batch_size
+    )
+    return len(totals)
@@ -0,0 +1,273 @@
+"""Нечёткий поиск ингредиентов и рецептов по названию.
+
+Название приводится к поисковой форме (search_name): нижний регистр,
+ё -> е, слова без окончаний (stem). Запрос приводится к той же форме и
+сравнивается по триграммам, как word_similarity в pg_trgm: доля
+триграмм запроса, найденных в названии. Так "абрикос" находит
+"абрикосы консервированные", а "абрекос" и "ёжевика" - "абрикосы" и
+"ежевика".
+
+Кандидаты берутся из заранее построенного индекса триграмм, а не
+перебором всех названий: на PostgreSQL - GIN-индекс pg_trgm по
+search_name, на SQLite - индекс в памяти процесса. Индекс
+ингредиентов перестраивается при смене версии справочников, а индекс
+рецептов догоняет журнал изменений (общий для всех процессов):
+перечитываются только рецепты из записей после последней учтённой. Не
+больше SEARCH_MAX_CANDIDATES лучших кандидатов
+упорядочиваются по расстоянию Левенштейна между словами запроса и
+названия: триграммы плохо различают опечатку в начале короткого слова
+("малоко").
+"""
+import heapq
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, connections, router, transaction
+from django.db.models import BooleanField, Case, FloatField, When
+from django.db.models.expressions import RawSQL
+
+from . import catalog, changelog
+from .models import ChangeLog
+
+WORD = re.compile(r'[^\W_]+')
+
+# Окончания прилагательных, причастий и существительных, от длинных к
+# коротким. Глаголы в названиях почти не встречаются.
+ENDINGS = sorted({
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое',
+    'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую',
+    'юю', 'ая', 'яя', 'ою', 'ею',
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ье',
+    'еи', 'ии', 'ям', 'ам', 'ах', 'ях', 'ию', 'ью', 'ия', 'ья',
+    'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю', 'я',
+}, key=len, reverse=True)
+MIN_STEM = 3
+
+
+def stem(word):
+    """Основа слова: без одного окончания, не короче MIN_STEM."""
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def normalize(text):
+    """Поисковая форма названия."""
+    return ' '.join(
+        stem(word) for word in WORD.findall(text.lower().replace('ё', 'е'))
+    )
+
+
+def get_trigrams(search_name):
+    """Триграммы слов, как в pg_trgm: слово дополняется двумя пробелами
+    в начале и одним в конце."""
+    trigrams = set()
+    for word in search_name.split():
+        word = f'  {word} '
+        trigrams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return trigrams
+
+
+def distance(a, b):
+    """Расстояние Левенштейна."""
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != other)
+            ))
+        previous = current
+    return previous[-1]
+
+
+def rank(query, candidates):
+    """id кандидатов (id, search_name, похожесть) от лучших: ближе по
+    словам, похожее по триграммам, короче."""
+    words = query.split()
+
+    def key(candidate):
+        pk, search_name, score = candidate
+        names = search_name.split() or ['']
+        return (
+            sum(min(distance(word, name) for name in names)
+                for word in words),
+            -score,
+            len(search_name),
+            pk
+        )
+
+    return [candidate[0] for candidate in sorted(candidates, key=key)]
+
+
+class TrigramIndex:
+    """Обратный индекс триграмма -> id для поиска в памяти."""
+
+    def __init__(self, rows=()):
+        self.names = {}
+        self.postings = defaultdict(set)
+        self.lock = threading.Lock()
+        self.update(rows)
+
+    def update(self, rows):
+        """Добавляет или заменяет названия (id, search_name)."""
+        with self.lock:
+            for pk, search_name in rows:
+                self.discard(pk)
+                self.names[pk] = search_name
+                for trigram in get_trigrams(search_name):
+                    self.postings[trigram].add(pk)
+
+    def remove(self, pks):
+        with self.lock:
+            for pk in pks:
+                self.discard(pk)
+
+    def discard(self, pk):
+        for trigram in get_trigrams(self.names.pop(pk, '')):
+            self.postings[trigram].discard(pk)
+
+    def search(self, query, limit):
+        """Не больше limit кандидатов (id, search_name, похожесть)."""
+        trigrams = get_trigrams(query)
+        if not trigrams:
+            return []
+        matches = Counter()
+        with self.lock:
+            for trigram in trigrams:
+                matches.update(self.postings.get(trigram, ()))
+            names = {pk: self.names[pk] for pk in matches}
+        needed = settings.SEARCH_SIMILARITY_THRESHOLD * len(trigrams)
+        best = heapq.nlargest(
+            limit,
+            ((count, pk) for pk, count in matches.items() if count >= needed)
+        )
+        return [(pk, names[pk], count / len(trigrams)) for count, pk in best]
+
+
+class RecipeIndex:
+    """Индекс рецептов, догоняющий журнал изменений.
+
+    seq - номер записи, до которой изменения учтены. Номера выдаются
+    при вставке, а видны после фиксации, поэтому seq сдвигается только
+    за записи старше SYNC_SETTLE_SECONDS (changelog.get_safe_seq), а
+    более новые применяются повторно. Старые записи удаляются через
+    SYNC_RETENTION_SECONDS, поэтому индекс, который дольше половины
+    этого срока не перестраивался, строится заново."""
+
+    def __init__(self, model):
+        self.model = model
+        self.seq = changelog.get_safe_seq(0)
+        self.built = time.monotonic()
+        self.index = TrigramIndex(
+            model.objects.values_list('id', 'search_name').iterator()
+        )
+
+    def is_stale(self):
+        return (
+            time.monotonic() - self.built
+            > settings.SYNC_RETENTION_SECONDS / 2
+        )
+
+    def refresh(self):
+        ids = set(ChangeLog.objects.filter(
+            kind=ChangeLog.RECIPE, seq__gt=self.seq
+        ).order_by().values_list('object_id', flat=True))
+        if not ids:
+            return
+        # Удалённые рецепты убираются и не добавляются обратно.
+        self.index.remove(ids)
+        self.index.update(self.model.objects.filter(
+            pk__in=ids
+        ).order_by().values_list('id', 'search_name'))
+        self.seq = changelog.get_safe_seq(self.seq)
+
+
+# Индексы процесса: модель -> (версия справочников, индекс) для
+# ингредиентов или RecipeIndex.
+indexes = {}
+
+
+def get_index(model):
+    if model._meta.model_name != 'ingredient':
+        state = indexes.get(model)
+        if state is None or state.is_stale():
+            state = indexes[model] = RecipeIndex(model)
+        state.refresh()
+        return state.index
+    version = catalog.get_version()
+    state = indexes.get(model)
+    if state is None or state[0] != version:
+        state = version, TrigramIndex(
+            model.objects.values_list('id', 'search_name').iterator()
+        )
+        indexes[model] = state
+    return state[1]
+
+
+def set_threshold(using):
+    """Порог pg_trgm.word_similarity_threshold для оператора <%.
+
+    Задаётся на транзакцию (SET LOCAL): с PgBouncer в режиме
+    транзакций настройка сеанса попала бы в чужие соединения."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT set_config('pg_trgm.word_similarity_threshold', "
+            '%s, true)',
+            [str(settings.SEARCH_SIMILARITY_THRESHOLD)]
+        )
+
+
+def similar(model, query, using):
+    """Объекты model, похожие на нормализованный query (PostgreSQL).
+    Оператор <% использует GIN-индекс."""
+    column = f'"{model._meta.db_table}"."search_name"'
+    return model.objects.using(using).filter(
+        RawSQL(f'%s <%% {column}', (query,), output_field=BooleanField())
+    ).annotate(
+        score=RawSQL(
+            f'word_similarity(%s, {column})',
+            (query,),
+            output_field=FloatField()
+        )
+    ).order_by('-score')
+
+
+def find(model, query, limit=None):
+    """id похожих на query объектов model, от более похожих."""
+    limit = limit or settings.SEARCH_MAX_CANDIDATES
+    query = normalize(query)
+    if not query:
+        return []
+    if connection.vendor != 'postgresql':
+        return rank(query, get_index(model).search(query, limit))
+    using = router.db_for_read(model)
+    with transaction.atomic(using=using):
+        set_threshold(using)
+        found = list(similar(model, query, using).values_list(
+            'id', 'search_name', 'score'
+        )[:limit])
+    return rank(query, found)
+
+
+def search(queryset, query, limit=None):
+    """queryset, отфильтрованный по названию: сначала начинающиеся с
+    query, затем похожие."""
+    limit = limit or settings.SEARCH_MAX_CANDIDATES
+    ids = list(queryset.filter(name__istartswith=query).values_list(
+        'id', flat=True
+    )[:limit])
+    found = set(ids)
+    ids += [
+        pk for pk in find(queryset.model, query, limit) if pk not in found
+    ][:limit - len(ids)]
+    return queryset.filter(id__in=ids).order_by(Case(
+        *(When(id=pk, then=position) for position, pk in enumerate(ids)),
+        default=len(ids)
+    ))
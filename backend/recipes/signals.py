@@ -0,0 +1,194 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save
+)
+from django.dispatch import receiver
+
+from . import catalog, changelog, ranking, search
+from .models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+from .tasks import rebuild_meal_plans, recalculate_nutrition
+from users.models import Subscription, User
+
+
+def rank_event(instance, sign):
+    # В той же транзакции, что и строка избранного: повтор задачи из
+    # очереди учёл бы событие дважды.
+    ranking.record_event(
+        ranking.EVENTS[type(instance)],
+        instance.recipe_id,
+        instance.created,
+        sign
+    )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def rank_added(sender, instance, created, **kwargs):
+    if created:
+        rank_event(instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def rank_removed(sender, instance, **kwargs):
+    rank_event(instance, -1)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+def catalog_changed(sender, **kwargs):
+    catalog.bump_version()
+
+
+def send_recipes_changed(recipe_ids, deleted=False):
+    catalog.recipes_changed.send(
+        sender=Recipe, recipe_ids=list(recipe_ids), deleted=deleted
+    )
+
+
+# Рецепты содержат названия тегов и ингредиентов.
+CATALOG_FIELDS = {Ingredient: 'ingredients', Tag: 'tags'}
+
+
+def get_recipe_ids(item):
+    return Recipe.objects.filter(
+        **{CATALOG_FIELDS[type(item)]: item}
+    ).values_list('id', flat=True)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+def catalog_item_saved(sender, instance, created, **kwargs):
+    if not created:
+        send_recipes_changed(get_recipe_ids(instance))
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    # Связи с рецептами удаляются без сигнала m2m_changed.
+    send_recipes_changed(get_recipe_ids(instance))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    send_recipes_changed([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    send_recipes_changed([instance.pk], deleted=True)
+
+
+def update_ingredient_totals(recipe_ids):
+    """Ставит пересчёт пищевой ценности и сумм планов питания после
+    изменения ингредиентов рецептов: по одной задаче на транзакцию."""
+    recalculate_nutrition.delay_batch(recipe_ids)
+    rebuild_meal_plans.delay_batch(recipe_ids)
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    send_recipes_changed([instance.recipe_id])
+    update_ingredient_totals([instance.recipe_id])
+
+
+def get_changed_recipe_ids(sender, instance, action, reverse, pk_set):
+    """id рецептов, связи которых меняет сигнал m2m_changed."""
+    if not reverse:
+        return [instance.pk] if action.startswith('post_') else []
+    if action == 'pre_clear':
+        return list(sender.objects.filter(**{
+            f'{instance._meta.model_name}_id': instance.pk
+        }).values_list('recipe_id', flat=True))
+    if action in ('post_add', 'post_remove'):
+        return list(pk_set)
+    return []
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    recipe_ids = get_changed_recipe_ids(
+        sender, instance, action, reverse, pk_set
+    )
+    if recipe_ids:
+        send_recipes_changed(recipe_ids)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_totals_changed(sender, instance, action, reverse,
+                                      pk_set, **kwargs):
+    # clear() и bulk_create не отправляют post_save и post_delete строк.
+    update_ingredient_totals(get_changed_recipe_ids(
+        sender, instance, action, reverse, pk_set
+    ))
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_servings(sender, instance, update_fields, **kwargs):
+    # Нового рецепта в планах нет.
+    if instance.pk is None or (
+        update_fields and 'servings' not in update_fields
+    ):
+        instance.servings_changed = False
+        return
+    instance.servings_changed = Recipe.all_objects.filter(
+        pk=instance.pk
+    ).exclude(servings=instance.servings).exists()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_servings_changed(sender, instance, **kwargs):
+    # Суммы планов считаются на порцию.
+    if getattr(instance, 'servings_changed', False):
+        rebuild_meal_plans.delay_batch([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, update_fields, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    recipe_ids = Recipe.objects.filter(author=instance).values_list(
+        'id', flat=True
+    )
+    if recipe_ids:
+        send_recipes_changed(recipe_ids)
+
+
+@receiver(catalog.recipes_changed)
+def log_recipes(sender, recipe_ids, deleted=False, **kwargs):
+    changelog.record_recipes(recipe_ids, deleted)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+def log_user_change(sender, instance, **kwargs):
+    changelog.record_user_change(instance)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+def log_user_removal(sender, instance, **kwargs):
+    changelog.record_user_change(instance, deleted=True)
+
+
+@receiver(pre_save, sender=Ingredient)
+@receiver(pre_save, sender=Recipe)
+def set_search_name(sender, instance, **kwargs):
+    instance.search_name = search.normalize(instance.name)
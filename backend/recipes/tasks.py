@@ -0,0 +1,29 @@
+from django.conf import settings
+
+from . import nutrition, planner, purge, ranking
+from .models import PurgeJob
+from tasks.registry import task
+
+
+@task()
+def recalculate_nutrition(recipe_ids):
+    nutrition.recalculate(recipe_ids)
+
+
+@task()
+def rebuild_meal_plans(recipe_ids):
+    planner.rebuild_recipes(recipe_ids)
+
+
+@task()
+def normalize_rankings():
+    ranking.normalize()
+
+
+@task()
+def purge_deleted(job_id):
+    job = PurgeJob.objects.filter(pk=job_id, finished__isnull=True).first()
+    if job is None:
+        return
+    if not purge.run(job, time_limit=settings.PURGE_TIME_LIMIT):
+        purge_deleted.delay(job_id, key=f'purge:{job_id}')
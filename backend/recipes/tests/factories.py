@@ -0,0 +1,57 @@
+"""Создание объектов для тестов."""
+from itertools import count
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from users.models import User
+
+numbers = count(1)
+
+
+def create_user(**fields):
+    number = next(numbers)
+    fields = {
+        'username': f'user{number}',
+        'email': f'user{number}@example.com',
+        'first_name': 'Имя',
+        'last_name': 'Фамилия',
+        **fields,
+    }
+    user = User(**fields)
+    user.set_password('password')
+    user.save()
+    return user
+
+
+def create_tag(**fields):
+    number = next(numbers)
+    return Tag.objects.create(**{
+        'name': f'Тег {number}',
+        'color': f'#{number:06X}',
+        'slug': f'tag{number}',
+        **fields,
+    })
+
+
+def create_ingredient(name='мука', measurement_unit='г', **fields):
+    return Ingredient.objects.create(
+        name=name, measurement_unit=measurement_unit, **fields
+    )
+
+
+def create_recipe(author=None, ingredients=(), tags=(), **fields):
+    """Рецепт с ингредиентами [(ингредиент, количество), ...] без
+    изображения в хранилище."""
+    recipe = Recipe.objects.create(**{
+        'author': author or create_user(),
+        'name': f'Рецепт {next(numbers)}',
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': 'recipes/images/test.png',
+        **fields,
+    })
+    IngredientInRecipe.objects.bulk_create([
+        IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in ingredients
+    ])
+    recipe.tags.set(tags)
+    return recipe
@@ -0,0 +1,49 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .factories import create_recipe, create_user
+from foodgram.paginators import EstimatedCountPaginator, is_unfiltered
+from recipes.models import Recipe
+
+
+@override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=2)
+class EstimatedCountTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user(is_staff=True, is_superuser=True)
+        cls.recipes = [
+            create_recipe(author=cls.admin, name=name)
+            for name in ('Блины', 'Борщ', 'Щи')
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_manager_filter_is_not_a_filter(self):
+        self.assertTrue(is_unfiltered(Recipe.objects.order_by('-id')))
+        self.assertFalse(is_unfiltered(Recipe.objects.filter(name='x')))
+
+    def test_recipe_changelist_uses_estimate(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('admin:recipes_recipe_changelist')
+            )
+        self.assertEqual(response.status_code, 200)
+        paginator = response.context['cl'].paginator
+        self.assertIsInstance(paginator, EstimatedCountPaginator)
+        self.assertEqual(paginator.count, self.recipes[-1].pk)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'COUNT(*)' in query['sql']
+            and '"recipes_recipe"' in query['sql']
+        ])
+
+    def test_filtered_changelist_counts_rows(self):
+        response = self.client.get(
+            reverse('admin:recipes_recipe_changelist'),
+            {'q': 'Бл'}
+        )
+        self.assertEqual(response.context['cl'].paginator.count, 1)
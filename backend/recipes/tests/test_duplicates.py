@@ -0,0 +1,51 @@
+from django.test import TestCase
+
+from .factories import create_ingredient, create_recipe
+from recipes import duplicates
+
+TEXT = (
+    'Смешать муку, яйца и молоко, дать тесту постоять полчаса. '
+    'Жарить тонкие блины на разогретой сковороде с двух сторон.'
+)
+
+
+class DuplicatesTest(TestCase):
+
+    def setUp(self):
+        self.flour = create_ingredient('мука', 'г')
+        self.milk = create_ingredient('молоко', 'мл')
+        self.eggs = create_ingredient('яйца', 'шт')
+        self.original = create_recipe(
+            name='Блины',
+            text=TEXT,
+            ingredients=[(self.flour, 200), (self.milk, 500), (self.eggs, 2)]
+        )
+        duplicates.update_signatures([self.original.pk])
+
+    def get_similar(self, text, ingredients):
+        return duplicates.find_similar(duplicates.get_signature(
+            duplicates.get_features(
+                text, [ingredient.pk for ingredient in ingredients]
+            )
+        ))
+
+    def test_renamed_repost(self):
+        similar = self.get_similar(TEXT, [self.flour, self.milk, self.eggs])
+        self.assertEqual(similar, [(self.original, 1.0)])
+
+    def test_different_recipe(self):
+        self.assertEqual(self.get_similar(
+            'Отварить картофель, размять с молоком и маслом.',
+            [self.milk, create_ingredient('картофель', 'г')]
+        ), [])
+
+    def test_clusters(self):
+        repost = create_recipe(
+            name='Блинчики',
+            text=TEXT,
+            ingredients=[(self.flour, 200), (self.milk, 500), (self.eggs, 2)]
+        )
+        duplicates.update_signatures([repost.pk])
+        self.assertEqual(
+            duplicates.find_clusters(), [[self.original.pk, repost.pk]]
+        )
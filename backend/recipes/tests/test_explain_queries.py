@@ -0,0 +1,21 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class ExplainQueriesTest(TestCase):
+
+    def test_covers_hot_queries(self):
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+        for title in (
+            'ordering=popular',
+            'ordering=trending',
+            'cooking_time__lte filter',
+            'cooking_time__gte filter',
+            'recipe name prefix search',
+            'sync changes',
+            'sync safe token',
+        ):
+            self.assertIn(title, out.getvalue())
@@ -0,0 +1,74 @@
+import datetime
+
+from django.test import TestCase
+
+from .factories import create_ingredient, create_recipe, create_user
+from recipes.merge import apply_plan, find_duplicates, get_factor
+from recipes.models import Ingredient, IngredientInRecipe, MealPlanIngredient
+
+
+class MergeTest(TestCase):
+
+    def test_get_factor(self):
+        self.assertEqual(get_factor('л', 'мл', 'молоко'), 1000)
+        self.assertAlmostEqual(get_factor('мл', 'г', 'мука'), 0.6)
+        self.assertIsNone(get_factor('шт.', 'г', 'яйца'))
+
+    def test_find_duplicates(self):
+        target = create_ingredient('молоко', 'мл')
+        liters = create_ingredient('молоко', 'л')
+        create_ingredient('яйца', 'шт.')
+        create_ingredient('молоко сгущенное', 'шт.')
+        [(found, merged)] = find_duplicates()
+        self.assertEqual(found, target)
+        self.assertEqual([ingredient for ingredient, _ in merged], [liters])
+
+    def test_repoint_converts_and_sums_amounts(self):
+        milk = create_ingredient('молоко', 'мл')
+        liters = create_ingredient('молоко', 'л')
+        glasses = create_ingredient('молоко', 'стакан')
+        both = create_recipe(ingredients=[(milk, 200), (liters, 1)])
+        single = create_recipe(ingredients=[(glasses, 2)])
+        user = create_user()
+        today = datetime.date.today()
+        MealPlanIngredient.objects.create(
+            user=user, date=today, ingredient=milk, amount=100
+        )
+        MealPlanIngredient.objects.create(
+            user=user, date=today, ingredient=liters, amount=0.5
+        )
+        self.assertEqual(
+            apply_plan([(milk.pk, [liters.pk, glasses.pk])]), 2
+        )
+        self.assertEqual(
+            set(Ingredient.objects.values_list('pk', flat=True)), {milk.pk}
+        )
+        self.assertEqual(
+            list(IngredientInRecipe.objects.filter(
+                recipe=both
+            ).values_list('ingredient_id', 'amount')),
+            [(milk.pk, 1200)]
+        )
+        self.assertEqual(
+            list(IngredientInRecipe.objects.filter(
+                recipe=single
+            ).values_list('ingredient_id', 'amount')),
+            [(milk.pk, 400)]
+        )
+        self.assertEqual(
+            list(MealPlanIngredient.objects.values_list(
+                'ingredient_id', 'amount'
+            )),
+            [(milk.pk, 600)]
+        )
+
+    def test_plan_validation(self):
+        flour = create_ingredient()
+        with self.assertRaises(ValueError):
+            apply_plan([(flour.pk, [flour.pk])])
+        with self.assertRaises(ValueError):
+            apply_plan([(flour.pk, [flour.pk + 1])])
+        eggs = create_ingredient('яйца', 'шт.')
+        with self.assertRaises(ValueError):
+            apply_plan([(flour.pk, [eggs.pk])])
+        self.assertEqual(Ingredient.objects.count(), 2)
@@ -0,0 +1,32 @@
+from django.test import TestCase
+
+from .factories import create_ingredient, create_recipe
+from recipes import nutrition
+from recipes.models import ChangeLog, Recipe
+
+
+class RecalculateTest(TestCase):
+
+    def setUp(self):
+        flour = create_ingredient('мука', 'г', kcal=300, proteins=10)
+        self.recipe = create_recipe(ingredients=[(flour, 200)])
+        self.other = create_recipe(ingredients=[(flour, 100)])
+        nutrition.recalculate([self.other.pk])
+
+    def get_logged(self):
+        return set(ChangeLog.objects.filter(
+            kind=ChangeLog.RECIPE
+        ).values_list('object_id', flat=True))
+
+    def test_signals_only_changed_recipes(self):
+        ChangeLog.objects.all().delete()
+        nutrition.recalculate([self.recipe.pk, self.other.pk])
+        self.recipe.refresh_from_db()
+        self.assertEqual((self.recipe.kcal, self.recipe.proteins), (600, 20))
+        self.assertEqual(self.get_logged(), {self.recipe.pk})
+        ChangeLog.objects.all().delete()
+        self.assertEqual(nutrition.recalculate_all(), 2)
+        self.assertEqual(self.get_logged(), set())
+        self.assertEqual(
+            Recipe.objects.get(pk=self.other.pk).kcal, 300
+        )
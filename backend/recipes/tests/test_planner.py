@@ -0,0 +1,80 @@
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from .factories import create_ingredient, create_recipe, create_user
+from recipes import planner
+from recipes.models import IngredientInRecipe, MealPlan, MealPlanIngredient
+
+DAY = date(2026, 1, 1)
+
+
+@override_settings(TASKS_EAGER=True)
+class MealPlanTotalsTest(TestCase):
+    """Суммы плана следуют за правками рецепта на уровне моделей, как
+    при редактировании в админке."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.flour = create_ingredient('мука', 'г', kcal=300)
+        self.milk = create_ingredient('молоко', 'мл')
+        self.recipe = create_recipe(
+            ingredients=[(self.flour, 200), (self.milk, 400)], servings=2
+        )
+        entry = MealPlan.objects.create(
+            user=self.user, date=DAY, meal=MealPlan.LUNCH,
+            recipe=self.recipe, servings=3
+        )
+        planner.add_entry(entry)
+
+    def get_totals(self):
+        return dict(MealPlanIngredient.objects.filter(
+            user=self.user, date=DAY
+        ).values_list('ingredient__name', 'amount'))
+
+    def test_add_entry(self):
+        self.assertEqual(self.get_totals(), {'мука': 300, 'молоко': 600})
+
+    def test_ingredient_row_changed(self):
+        row = IngredientInRecipe.objects.get(ingredient=self.flour)
+        row.amount = 100
+        with self.captureOnCommitCallbacks(execute=True):
+            row.save()
+        self.assertEqual(self.get_totals(), {'мука': 150, 'молоко': 600})
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.kcal, 300)
+
+    def test_ingredient_row_deleted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientInRecipe.objects.filter(ingredient=self.milk).delete()
+        self.assertEqual(self.get_totals(), {'мука': 300})
+
+    def test_ingredients_cleared(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.ingredients.clear()
+            IngredientInRecipe.objects.create(
+                recipe=self.recipe, ingredient=self.milk, amount=100
+            )
+        self.assertEqual(self.get_totals(), {'молоко': 150})
+        self.recipe.refresh_from_db()
+        self.assertIsNone(self.recipe.kcal)
+
+    def test_servings_changed(self):
+        self.recipe.servings = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+        self.assertEqual(self.get_totals(), {'мука': 600, 'молоко': 1200})
+
+    def test_remove_entry(self):
+        planner.remove_entry(MealPlan.objects.get())
+        self.assertEqual(self.get_totals(), {})
+
+    def test_one_rebuild_per_transaction(self):
+        with mock.patch('recipes.planner.rebuild_recipes') as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                for row in IngredientInRecipe.objects.all():
+                    row.amount += 1
+                    row.save()
+                self.recipe.save()
+        rebuild.assert_called_once_with([self.recipe.pk])
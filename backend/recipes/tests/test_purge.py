@@ -0,0 +1,73 @@
+from django.test import TestCase
+
+from .factories import create_ingredient, create_recipe, create_user
+from recipes import purge
+from recipes.models import (
+    ChangeLog,
+    Favorite,
+    IngredientInRecipe,
+    PurgeJob,
+    Recipe,
+    ShoppingCart
+)
+from users.models import Subscription, User
+
+
+class PurgeTest(TestCase):
+
+    def setUp(self):
+        self.author = create_user()
+        self.reader = create_user()
+        self.recipes = [
+            create_recipe(
+                author=self.author, ingredients=[(create_ingredient(), 10)]
+            )
+            for _ in range(3)
+        ]
+        for recipe in self.recipes:
+            Favorite.objects.create(user=self.reader, recipe=recipe)
+            ShoppingCart.objects.create(user=self.reader, recipe=recipe)
+            Favorite.objects.create(user=self.author, recipe=recipe)
+        Subscription.objects.create(user=self.reader, author=self.author)
+
+    def get_removed(self, kind):
+        return set(ChangeLog.objects.filter(
+            kind=kind, user=self.reader, deleted=True
+        ).values_list('object_id', flat=True))
+
+    def test_delete_user(self):
+        job = purge.delete_user(self.author)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertTrue(purge.run(job, batch_size=2))
+        job.refresh_from_db()
+        self.assertIsNotNone(job.finished)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Recipe.all_objects.exists())
+        self.assertFalse(IngredientInRecipe.objects.exists())
+        self.assertFalse(Favorite.objects.exists())
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.assertEqual(job.deleted['favorites'], 3)
+        self.assertEqual(job.deleted['recipe_favorites'], 3)
+        self.assertGreater(job.deleted['changelog'], 0)
+        ids = {recipe.pk for recipe in self.recipes}
+        self.assertEqual(self.get_removed(ChangeLog.FAVORITE), ids)
+        self.assertEqual(self.get_removed(ChangeLog.SHOPPING_CART), ids)
+        self.assertEqual(
+            self.get_removed(ChangeLog.SUBSCRIPTION), {self.author.pk}
+        )
+
+    def test_resume_after_time_limit(self):
+        job = purge.delete_recipe(self.recipes[0])
+        self.assertFalse(purge.run(job, batch_size=1, time_limit=0))
+        job = PurgeJob.objects.get(pk=job.pk)
+        self.assertTrue(purge.run(job, batch_size=1))
+        self.assertEqual(
+            list(Recipe.all_objects.order_by('pk').values_list(
+                'pk', flat=True
+            )),
+            [recipe.pk for recipe in self.recipes[1:]]
+        )
+        self.assertEqual(
+            self.get_removed(ChangeLog.FAVORITE), {self.recipes[0].pk}
+        )
+        self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
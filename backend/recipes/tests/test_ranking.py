@@ -0,0 +1,55 @@
+import math
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .factories import create_recipe, create_user
+from recipes import ranking
+from recipes.models import Favorite, RankingEpoch
+
+
+class RankingTest(TestCase):
+
+    def setUp(self):
+        self.recipes = [create_recipe(), create_recipe()]
+
+    def get_scores(self, field):
+        for recipe in self.recipes:
+            recipe.refresh_from_db()
+        return [getattr(recipe, field) for recipe in self.recipes]
+
+    def test_normalize_keeps_order(self):
+        now = timezone.now()
+        ranking.record_event('favorite', self.recipes[0].pk, now)
+        ranking.record_event(
+            'favorite', self.recipes[1].pk, now - timedelta(days=3)
+        )
+        before = self.get_scores('trending')
+        RankingEpoch.objects.update(epoch=now - timedelta(days=10))
+        ranking.normalize()
+        after = self.get_scores('trending')
+        self.assertGreater(after[0], after[1])
+        self.assertAlmostEqual(after[0] / after[1], before[0] / before[1])
+
+    def test_late_event_does_not_overflow(self):
+        ranking.get_epoch()
+        RankingEpoch.objects.update(
+            epoch=timezone.now() - timedelta(days=5000)
+        )
+        ranking.record_event('favorite', self.recipes[0].pk, timezone.now())
+        score = self.get_scores('trending')[0]
+        self.assertTrue(math.isfinite(score))
+        self.assertAlmostEqual(score, 1.0, places=3)
+
+
+class RankingSignalsTest(TestCase):
+
+    def test_favorite_updates_scores_in_transaction(self):
+        recipe = create_recipe()
+        favorite = Favorite.objects.create(user=create_user(), recipe=recipe)
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.popularity, 0)
+        favorite.delete()
+        recipe.refresh_from_db()
+        self.assertAlmostEqual(recipe.popularity, 0)
@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from .factories import create_recipe
+from recipes import search
+from recipes.models import ChangeLog, Recipe
+
+
+class RecipeSearchTest(TestCase):
+
+    def setUp(self):
+        search.indexes.clear()
+        self.recipe = create_recipe(name='Абрикосовый пирог')
+
+    def test_normalize(self):
+        self.assertEqual(
+            search.normalize('Абрикосы консервированные'),
+            'абрикос консервированн'
+        )
+
+    def test_typo(self):
+        self.assertEqual(
+            search.find(Recipe, 'абрекосовый'), [self.recipe.pk]
+        )
+
+    def test_index_follows_changelog(self):
+        self.assertEqual(search.find(Recipe, 'вишневый'), [])
+        self.recipe.name = 'Вишнёвый пирог'
+        self.recipe.save()
+        # Изменения берутся из журнала, а не из кэша процесса.
+        cache.clear()
+        self.assertEqual(search.find(Recipe, 'вишневый'), [self.recipe.pk])
+
+    def test_index_is_updated_incrementally(self):
+        other = create_recipe(name='Вишнёвый пирог')
+        self.assertEqual(search.find(Recipe, 'вишневый'), [other.pk])
+        index = search.get_index(Recipe)
+        # Записи моложе SYNC_SETTLE_SECONDS перечитываются.
+        ChangeLog.objects.update(
+            created=timezone.now() - timedelta(minutes=1)
+        )
+        search.find(Recipe, 'вишневый')
+        with self.assertNumQueries(1):
+            search.find(Recipe, 'вишневый')
+        other.name = 'Сливовый пирог'
+        other.save()
+        self.recipe.delete()
+        self.assertEqual(search.find(Recipe, 'сливовый'), [other.pk])
+        self.assertEqual(search.find(Recipe, 'вишневый'), [])
+        self.assertEqual(search.find(Recipe, 'абрикосовый'), [])
+        self.assertIs(search.get_index(Recipe), index)
@@ -0,0 +1,58 @@
+from django.test import SimpleTestCase, TestCase
+
+from .factories import create_ingredient, create_recipe, create_user
+from api.views import get_shopping_list
+from recipes.models import ShoppingCart
+from recipes.units import humanize, merge_units, to_base
+
+
+class UnitsTest(SimpleTestCase):
+
+    def test_to_base(self):
+        self.assertEqual(to_base(2, 'кг'), (2000, 'г'))
+        self.assertEqual(to_base(2, 'ст. л.', 'уксус'), (30, 'г'))
+        self.assertEqual(to_base(3, 'шт.', 'яйца'), (3, 'шт.'))
+        self.assertEqual(to_base(1, 'л', 'вода столовая'), (1000, 'г'))
+
+    def test_merge_units(self):
+        self.assertEqual(merge_units([
+            {'name': 'мука', 'unit': 'г', 'total': 100},
+            {'name': 'мука', 'unit': 'мл', 'total': 100},
+            {'name': 'соль', 'unit': 'по вкусу', 'total': 0},
+            {'name': 'соль', 'unit': 'г', 'total': 5},
+            {'name': 'перец', 'unit': 'по вкусу', 'total': 0},
+        ]), [
+            ('мука', 160, 'г'),
+            ('перец', None, 'по вкусу'),
+            ('соль', 5, 'г'),
+        ])
+
+    def test_humanize(self):
+        self.assertEqual(humanize(1500, 'г'), '1.5 кг')
+        self.assertEqual(humanize(250, 'мл'), '250 мл')
+        self.assertEqual(humanize(None, 'г'), 'по вкусу')
+
+
+class ShoppingListTest(TestCase):
+
+    def test_base_units_and_multiplier(self):
+        user = create_user()
+        flour_kg = create_ingredient('мука', 'кг')
+        flour_g = create_ingredient('мука', 'г')
+        milk = create_ingredient('молоко', 'стакан')
+        eggs = create_ingredient('яйца', 'шт.')
+        pancakes = create_recipe(
+            ingredients=[(flour_g, 200), (milk, 2), (eggs, 2)]
+        )
+        pie = create_recipe(ingredients=[(flour_kg, 1), (eggs, 3)])
+        ShoppingCart.objects.create(user=user, recipe=pancakes, multiplier=2)
+        ShoppingCart.objects.create(user=user, recipe=pie)
+        self.assertEqual(
+            [(name, round(amount, 2), unit)
+             for name, amount, unit in get_shopping_list(user)],
+            [
+                ('молоко', 800.0, 'мл'),
+                ('мука', 1400.0, 'г'),
+                ('яйца', 7.0, 'шт.'),
+            ]
+        )
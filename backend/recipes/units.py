@@ -0,0 +1,158 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Case, CharField, F, FloatField, Sum, Value, When
+
+MASS_UNIT = 'г'
+VOLUME_UNIT = 'мл'
+TO_TASTE = 'по вкусу'
+
+# Единица измерения -> (базовая единица, множитель).
+# Счётные единицы (шт., пучок, банка...) не пересчитываются
+# и остаются базовыми сами для себя.
+UNIT_CONVERSIONS = {
+    'г': (MASS_UNIT, 1),
+    'кг': (MASS_UNIT, 1000),
+    'мл': (VOLUME_UNIT, 1),
+    'л': (VOLUME_UNIT, 1000),
+    'стакан': (VOLUME_UNIT, 200),
+    'ст. л.': (VOLUME_UNIT, 15),
+    'ч. л.': (VOLUME_UNIT, 5),
+    'капля': (VOLUME_UNIT, 0.05),
+}
+
+# Плотность (г/мл) для продуктов, которые встречаются
+# и в весовых, и в объёмных единицах.
+DENSITY = {
+    'вода': 1.0,
+    'молоко': 1.03,
+    'кефир': 1.03,
+    'сливки': 1.0,
+    'сметана': 1.0,
+    'масло': 0.92,
+    'уксус': 1.0,
+    'мед': 1.4,
+    'сахар': 0.85,
+    'сахарная пудра': 0.6,
+    'соль': 1.2,
+    'мука': 0.6,
+    'крахмал': 0.65,
+    'рис': 0.85,
+    'какао': 0.45,
+}
+
+# Порог, начиная с которого выводим крупную единицу.
+LARGE_UNITS = {
+    MASS_UNIT: (1000, 'кг'),
+    VOLUME_UNIT: (1000, 'л'),
+}
+
+
+@lru_cache(maxsize=None)
+def conversion_table():
+    """Таблица пересчёта единиц, собирается один раз на процесс."""
+    table = dict(UNIT_CONVERSIONS)
+    table.update(getattr(settings, 'UNIT_CONVERSIONS', {}))
+    return table
+
+
+@lru_cache(maxsize=None)
+def density_table():
+    """Таблица плотностей, собирается один раз на процесс."""
+    table = dict(DENSITY)
+    table.update(getattr(settings, 'INGREDIENT_DENSITY', {}))
+    return table
+
+
+@lru_cache(maxsize=None)
+def base_factor_expression(unit_field):
+    """SQL-выражение множителя перевода в базовую единицу."""
+    return Case(
+        *[
+            When(**{unit_field: unit}, then=Value(float(factor)))
+            for unit, (_, factor) in conversion_table().items()
+        ],
+        default=Value(1.0),
+        output_field=FloatField()
+    )
+
+
+@lru_cache(maxsize=None)
+def base_unit_expression(unit_field):
+    """SQL-выражение базовой единицы измерения."""
+    return Case(
+        *[
+            When(**{unit_field: unit}, then=Value(base))
+            for unit, (base, _) in conversion_table().items()
+        ],
+        default=F(unit_field),
+        output_field=CharField()
+    )
+
+
+def aggregate_in_base_units(queryset, amount='amount',
+                            prefix='ingredient__'):
+    """Суммирует количество ингредиентов в базовых единицах
+    одним сгруппированным запросом."""
+    unit_field = f'{prefix}measurement_unit'
+    if isinstance(amount, str):
+        amount = F(amount)
+    return queryset.values(
+        name=F(f'{prefix}name'),
+        unit=base_unit_expression(unit_field),
+    ).annotate(
+        total=Sum(amount * base_factor_expression(unit_field))
+    ).order_by('name', 'unit')
+
+
+def get_density(name):
+    """Плотность продукта по полному названию или первому слову."""
+    table = density_table()
+    name = name.lower().replace('ё', 'е')
+    if name in table:
+        return table[name]
+    return table.get(name.split()[0]) if name else None
+
+
+def to_base(amount, unit, name=''):
+    """Переводит количество в базовую единицу (в граммы,
+    если для продукта известна плотность)."""
+    base, factor = conversion_table().get(unit, (unit, 1))
+    amount *= factor
+    if base == VOLUME_UNIT:
+        density = get_density(name)
+        if density:
+            return amount * density, MASS_UNIT
+    return amount, base
+
+
+def merge_units(rows):
+    """Сводит строки одного продукта в граммах и миллилитрах
+    по плотности и убирает «по вкусу», если есть точное количество."""
+    merged = {(row['name'], row['unit']): row['total'] or 0 for row in rows}
+    for name, unit in list(merged):
+        density = get_density(name)
+        if (unit == VOLUME_UNIT and density
+                and (name, MASS_UNIT) in merged):
+            merged[name, MASS_UNIT] += merged.pop((name, unit)) * density
+    quantified = {name for name, unit in merged if unit != TO_TASTE}
+    return [
+        (name, None if unit == TO_TASTE else total, unit)
+        for (name, unit), total in sorted(merged.items())
+        if unit != TO_TASTE or name not in quantified
+    ]
+
+
+def format_amount(amount):
+    """Округляет количество и убирает лишние нули."""
+    return f'{amount:.2f}'.rstrip('0').rstrip('.')
+
+
+def humanize(amount, unit):
+    """Переводит количество в удобную для чтения единицу."""
+    if amount is None:
+        return TO_TASTE
+    threshold, large_unit = LARGE_UNITS.get(unit, (None, None))
+    if threshold and amount >= threshold:
+        amount, unit = amount / threshold, large_unit
+    return f'{format_amount(amount)} {unit}'
@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'created',
+        'finished',
+    )
+    list_filter = ('status',)
+    search_fields = ('^name', '=key')
+    readonly_fields = ('started', 'finished', 'error')
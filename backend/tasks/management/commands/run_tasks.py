@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run the background task worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.TASKS_WORKERS,
+            help='Number of worker threads'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.TASKS_POLL_INTERVAL,
+            help='Seconds to wait when the queue is empty'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when there are no tasks ready to run'
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(options['workers'], options['poll_interval'])
+        try:
+            worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            worker.stop()
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import (
+    Avg,
+    Count,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Max,
+    Min,
+    Q
+)
+from django.utils import timezone
+
+from .models import Task
+
+
+def seconds(value):
+    return value.total_seconds() if value is not None else None
+
+
+def duration(end, start):
+    return ExpressionWrapper(F(end) - F(start), output_field=DurationField())
+
+
+def collect():
+    """Глубина очереди, задержка и время выполнения задач."""
+    now = timezone.now()
+    since = now - timedelta(seconds=settings.TASKS_METRICS_WINDOW)
+    depth = dict.fromkeys(dict(Task.STATUSES), 0)
+    depth.update(
+        Task.objects.values_list('status').annotate(count=Count('id'))
+    )
+    oldest = Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=now
+    ).aggregate(oldest=Min('run_at'))['oldest']
+    by_name = Task.objects.filter(
+        Q(status__in=(Task.QUEUED, Task.RUNNING)) | Q(finished__gte=since)
+    ).values('name').annotate(
+        queued=Count('id', filter=Q(status=Task.QUEUED)),
+        running=Count('id', filter=Q(status=Task.RUNNING)),
+        done=Count('id', filter=Q(status=Task.DONE, finished__gte=since)),
+        failed=Count('id', filter=Q(status=Task.FAILED, finished__gte=since)),
+    ).order_by('name')
+    finished = Task.objects.filter(
+        status=Task.DONE, finished__gte=since
+    ).aggregate(
+        latency_avg=Avg(duration('started', 'run_at')),
+        latency_max=Max(duration('started', 'run_at')),
+        runtime_avg=Avg(duration('finished', 'started')),
+        runtime_max=Max(duration('finished', 'started')),
+    )
+    return {
+        'depth': depth,
+        'oldest_queued_age': seconds(now - oldest) if oldest else 0,
+        'window': settings.TASKS_METRICS_WINDOW,
+        **{name: seconds(value) for name, value in finished.items()},
+        'tasks': list(by_name),
+    }
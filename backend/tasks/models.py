@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+def default_max_attempts():
+    return settings.TASKS_MAX_ATTEMPTS
+
+
+class Task(models.Model):
+    """Модель фоновой задачи."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+    name = models.CharField(
+        max_length=200,
+        verbose_name='Задача'
+    )
+    args = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='Аргументы'
+    )
+    key = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        verbose_name='Ключ'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Попытки'
+    )
+    max_attempts = models.PositiveIntegerField(
+        default=default_max_attempts,
+        verbose_name='Максимум попыток'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Запустить не раньше'
+    )
+    created = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Создана'
+    )
+    started = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Начата'
+    )
+    finished = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершена'
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка'
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(
+                fields=('status', 'run_at'),
+                name='task_status_run_at'
+            ),
+        ]
+        constraints = [
+            # Задача с тем же ключом, ещё стоящая в очереди,
+            # не дублируется.
+            models.UniqueConstraint(
+                fields=('key',),
+                condition=Q(status='queued'),
+                name='unique_queued_task_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} [{self.status}]'
@@ -0,0 +1,143 @@
+"""Регистрация и постановка фоновых задач.
+
+    @task()
+    def recalculate(recipe_ids):
+        ...
+
+    recalculate.delay([recipe.id], key=f'nutrition:{recipe.id}')
+    recalculate.delay_batch([recipe.id])
+
+Задача ставится в очередь после фиксации текущей транзакции, аргументы
+должны сериализоваться в JSON. Пока в очереди есть задача с тем же key,
+повторная не создаётся. С TASKS_EAGER задачи выполняются сразу после
+фиксации в том же процессе - без воркера run_tasks. delay_batch
+собирает id за транзакцию и ставит одну задачу со всеми id после её
+фиксации.
+
+key только убирает дубли из очереди: задача, упавшая после части
+изменений, выполняется повторно целиком. Поэтому задачи пересчитывают
+состояние (пищевую ценность, суммы планов, снимки), а не прибавляют к
+нему; приращения, как оценки рецептов, делаются в транзакции записи.
+"""
+import logging
+import threading
+from datetime import timedelta
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+# Незафиксированные пачки delay_batch потока: имя задачи -> Batch.
+local = threading.local()
+
+
+def task(name=None, max_attempts=None):
+    """Декоратор, регистрирующий функцию как фоновую задачу."""
+
+    def register(function):
+        task_name = name or f'{function.__module__}.{function.__name__}'
+        REGISTRY[task_name] = function
+        function.task_name = task_name
+
+        def delay(*args, key=None, countdown=0):
+            enqueue(
+                task_name,
+                args,
+                key=key,
+                countdown=countdown,
+                max_attempts=max_attempts
+            )
+
+        function.delay = delay
+        function.delay_batch = lambda ids: enqueue_batch(
+            task_name, ids, max_attempts
+        )
+        return function
+
+    return register
+
+
+def run_eager(name, args):
+    try:
+        REGISTRY[name](*args)
+    except Exception:
+        logger.exception('Task %s failed', name)
+
+
+def create_task(name, args, key, countdown, max_attempts):
+    values = {}
+    if max_attempts is not None:
+        values['max_attempts'] = max_attempts
+    try:
+        with transaction.atomic():
+            Task.objects.create(
+                name=name,
+                args=list(args),
+                key=key,
+                run_at=timezone.now() + timedelta(seconds=countdown),
+                **values
+            )
+    except IntegrityError:
+        if key is None:
+            raise
+
+
+def submit(name, args, key, countdown, max_attempts):
+    if settings.TASKS_EAGER:
+        run_eager(name, args)
+    else:
+        create_task(name, args, key, countdown, max_attempts)
+
+
+def enqueue(name, args=(), key=None, countdown=0, max_attempts=None):
+    """Ставит задачу в очередь после фиксации транзакции."""
+    if name not in REGISTRY:
+        raise LookupError(f'Unknown task {name}')
+    transaction.on_commit(
+        lambda: submit(name, args, key, countdown, max_attempts)
+    )
+
+
+class Batch:
+    """id для задачи name(ids), собранные за транзакцию."""
+
+    def __init__(self, name, max_attempts):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.ids = set()
+
+    def __call__(self):
+        ids = sorted(self.ids)
+        key = ','.join(map(str, ids))
+        if len(key) > 100:
+            key = blake2b(key.encode(), digest_size=16).hexdigest()
+        # Вызывается уже после фиксации.
+        submit(self.name, (ids,), f'{self.name}:{key}', 0, self.max_attempts)
+
+
+def enqueue_batch(name, ids, max_attempts=None):
+    """Добавляет ids к задаче name, которая ставится в очередь один раз
+    после фиксации текущей транзакции."""
+    if name not in REGISTRY:
+        raise LookupError(f'Unknown task {name}')
+    if not ids:
+        return
+    batches = local.__dict__.setdefault('batches', {})
+    batch = batches.get(name)
+    # После фиксации или отката пачка пропадает из run_on_commit.
+    if batch is None or not any(
+        callback is batch
+        for _, callback in transaction.get_connection().run_on_commit
+    ):
+        batch = batches[name] = Batch(name, max_attempts)
+        batch.ids.update(ids)
+        transaction.on_commit(batch)
+    else:
+        batch.ids.update(ids)
@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from recipes.tasks import rebuild_meal_plans
+from tasks.models import Task
+
+
+@override_settings(TASKS_EAGER=False)
+class DelayBatchTest(TestCase):
+
+    def test_one_task_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            rebuild_meal_plans.delay_batch([2])
+            rebuild_meal_plans.delay_batch([1, 2])
+        self.assertEqual(len(callbacks), 1)
+        task = Task.objects.get()
+        self.assertEqual(task.args, [[1, 2]])
+        self.assertEqual(task.key, 'recipes.tasks.rebuild_meal_plans:1,2')
+
+    def test_rolled_back_batch_is_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    rebuild_meal_plans.delay_batch([1])
+                    raise ValueError
+            except ValueError:
+                pass
+            rebuild_meal_plans.delay_batch([2])
+        self.assertEqual(Task.objects.get().args, [[2]])
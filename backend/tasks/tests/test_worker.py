@@ -0,0 +1,21 @@
+from django.test import TestCase, override_settings
+
+from tasks.models import Task
+from tasks.worker import schedule_periodic
+
+
+@override_settings(TASKS_PERIODIC={'recipes.tasks.normalize_rankings': 60})
+class SchedulePeriodicTest(TestCase):
+
+    def test_one_queued_task(self):
+        schedule_periodic()
+        schedule_periodic()
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'recipes.tasks.normalize_rankings')
+        self.assertEqual(task.status, Task.QUEUED)
+
+    def test_next_run_after_previous_left_queue(self):
+        schedule_periodic()
+        Task.objects.update(status=Task.DONE)
+        schedule_periodic()
+        self.assertEqual(Task.objects.filter(status=Task.QUEUED).count(), 1)
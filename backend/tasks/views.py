@@ -0,0 +1,13 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import metrics
+
+
+class TaskMetricsView(APIView):
+    """Метрики очереди фоновых задач для администраторов."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(metrics.collect())
@@ -0,0 +1,171 @@
+"""Воркер очереди: забирает задачи из таблицы и выполняет их в пуле
+потоков. Задача захватывается условным UPDATE по статусу, поэтому
+несколько воркеров (и процессов) могут работать с одной очередью.
+"""
+import logging
+import random
+import signal
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+from .registry import REGISTRY, create_task
+
+logger = logging.getLogger(__name__)
+
+
+def get_backoff(attempts):
+    """Задержка перед повтором: экспонента с разбросом."""
+    delay = min(
+        settings.TASKS_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.TASKS_RETRY_BACKOFF_MAX
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+def requeue(task_id, **values):
+    """Возвращает задачу в очередь. Если там уже есть задача с тем же
+    ключом, эта считается выполненной ею."""
+    try:
+        return Task.objects.filter(pk=task_id).update(
+            status=Task.QUEUED, **values
+        )
+    except IntegrityError:
+        return Task.objects.filter(pk=task_id).update(
+            status=Task.DONE,
+            finished=timezone.now(),
+            error='Заменена задачей с тем же ключом.'
+        )
+
+
+def claim(limit):
+    """Захватывает до limit готовых к запуску задач."""
+    now = timezone.now()
+    candidates = Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=now
+    ).order_by('run_at').values_list('id', flat=True)[:limit]
+    return [
+        task_id for task_id in candidates
+        if Task.objects.filter(pk=task_id, status=Task.QUEUED).update(
+            status=Task.RUNNING, started=now, attempts=F('attempts') + 1
+        )
+    ]
+
+
+def execute(task_id):
+    """Выполняет захваченную задачу и записывает результат."""
+    try:
+        task = Task.objects.get(pk=task_id)
+        try:
+            function = REGISTRY.get(task.name)
+            if function is None:
+                raise LookupError(f'Unknown task {task.name}')
+            function(*task.args)
+        except Exception:
+            error = traceback.format_exc()
+            logger.warning('Task %s #%s failed', task.name, task.pk)
+            if task.attempts < task.max_attempts:
+                requeue(
+                    task.pk,
+                    error=error,
+                    run_at=timezone.now() + timedelta(
+                        seconds=get_backoff(task.attempts)
+                    )
+                )
+            else:
+                Task.objects.filter(pk=task.pk).update(
+                    status=Task.FAILED, finished=timezone.now(), error=error
+                )
+        else:
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.DONE, finished=timezone.now(), error=''
+            )
+    finally:
+        connection.close()
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи упавших воркеров."""
+    deadline = timezone.now() - timedelta(seconds=settings.TASKS_TIMEOUT)
+    for task_id in Task.objects.filter(
+        status=Task.RUNNING, started__lt=deadline
+    ).values_list('id', flat=True):
+        requeue(task_id, run_at=timezone.now())
+
+
+def cleanup():
+    """Удаляет старые выполненные задачи."""
+    Task.objects.filter(
+        status=Task.DONE,
+        finished__lt=timezone.now() - timedelta(
+            seconds=settings.TASKS_KEEP_DONE
+        )
+    ).delete()
+
+
+def schedule_periodic():
+    """Ставит в очередь периодические задачи TASKS_PERIODIC: следующий
+    запуск - через интервал после того, как предыдущий покинул
+    очередь."""
+    for name, interval in settings.TASKS_PERIODIC.items():
+        key = f'periodic:{name}'
+        if Task.objects.filter(key=key, status=Task.QUEUED).exists():
+            continue
+        create_task(name, (), key, interval, None)
+
+
+class Worker:
+    """Цикл опроса очереди с пулом из workers потоков."""
+    maintenance_interval = 60
+
+    def __init__(self, workers, poll_interval):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.running = set()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.next_maintenance = 0
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def done(self, future):
+        with self.lock:
+            self.running.discard(future)
+
+    def maintenance(self):
+        if time.monotonic() < self.next_maintenance:
+            return
+        requeue_stale()
+        cleanup()
+        schedule_periodic()
+        self.next_maintenance = time.monotonic() + self.maintenance_interval
+
+    def run(self, once=False):
+        """Выполняет задачи до остановки (once - пока очередь не пуста)."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+        with ThreadPoolExecutor(self.workers) as executor:
+            while not self.stopping.is_set():
+                self.maintenance()
+                with self.lock:
+                    free = self.workers - len(self.running)
+                task_ids = claim(free) if free > 0 else []
+                for task_id in task_ids:
+                    future = executor.submit(execute, task_id)
+                    with self.lock:
+                        self.running.add(future)
+                    future.add_done_callback(self.done)
+                if once and not task_ids and not self.running:
+                    break
+                if not task_ids:
+                    self.stopping.wait(self.poll_interval)
+        connection.close()
@@ -1,10 +1,27 @@
 from django.contrib import admin
-from django.db.models import Count
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from foodgram.paginators import EstimatedCountPaginator
+from recipes import purge
+from recipes.admin import SoftDeleteAdminMixin
+from recipes.models import Recipe
 from users.models import Subscription, User
 
 
+def count_subquery(queryset, field):
+    """Число связанных строк для каждой строки страницы админки."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count'),
+        output_field=IntegerField()
+    ), 0)
+
+
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
+    soft_delete = staticmethod(purge.delete_user)
     list_display = (
         'id',
         'username',
@@ -17,14 +34,18 @@ class UserAdmin(admin.ModelAdmin):
     )
     list_editable = ('password',)
     list_display_links = ('username',)
-    search_fields = ('username', 'email', 'first_name', 'last_name')
-    list_filter = ('username', 'email')
+    search_fields = ('^username', '^email', '^first_name', '^last_name')
+    list_filter = ('is_staff', 'is_active')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
         queryset = queryset.annotate(
-            recipes_count=Count('recipes'),
-            subscribers_count=Count('following')
+            recipes_count=count_subquery(Recipe.objects, 'author'),
+            subscribers_count=count_subquery(
+                Subscription.objects, 'author'
+            )
         )
         return queryset
 
@@ -43,3 +64,17 @@ class SubscriptionAdmin(admin.ModelAdmin):
         'user',
         'author',
     )
+    list_select_related = (
+        'user',
+        'author',
+    )
+    autocomplete_fields = (
+        'user',
+        'author',
+    )
+    search_fields = (
+        '^user__username',
+        '^author__username',
+    )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
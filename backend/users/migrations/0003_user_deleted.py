@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_subscription_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='deleted',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Удалён'),
+        ),
+    ]
@@ -32,6 +32,11 @@ class User(AbstractUser):
         max_length=settings.MAX_LENGTH_USERNAME,
         verbose_name='Пароль'
     )
+    deleted = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Удалён'
+    )
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name', 'password']
     USERNAME_FIELD = 'email'
 
@@ -49,12 +54,14 @@ class Subscription(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='subscriber',
         verbose_name='Подписчик'
     )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='following',
         verbose_name='Подписант'
     )
@@ -66,6 +73,12 @@ class Subscription(models.Model):
                 name='unique_subscription_user_author'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('author', 'user'),
+                name='subscription_author_user'
+            )
+        ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 